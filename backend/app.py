@@ -1,92 +1,241 @@
-from flask import Flask, request, send_file, jsonify
+import time
+_import_started = time.perf_counter() # For cold-start measurement, see /startup_stats
+
+from flask import Flask, Request, Response, request, send_file, jsonify
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
+from werkzeug.wsgi import ClosingIterator
+import io
+import json
 import os
+import shutil
 import tempfile
-from docx import Document as DocxDocument # Renamed to avoid conflict if Document is used elsewhere
-from PyPDF2 import PdfReader
-import google.generativeai as genai
 from dotenv import load_dotenv
 import traceback
+import model_registry
+from llm_backends import create_llm_backend_from_env
+from text_extraction import FORMAT_LABELS, extract_document, format_extraction_report
+from parse_sandbox import ParserBusyError, create_parse_sandbox_from_env
+from extraction_cache import cached_extract, cached_extract_stream, create_extraction_cache_from_env
+from entry_selection import HeldEntryStream, create_entry_selector_from_env
+from text_compaction import CompactionStats, compact_inputs, compaction_settings_from_env, estimate_tokens
+from llm_cache import create_llm_cache_from_env, make_llm_cache_key, make_prompt_cache_key
+from section_tailoring import tailor_sections
+from docx_renderer import get_renderer as get_docx_renderer
+from result_store import create_result_store_from_env
+from upstream_guard import UpstreamBusyError, create_upstream_guard_from_env
+from model_routing import create_hedger_from_env, create_model_router_from_env
+from metrics import MetricsRegistry, create_profiler_from_env
+from jd_scoring import create_vector_cache_from_env, rank_resumes
+from resume_store import StoredResume, content_hash_for, create_resume_store_from_env
+from batch_tailoring import batch_entry_name, fan_out, iter_zip_stream, parse_job_descriptions
+from job_queue import JobFailedError, JobQueueFullError, JOB_DONE, JOB_FAILED, create_job_queue_from_env, public_job_view
 
 # Load environment variables from .env file
 load_dotenv()
 
+# In-memory pipeline: uploads are parsed straight from the request stream and the DOCX is
+# rendered into a buffer. Uploads only spill to a temp file above SPILL_TO_DISK_BYTES.
+IN_MEMORY_PIPELINE = os.getenv('IN_MEMORY_PIPELINE', 'True').lower() in ('true', '1', 't')
+SPILL_TO_DISK_BYTES = int(os.getenv('SPILL_TO_DISK_BYTES', 5 * 1024 * 1024))
+# Whole request body limit, 0 = unlimited. Werkzeug refuses a larger Content-Length up front and
+# stops reading chunked bodies as soon as they pass it, so oversized uploads are never fully read.
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_BYTES', 20 * 1024 * 1024))
+
+class SpoolingRequest(Request):
+    # Werkzeug spools uploads to disk above a fixed 500KB; make that threshold configurable
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=SPILL_TO_DISK_BYTES, mode='rb+')
+
 app = Flask(__name__)
+app.request_class = SpoolingRequest
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES or None
 
 # Configure CORS
 CORS(app) # Allows all origins by default, refine for production
 
 # Configure Gemini API
-try:
-    gemini_api_key = os.getenv("GOOGLE_API_KEY")
-    if not gemini_api_key:
-        raise ValueError("GOOGLE_API_KEY not found in environment variables. Please set it in the .env file.")
-    genai.configure(api_key=gemini_api_key)
-except ValueError as ve:
-    print(f"Configuration Error: {ve}")
-    # You might want to exit or handle this more gracefully if the app can't run without the API key
-except Exception as e:
-    print(f"An unexpected error occurred during Gemini configuration: {e}")
+# google-generativeai, python-docx and PyPDF2 are imported lazily so workers boot fast;
+# genai.configure runs once, on first use or during warmup (see model_registry).
+if not os.getenv("GOOGLE_API_KEY"):
+    print("Configuration Error: GOOGLE_API_KEY not found in environment variables. Please set it in the .env file.")
 
+# Text generation backend: Gemini by default, LLM_BACKEND=fake for load tests
+llm_backend = create_llm_backend_from_env()
+# Cache of extracted resume text keyed by a hash of the uploaded bytes
+extraction_cache = create_extraction_cache_from_env()
+# Worker processes that run PyPDF2/python-docx under timeouts and memory caps
+parse_sandbox = create_parse_sandbox_from_env()
+# Cache of AI responses keyed by (model, generation config, JD, resume text)
+llm_cache = create_llm_cache_from_env()
+# Shared requests/tokens-per-minute limiter, retry with backoff and circuit breaker around model calls
+upstream_guard = create_upstream_guard_from_env()
+# Finished DOCX files waiting to be fetched by streaming clients
+download_store = create_result_store_from_env() # DOWNLOAD_STORE=sqlite shares download tokens between workers
+# Background worker pool for the /jobs API
+job_queue = create_job_queue_from_env()
+# Term vectors of scored resumes, keyed by a hash of their text, for /score
+score_vector_cache = create_vector_cache_from_env()
+# Resumes parsed once at POST /resumes and referenced by resume_id in later tailoring requests
+resume_store = create_resume_store_from_env()
+# Prometheus metrics served at /metrics, and the opt-in 1-in-N request profiler
+metrics = MetricsRegistry()
+stage_seconds = metrics.histogram('tailor_stage_seconds', 'Time spent in each pipeline stage.', ('stage',))
+http_requests = metrics.counter('tailor_http_requests_total', 'HTTP requests by endpoint and status code.', ('endpoint', 'status'))
+model_tokens = metrics.counter('tailor_model_tokens_total', 'Model tokens by direction, from usage metadata or a local estimate.', ('direction',))
+ai_errors = metrics.counter('tailor_ai_errors_total', 'Failed AI generations by error class.', ('error_class',))
+bytes_processed = metrics.counter('tailor_bytes_total', 'Bytes processed: uploaded resumes and rendered documents.', ('kind',))
+request_profiler = create_profiler_from_env()
 
-# --- Text Extraction Functions ---
-def extract_text_from_pdf(filepath):
-    text = ""
-    try:
-        reader = PdfReader(filepath)
-        if not reader.pages:
-            print(f"Warning: No pages found in PDF {filepath}.")
-            return ""
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n" # Add newline between pages
-        return text.strip()
-    except Exception as e:
-        print(f"Error reading PDF {filepath}: {e}")
-        traceback.print_exc()
-        raise ValueError(f"Could not extract text from PDF: {e}")
 
-def extract_text_from_docx(filepath):
-    text = ""
+# --- Text Extraction Functions ---
+# Extractors live in text_extraction; here they run in the parse sandbox, or in-process when it is disabled
+def extract_text_in_process(data, ext):
     try:
-        doc = DocxDocument(filepath)
-        for para in doc.paragraphs:
-            text += para.text + "\n"
-        return text.strip()
+        return extract_document(data, ext)
+    except MemoryError:
+        raise
     except Exception as e:
-        print(f"Error reading DOCX {filepath}: {e}")
+        print(f"Error reading {FORMAT_LABELS[ext]}: {e}")
         traceback.print_exc()
-        raise ValueError(f"Could not extract text from DOCX: {e}")
+        raise ValueError(f"Could not extract text from {FORMAT_LABELS[ext]}: {e}")
 
-def get_resume_text_from_file(filepath):
-    filename = os.path.basename(filepath)
+def get_resume_text_from_bytes(data, filename):
     ext = filename.split('.')[-1].lower()
-    if ext == 'pdf':
-        return extract_text_from_pdf(filepath)
-    elif ext == 'docx':
-        return extract_text_from_docx(filepath)
-    else:
+    if ext not in FORMAT_LABELS:
         raise ValueError("Unsupported file format. Only PDF and DOCX are supported.")
+    if parse_sandbox is not None:
+        text, report = parse_sandbox.parse(data, ext)
+    else:
+        text, report = extract_text_in_process(data, ext)
+    print(f"{FORMAT_LABELS[ext]} extracted: {format_extraction_report(report)}")
+    return text
+
+def get_resume_text_from_file(filepath):
+    with open(filepath, 'rb') as f:
+        return get_resume_text_from_bytes(f.read(), os.path.basename(filepath))
+
+def get_resume_text_from_stream(stream, filename):
+    return get_resume_text_from_bytes(stream.read(), filename)
+
+def get_resume_text_cached(filepath):
+    return cached_extract(extraction_cache, filepath, get_resume_text_from_file)
+
+def extract_resume_text(stream, filename):
+    # Entry point for request handlers: parses in memory, or via a temp file when IN_MEMORY_PIPELINE is off
+    with stage_seconds.time(stage='extract'):
+        stream.seek(0)
+        if IN_MEMORY_PIPELINE:
+            return cached_extract_stream(extraction_cache, stream, filename, get_resume_text_from_stream)
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            original_filepath = os.path.join(tmpdirname, filename)
+            with open(original_filepath, 'wb') as f:
+                shutil.copyfileobj(stream, f)
+            print(f"File '{filename}' saved temporarily to '{original_filepath}'")
+            return get_resume_text_cached(original_filepath)
+
+def read_resume_text(resume, filename):
+    # resume: an uploaded file, raw bytes, or a StoredResume (extracted when it was stored, nothing to parse)
+    if isinstance(resume, StoredResume):
+        return resume.text
+    return extract_resume_text(io.BytesIO(resume) if isinstance(resume, bytes) else resume.stream, filename)
+
+def render_docx_to_buffer(text_content):
+    docx_buffer = io.BytesIO()
+    create_docx_from_text_content(text_content, docx_buffer)
+    docx_buffer.seek(0)
+    return docx_buffer
 
 # --- AI Tailoring Function ---
-def tailor_resume_with_gemini(job_description, resume_text):
+INPUT_COMPACTION_ENABLED, INPUT_TOKEN_BUDGET, INPUT_JD_TOKEN_SHARE = compaction_settings_from_env()
+compaction_stats = CompactionStats()
+# Long resumes: only the most JD-relevant experience/project entries are rewritten (ENTRY_SELECTION_*)
+entry_selector = create_entry_selector_from_env()
+
+# Model selection
+GEMINI_MODEL_NAME = 'gemini-1.0-pro' # Or 'gemini-1.5-pro-latest' if available
+GENERATION_CONFIG = {
+    "max_output_tokens": 8192,
+    "temperature": 0.4,
+}
+# Model tier per call from its estimated input + output tokens (MODEL_ROUTES, default: always GEMINI_MODEL_NAME)
+model_router = create_model_router_from_env(GEMINI_MODEL_NAME)
+# Optional second request when the first is slower than recent calls (HEDGE_ENABLED)
+request_hedger = create_hedger_from_env()
+
+def route_tailoring_model(prompt, resume_text):
+    # The rewrite is about as long as the resume it replaces
+    return model_router.route(estimate_tokens(prompt), estimate_tokens(resume_text))
+
+def prepare_prompt_inputs(job_description, resume_text, compaction_report=None):
+    # Normalizes/deduplicates the inputs and enforces INPUT_TOKEN_BUDGET before they reach the prompt
+    if not INPUT_COMPACTION_ENABLED:
+        return job_description, resume_text
+    with stage_seconds.time(stage='prompt'):
+        job_description, resume_text, report = compact_inputs(
+            job_description, resume_text, INPUT_TOKEN_BUDGET, INPUT_JD_TOKEN_SHARE
+        )
+    compaction_stats.record(report)
+    print(f"Input compaction: ~{report['tokens_before']} -> ~{report['tokens_after']} tokens "
+          f"(saved ~{report['tokens_saved']}, {report['lines_trimmed']} lines trimmed to fit budget).")
+    if compaction_report is not None:
+        compaction_report.update(report)
+    return job_description, resume_text
+
+def select_prompt_entries(job_description, resume_text, compaction_report=None):
+    # Swaps low-relevance entries for [[KEEP n]] markers; returns (resume_text, held_entries)
+    if entry_selector is None:
+        return resume_text, {}
+    with stage_seconds.time(stage='prompt'):
+        resume_text, held_entries, report = entry_selector.hold_back(job_description, resume_text)
+    if report:
+        print(f"Entry selection: {report['entries'] - report['entries_held_back']} of {report['entries']} entries "
+              f"sent for rewriting, ~{report['tokens_held_back']} tokens held back.")
+        if compaction_report is not None:
+            if "tokens_after" in compaction_report:
+                compaction_report["tokens_after"] -= report["tokens_held_back"]
+                compaction_report["tokens_saved"] += report["tokens_held_back"]
+            compaction_report["entries_held_back"] = report["entries_held_back"]
+    return resume_text, held_entries
+
+def restore_prompt_entries(tailored_text_or_error, held_entries):
+    if not held_entries or tailored_text_or_error.startswith("Error:"):
+        return tailored_text_or_error
+    return entry_selector.restore(tailored_text_or_error, held_entries)
+
+def tailor_resume_with_gemini(job_description, resume_text, compaction_report=None):
     if not resume_text:
         return "Error: Resume text is empty. Cannot process."
     if not job_description:
         return "Error: Job description is empty. Cannot process."
 
-    # Model selection
-    model_name = 'gemini-1.0-pro' # Or 'gemini-1.5-pro-latest' if available
-    try:
-        model = genai.GenerativeModel(model_name)
-    except Exception as e:
-        print(f"Error initializing Gemini model '{model_name}': {e}")
-        traceback.print_exc()
-        return f"Error: AI model initialization failed. {e}"
+    job_description, resume_text = prepare_prompt_inputs(job_description, resume_text, compaction_report)
+    resume_text, held_entries = select_prompt_entries(job_description, resume_text, compaction_report)
+    prompt = build_tailoring_prompt(job_description, resume_text, bool(held_entries))
+    model_name = route_tailoring_model(prompt, resume_text)
+    if llm_cache is None:
+        return restore_prompt_entries(_generate_text(prompt, GENERATION_CONFIG, model_name), held_entries)
+    # Cached with the markers in place: resumes that differ only in held-back entries share the result
+    cache_key = make_llm_cache_key(model_name, GENERATION_CONFIG, job_description, resume_text)
+    return restore_prompt_entries(llm_cache.get_or_compute(
+        cache_key,
+        lambda: _generate_text(prompt, GENERATION_CONFIG, model_name)
+    ), held_entries)
 
-    prompt = f"""
+SAFETY_SETTINGS = [
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+]
+
+_HELD_ENTRIES_RULE = """
+    9.  **Unchanged Entries:** Lines like [[KEEP 3]] stand for resume entries that must stay exactly as they are. Copy every such line unchanged, on its own line, in the same position; do not remove, reorder, or expand them."""
+
+def build_tailoring_prompt(job_description, resume_text, has_held_entries=False):
+    # The extra rule is only added when markers are present, so other prompts are unchanged
+    held_entries_rule = _HELD_ENTRIES_RULE if has_held_entries else ""
+    return f"""
     You are an expert career coach and professional resume writer.
     Your task is to meticulously tailor the provided resume text to align with the given Job Description (JD).
     Your goal is to achieve a very high degree of relevance and incorporate keywords from the JD naturally.
@@ -102,7 +251,7 @@ def tailor_resume_with_gemini(job_description, resume_text):
     5.  **Summary/Objective (if present):** Briefly tailor the summary or objective to reflect the target role in the JD.
     6.  **Maintain Structure:** Preserve the overall structure of the original resume (e.g., Contact Info, Summary, Experience, Education, Skills). Do NOT invent new sections unless absolutely necessary and a standard resume component.
     7.  **Professional Tone:** The output must be professional, concise, and impactful.
-    8.  **Output Format:** Provide ONLY the full text of the new, tailored resume, ready to be copied into a document. Do not include any introductory phrases like "Here is the tailored resume:", or any disclaimers, or explanations of your changes. Ensure clear separation between sections (e.g., using common resume section headers like "Experience", "Education", "Skills").
+    8.  **Output Format:** Provide ONLY the full text of the new, tailored resume, ready to be copied into a document. Do not include any introductory phrases like "Here is the tailored resume:", or any disclaimers, or explanations of your changes. Ensure clear separation between sections (e.g., using common resume section headers like "Experience", "Education", "Skills").{held_entries_rule}
 
     **Job Description (JD):**
     ---
@@ -117,187 +266,971 @@ def tailor_resume_with_gemini(job_description, resume_text):
     **Tailored Resume Text (Full Content):**
     """
 
-    generation_config = genai.types.GenerationConfig(
-        max_output_tokens=8192,
-        temperature=0.4,
+def _init_gemini_model(model_name):
+    try:
+        return llm_backend.get_model(model_name), None
+    except Exception as e:
+        print(f"Error initializing Gemini model '{model_name}': {e}")
+        traceback.print_exc()
+        return None, f"Error: AI model initialization failed. {e}"
+
+def _blocked_prompt_error(prompt_feedback):
+    block_reason_msg = "Unknown (no candidates)"
+    if prompt_feedback and prompt_feedback.block_reason:
+        block_reason_msg = prompt_feedback.block_reason.name
+    error_message = f"Error: AI content generation failed. The request might have been blocked. Reason: {block_reason_msg}."
+    if prompt_feedback:
+         error_message += f" Prompt Feedback: {prompt_feedback}"
+    print(error_message)
+    return error_message
+
+def _extract_tailored_text(response):
+    # Works on both regular and fully-consumed streamed responses
+    if not response.candidates:
+        return _blocked_prompt_error(getattr(response, 'prompt_feedback', None))
+
+    if not response.candidates[0].content.parts:
+        error_message = "Error: AI response is empty or not in the expected format (no parts)."
+        print(error_message)
+        return error_message
+    
+    tailored_text = "".join(part.text for part in response.candidates[0].content.parts if hasattr(part, 'text'))
+    
+    if not tailored_text.strip():
+        finish_reason = "UNKNOWN"
+        if response.candidates[0].finish_reason:
+             finish_reason = response.candidates[0].finish_reason.name
+        error_message = f"Error: AI generated an empty response. Finish Reason: {finish_reason}."
+        if response.candidates[0].safety_ratings:
+            error_message += f" Safety Ratings: {response.candidates[0].safety_ratings}"
+        print(error_message)
+        return error_message
+
+    print("Successfully received response from Gemini.")
+    return tailored_text.strip()
+
+def _gemini_exception_to_error(e):
+    error_type = type(e).__name__
+    print(f"Gemini API call error ({error_type}): {e}")
+    traceback.print_exc()
+    error_details = str(e)
+    if "API key not valid" in error_details or "PERMISSION_DENIED" in error_details:
+        return "Error: AI API Key is invalid or lacks permissions. Please check your key and API settings."
+    if "Quota" in error_details or "RESOURCE_EXHAUSTED" in error_details:
+        return "Error: AI API quota exceeded. Please check your usage limits or try again later."
+    return f"Error: AI resume tailoring failed. {e}"
+
+def _stream_stop_to_error(e):
+    # While a streamed response is iterated, google-generativeai raises a blocked prompt or a stopped
+    # candidate instead of returning it, so _extract_tailored_text never sees it. Returns the same
+    # error the non-streaming checks give, or None for any other exception.
+    generation_types = model_registry.get_genai().types
+    if isinstance(e, generation_types.BlockedPromptException):
+        response = e.args[0] if e.args else None
+        return _blocked_prompt_error(getattr(response, 'prompt_feedback', response))
+    if isinstance(e, generation_types.StopCandidateException):
+        candidate = e.args[0] if e.args else None
+        finish_reason = getattr(getattr(candidate, 'finish_reason', None), 'name', None) or "UNKNOWN"
+        error_message = f"Error: AI content generation stopped early. The response might have been blocked. Finish Reason: {finish_reason}."
+        print(error_message)
+        return error_message
+    return None
+
+AI_BUSY_ERROR = "Error: AI service is busy."
+
+def _ai_error_class(tailored_text_or_error):
+    lowered = tailored_text_or_error.lower()
+    if tailored_text_or_error.startswith(AI_BUSY_ERROR):
+        return 'busy'
+    if 'quota' in lowered:
+        return 'quota'
+    if 'blocked' in lowered:
+        return 'blocked'
+    if 'empty' in lowered:
+        return 'empty'
+    if 'api key' in lowered:
+        return 'auth'
+    if 'initialization' in lowered:
+        return 'init'
+    return 'other'
+
+def _record_generation(prompt, response, tailored_text_or_error):
+    # Token counts come from the response's usage metadata when the backend provides it
+    usage = getattr(response, 'usage_metadata', None)
+    if response is not None:
+        model_tokens.inc(getattr(usage, 'prompt_token_count', 0) or estimate_tokens(prompt), direction='input')
+    if tailored_text_or_error.startswith("Error:"):
+        ai_errors.inc(error_class=_ai_error_class(tailored_text_or_error))
+        return
+    model_tokens.inc(getattr(usage, 'candidates_token_count', 0) or estimate_tokens(tailored_text_or_error),
+                     direction='output')
+
+def _upstream_busy_to_error(e):
+    print(f"AI call not attempted: {e} Retry in ~{e.retry_after:.1f}s.")
+    return f"{AI_BUSY_ERROR} {e}"
+
+def _generate_text(prompt, generation_config, model_name):
+    # One model round trip (two if hedged); returns the generated text or an "Error: ..." string
+    model, error_message = _init_gemini_model(model_name)
+    if error_message:
+        return error_message
+
+    def call_model():
+        print(f"Sending request to Gemini model: {model_name}...")
+        with stage_seconds.time(stage='model'):
+            return model.generate_content(
+                prompt,
+                generation_config=llm_backend.make_generation_config(generation_config),
+                safety_settings=SAFETY_SETTINGS
+            )
+
+    def attempt():
+        if upstream_guard is None:
+            return call_model()
+        return upstream_guard.call(call_model, cost_tokens=estimate_tokens(prompt))
+
+    response = None
+    try:
+        response = attempt() if request_hedger is None else request_hedger.call(attempt, model_name)
+        tailored_text_or_error = _extract_tailored_text(response)
+    except UpstreamBusyError as e:
+        tailored_text_or_error = _upstream_busy_to_error(e)
+    except Exception as e:
+        tailored_text_or_error = _gemini_exception_to_error(e)
+    _record_generation(prompt, response, tailored_text_or_error)
+    return tailored_text_or_error
+
+# --- Section-parallel Tailoring ---
+# 'single' sends the whole resume in one call; 'sections' rewrites sections concurrently
+TAILORING_MODES = ('single', 'sections')
+TAILORING_MODE = os.getenv('TAILORING_MODE', 'single').lower()
+SECTION_CONCURRENCY = int(os.getenv('SECTION_CONCURRENCY', 6))
+SECTION_GENERATION_CONFIG = {
+    "max_output_tokens": 2048,
+    "temperature": 0.4,
+}
+
+def _generate_section_text(prompt, section):
+    model_name = model_router.route(estimate_tokens(prompt), estimate_tokens(section.text))
+    if llm_cache is None:
+        return _generate_text(prompt, SECTION_GENERATION_CONFIG, model_name)
+    cache_key = make_prompt_cache_key(model_name, SECTION_GENERATION_CONFIG, prompt)
+    return llm_cache.get_or_compute(cache_key, lambda: _generate_text(prompt, SECTION_GENERATION_CONFIG, model_name))
+
+def tailor_resume_by_sections(job_description, resume_text, compaction_report=None, section_report=None):
+    if not resume_text:
+        return "Error: Resume text is empty. Cannot process."
+    if not job_description:
+        return "Error: Job description is empty. Cannot process."
+
+    job_description, resume_text = prepare_prompt_inputs(job_description, resume_text, compaction_report)
+    hold_back_fn = None
+    if entry_selector is not None:
+        resume_tokens = estimate_tokens(resume_text)
+        hold_back_fn = lambda sections: entry_selector.hold_back_sections(sections, job_description, resume_tokens)
+    tailored_text_or_error, report = tailor_sections(
+        resume_text, job_description, _generate_section_text, max_workers=SECTION_CONCURRENCY, hold_back_fn=hold_back_fn
     )
-    safety_settings = [
-        {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-        {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-        {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-        {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-    ]
+    if report:
+        print(f"Section tailoring: {report['model_calls']} model calls, {report['passed_through']} sections passed through "
+              f"({report['held_back']} low-relevance entries), "
+              f"{report['wall_seconds']}s wall vs ~{report['serial_seconds_estimate']}s serial "
+              f"(saved ~{report['seconds_saved_estimate']}s).")
+        if section_report is not None:
+            section_report.update(report)
+    return tailored_text_or_error
 
+def _chunk_text(chunk):
     try:
-        print(f"Sending request to Gemini model: {model_name}...")
+        if not chunk.candidates or not chunk.candidates[0].content.parts:
+            return ""
+        return "".join(part.text for part in chunk.candidates[0].content.parts if hasattr(part, 'text'))
+    except Exception:
+        return ""
+
+def stream_tailored_resume_with_gemini(job_description, resume_text):
+    # Yields ("chunk", text) as the model generates, then exactly one ("done", tailored_text_or_error)
+    if not resume_text:
+        yield "done", "Error: Resume text is empty. Cannot process."
+        return
+    if not job_description:
+        yield "done", "Error: Job description is empty. Cannot process."
+        return
+
+    job_description, resume_text = prepare_prompt_inputs(job_description, resume_text)
+    resume_text, held_entries = select_prompt_entries(job_description, resume_text)
+    prompt = build_tailoring_prompt(job_description, resume_text, bool(held_entries))
+    model_name = route_tailoring_model(prompt, resume_text)
+    cache_key = None
+    if llm_cache is not None:
+        cache_key = make_llm_cache_key(model_name, GENERATION_CONFIG, job_description, resume_text)
+        cached_text = llm_cache.get(cache_key)
+        if cached_text is not None:
+            cached_text = restore_prompt_entries(cached_text, held_entries)
+            yield "chunk", cached_text
+            yield "done", cached_text
+            return
+
+    model, error_message = _init_gemini_model(model_name)
+    if error_message:
+        ai_errors.inc(error_class=_ai_error_class(error_message))
+        yield "done", error_message
+        return
+
+    response, model_started = None, None
+    try:
+        # Streams are not retried or hedged (chunks may already be out), but they count against the quota and breaker
+        if upstream_guard is not None:
+            upstream_guard.acquire(cost_tokens=estimate_tokens(prompt))
+        print(f"Sending streaming request to Gemini model: {model_name}...")
+        model_started = time.perf_counter()
         response = model.generate_content(
             prompt,
-            generation_config=generation_config,
-            safety_settings=safety_settings
+            generation_config=llm_backend.make_generation_config(GENERATION_CONFIG),
+            safety_settings=SAFETY_SETTINGS,
+            stream=True
         )
-
-        if not response.candidates:
-            block_reason_msg = "Unknown (no candidates)"
-            if response.prompt_feedback and response.prompt_feedback.block_reason:
-                block_reason_msg = response.prompt_feedback.block_reason.name
-            error_message = f"Error: AI content generation failed. The request might have been blocked. Reason: {block_reason_msg}."
-            if hasattr(response, 'prompt_feedback') and response.prompt_feedback:
-                 error_message += f" Prompt Feedback: {response.prompt_feedback}"
-            print(error_message)
-            return error_message
-
-        if not response.candidates[0].content.parts:
-            error_message = "Error: AI response is empty or not in the expected format (no parts)."
-            print(error_message)
-            return error_message
-        
-        tailored_text = "".join(part.text for part in response.candidates[0].content.parts if hasattr(part, 'text'))
-        
-        if not tailored_text.strip():
-            finish_reason = "UNKNOWN"
-            if response.candidates[0].finish_reason:
-                 finish_reason = response.candidates[0].finish_reason.name
-            error_message = f"Error: AI generated an empty response. Finish Reason: {finish_reason}."
-            if response.candidates[0].safety_ratings:
-                error_message += f" Safety Ratings: {response.candidates[0].safety_ratings}"
-            print(error_message)
-            return error_message
-
-        print("Successfully received response from Gemini.")
-        return tailored_text.strip()
-
+        # Held-back entries are swapped back in as their markers stream past
+        held_stream = HeldEntryStream(held_entries) if held_entries else None
+        for chunk in response:
+            text = _chunk_text(chunk)
+            if text and held_stream is not None:
+                text = held_stream.feed(text)
+            if text:
+                yield "chunk", text
+        if held_stream is not None:
+            text = held_stream.flush()
+            if text:
+                yield "chunk", text
+        # The streamed response aggregates candidates, so the usual safety/finish-reason checks apply
+        tailored_text_or_error = _extract_tailored_text(response)
+        if upstream_guard is not None:
+            upstream_guard.record_success()
+    except UpstreamBusyError as e:
+        tailored_text_or_error = _upstream_busy_to_error(e)
     except Exception as e:
-        error_type = type(e).__name__
-        print(f"Gemini API call error ({error_type}): {e}")
-        traceback.print_exc()
-        error_details = str(e)
-        if "API key not valid" in error_details or "PERMISSION_DENIED" in error_details:
-            return "Error: AI API Key is invalid or lacks permissions. Please check your key and API settings."
-        if "Quota" in error_details or "RESOURCE_EXHAUSTED" in error_details:
-            return "Error: AI API quota exceeded. Please check your usage limits or try again later."
-        return f"Error during AI resume tailoring: {e}"
+        tailored_text_or_error = _stream_stop_to_error(e)
+        if tailored_text_or_error is not None:
+            # A refusal is an answer, as in the non-streaming path, not an upstream failure
+            if upstream_guard is not None:
+                upstream_guard.record_success()
+        else:
+            if upstream_guard is not None:
+                upstream_guard.record_failure(e)
+            tailored_text_or_error = _gemini_exception_to_error(e)
+    if model_started is not None:
+        # Includes the time the client took to consume the chunks
+        stage_seconds.observe(time.perf_counter() - model_started, stage='model')
+    _record_generation(prompt, response, tailored_text_or_error)
+
+    if cache_key is not None:
+        llm_cache.put(cache_key, tailored_text_or_error)
+    yield "done", restore_prompt_entries(tailored_text_or_error, held_entries)
 
 # --- DOCX Creation Function ---
 def create_docx_from_text_content(text_content, output_path):
-    doc = DocxDocument()
-    # Heuristic state for preventing multiple empty paragraphs
-    create_docx_from_text_content.last_line_empty = False 
-
-    for line in text_content.split('\n'):
-        stripped_line = line.strip()
-        
-        if not stripped_line:
-            if not create_docx_from_text_content.last_line_empty:
-                doc.add_paragraph('') 
-                create_docx_from_text_content.last_line_empty = True
-            continue # Skip processing further for empty lines
-        
-        create_docx_from_text_content.last_line_empty = False
-
-        # Basic heading detection (all caps, few words)
-        if stripped_line.isupper() and 1 < len(stripped_line.split()) < 5 and not stripped_line.endswith(('.', ':', ';', ',')):
-            try:
-                doc.add_heading(stripped_line.title(), level=1)
-            except Exception as e_heading:
-                print(f"Could not add heading '{stripped_line}': {e_heading}. Adding as paragraph.")
-                doc.add_paragraph(stripped_line)
-        # Bullet point detection
-        elif stripped_line.startswith(('* ', '- ', '• ')):
-            # Remove the bullet marker and leading space, then add with Word's bullet style
-            item_text = stripped_line[2:]
-            doc.add_paragraph(item_text, style='ListBullet')
-        elif stripped_line.startswith('o '): # another common bullet
-            item_text = stripped_line[2:]
-            doc.add_paragraph(item_text, style='ListBullet')
-        else:
-            doc.add_paragraph(stripped_line)
-    
+    # Rendering lives in docx_renderer: template loaded once per process, no shared per-call state
     try:
-        doc.save(output_path)
+        with stage_seconds.time(stage='render'):
+            get_docx_renderer().render(text_content, output_path)
+        bytes_processed.inc(output_path.tell() if hasattr(output_path, 'tell') else os.path.getsize(output_path),
+                            kind='document')
         print(f"DOCX saved to {output_path}")
     except Exception as e:
         print(f"Error saving DOCX file {output_path}: {e}")
         traceback.print_exc()
         raise
-    finally:
-        # Clean up state attribute
-        if hasattr(create_docx_from_text_content, "last_line_empty"):
-            delattr(create_docx_from_text_content, "last_line_empty")
-
 
-# --- Flask Route ---
-@app.route('/tailor_resume', methods=['POST'])
-def tailor_resume_route():
-    if 'resume' not in request.files:
-        return jsonify({"error": "No resume file part in the request."}), 400
-    if 'job_description' not in request.form:
-        return jsonify({"error": "No job_description part in the request."}), 400
 
-    file = request.files['resume']
-    jd_text = request.form.get('job_description', '').strip()
+# --- Flask Routes ---
+DOCX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
 
-    if not jd_text:
-        return jsonify({"error": "Job description cannot be empty."}), 400
-    if file.filename == '':
-        return jsonify({"error": "No resume file selected."}), 400
+def check_tailor_inputs(has_resume, resume_filename, job_description):
+    # Shared by the Flask routes and async_app. job_description is None when the part is missing.
+    # Returns (secure filename, None) or (None, error message)
+    if not has_resume:
+        return None, "No resume file part in the request."
+    if job_description is None:
+        return None, "No job_description part in the request."
+    if not job_description.strip():
+        return None, "Job description cannot be empty."
+    if resume_filename == '':
+        return None, "No resume file selected."
 
     # Validate file extension (optional but good practice)
     allowed_extensions = {'pdf', 'docx'}
-    filename = secure_filename(file.filename)
+    filename = secure_filename(resume_filename)
     file_ext = filename.split('.')[-1].lower()
     if file_ext not in allowed_extensions:
-        return jsonify({"error": "Invalid file type. Only PDF and DOCX are allowed."}), 400
+        return None, "Invalid file type. Only PDF and DOCX are allowed."
+    return filename, None
 
-    # Use a temporary directory that cleans up automatically
-    with tempfile.TemporaryDirectory() as tmpdirname:
-        try:
-            original_filepath = os.path.join(tmpdirname, filename)
-            file.save(original_filepath)
-            print(f"File '{filename}' saved temporarily to '{original_filepath}'")
+def _stored_resume_from_form():
+    # Returns (StoredResume, None) when the request sends resume_id instead of a file, (None, None)
+    # when it uploads a file, or (None, error_response)
+    resume_id = request.form.get('resume_id', '').strip()
+    if not resume_id or 'resume' in request.files:
+        return None, None
+    if resume_store is None:
+        return None, (jsonify({"error": "Stored resumes are disabled on this server. Upload the file instead."}), 400)
+    stored = resume_store.get(resume_id)
+    if stored is None:
+        return None, (jsonify({"error": "Resume not found. It may have expired; please upload it again."}), 404)
+    return stored, None
 
-            # 1. Extract text from resume
-            print("Extracting text from resume...")
-            resume_text = get_resume_text_from_file(original_filepath)
-            if not resume_text: # Check if extraction yielded any text
-                return jsonify({"error": "Could not extract any text from the resume. It might be image-based or empty."}), 400
-            print("Resume text extracted successfully.")
+def _validate_tailor_request():
+    # Returns (resume, jd_text, filename, None) or (None, None, None, error_response); resume is the
+    # uploaded file or the StoredResume named by resume_id, see read_resume_text
+    with stage_seconds.time(stage='upload'):
+        request.files # Reads and spools the multipart body (see SpoolingRequest)
+    bytes_processed.inc(request.content_length or 0, kind='upload')
+    stored, error_response = _stored_resume_from_form()
+    if error_response:
+        return None, None, None, error_response
+    resume = stored if stored is not None else request.files.get('resume')
+    filename, error_message = check_tailor_inputs(
+        resume is not None, resume.filename if resume is not None else None, request.form.get('job_description')
+    )
+    if error_message:
+        return None, None, None, (jsonify({"error": error_message}), 400)
+    return resume, request.form['job_description'].strip(), filename, None
 
-            # 2. Tailor resume with AI
-            print("Sending to AI for tailoring...")
-            tailored_text_or_error = tailor_resume_with_gemini(jd_text, resume_text)
-            
-            if tailored_text_or_error.startswith("Error:"):
-                 print(f"AI Tailoring Error: {tailored_text_or_error}")
-                 user_error_message = tailored_text_or_error # Be more specific with AI errors
-                 if "API Key" in tailored_text_or_error or "quota" in tailored_text_or_error.lower():
-                     user_error_message = "An issue occurred with the AI service. Please try again later."
-                 return jsonify({"error": user_error_message}), 500
-            print("AI tailoring successful.")
-
-            # 3. Create a new DOCX file
-            tailored_docx_filename = f"tailored_{filename.rsplit('.',1)[0]}.docx"
+def _user_facing_ai_error(tailored_text_or_error):
+    user_error_message = tailored_text_or_error # Be more specific with AI errors
+    if _is_upstream_saturated(tailored_text_or_error):
+        user_error_message = "The AI service is busy right now. Please try again in a few seconds."
+    elif "API Key" in tailored_text_or_error:
+        user_error_message = "An issue occurred with the AI service. Please try again later."
+    return user_error_message
+
+def _is_upstream_saturated(tailored_text_or_error):
+    return tailored_text_or_error.startswith(AI_BUSY_ERROR) or "quota" in tailored_text_or_error.lower()
+
+def ai_error_payload(tailored_text_or_error):
+    # Returns (payload, status, headers). Quota/busy errors are temporary: 503 with Retry-After
+    # so clients back off instead of hammering
+    payload = {"error": _user_facing_ai_error(tailored_text_or_error)}
+    if _is_upstream_saturated(tailored_text_or_error):
+        retry_after = upstream_guard.retry_after_seconds() if upstream_guard is not None else 30
+        return payload, 503, {"Retry-After": str(retry_after)}
+    return payload, 500, {}
+
+def _ai_error_response(tailored_text_or_error):
+    payload, status, headers = ai_error_payload(tailored_text_or_error)
+    return jsonify(payload), status, headers
+
+@app.errorhandler(ParserBusyError)
+def _parser_busy_response(e):
+    print(f"Rejecting upload: {e}")
+    return jsonify({"error": "The server is busy reading other resumes. Please try again shortly."}), 503, {"Retry-After": str(e.retry_after)}
+
+@app.errorhandler(413)
+def _upload_too_large_response(e):
+    return jsonify({"error": f"The upload is too large. The maximum is {MAX_UPLOAD_BYTES // (1024 * 1024)}MB."}), 413
+
+def server_timing_header(stage_timings):
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in stage_timings.items())
+
+def compaction_headers(compaction_report, section_report=None):
+    headers = {}
+    if compaction_report and "tokens_after" in compaction_report:
+        headers['X-Input-Tokens-Estimated'] = str(compaction_report["tokens_after"])
+        headers['X-Input-Tokens-Saved'] = str(compaction_report["tokens_saved"])
+    if compaction_report and "entries_held_back" in compaction_report:
+        headers['X-Resume-Entries-Held-Back'] = str(compaction_report["entries_held_back"])
+    if section_report and section_report.get("held_back"):
+        headers['X-Resume-Entries-Held-Back'] = str(section_report["held_back"])
+    if section_report:
+        headers['X-Section-Model-Calls'] = str(section_report["model_calls"])
+        headers['X-Section-Seconds-Saved'] = str(section_report["seconds_saved_estimate"])
+    return headers
+
+def _with_server_timing(response, stage_timings):
+    response.headers['Server-Timing'] = server_timing_header(stage_timings)
+    return response
+
+def _with_compaction_headers(response, compaction_report, section_report=None):
+    response.headers.update(compaction_headers(compaction_report, section_report))
+    return response
+
+def _tailored_docx_filename(filename):
+    return f"tailored_{filename.rsplit('.',1)[0]}.docx"
+
+@app.route('/tailor_resume', methods=['POST'])
+@request_profiler.sample
+def tailor_resume_route():
+    resume, jd_text, filename, error_response = _validate_tailor_request()
+    if error_response:
+        return error_response
+    tailoring_mode = request.form.get('mode', TAILORING_MODE).lower()
+    if tailoring_mode not in TAILORING_MODES:
+        return jsonify({"error": f"Invalid mode. Use one of: {', '.join(TAILORING_MODES)}."}), 400
+
+    stage_timings = {} # Reported in the Server-Timing header, see benchmarks/bench_tailor.py
+    try:
+        # 1. Extract text from resume
+        print("Extracting text from resume...")
+        stage_started = time.perf_counter()
+        resume_text = read_resume_text(resume, filename)
+        stage_timings["extract"] = time.perf_counter() - stage_started
+        if not resume_text: # Check if extraction yielded any text
+            return jsonify({"error": "Could not extract any text from the resume. It might be image-based or empty."}), 400
+        print("Resume text extracted successfully.")
+
+        # 2. Tailor resume with AI
+        print("Sending to AI for tailoring...")
+        stage_started = time.perf_counter()
+        compaction_report, section_report = {}, {}
+        if tailoring_mode == 'sections':
+            tailored_text_or_error = tailor_resume_by_sections(jd_text, resume_text, compaction_report, section_report)
+        else:
+            tailored_text_or_error = tailor_resume_with_gemini(jd_text, resume_text, compaction_report)
+        stage_timings["generate"] = time.perf_counter() - stage_started
+        
+        if tailored_text_or_error.startswith("Error:"):
+             print(f"AI Tailoring Error: {tailored_text_or_error}")
+             return _ai_error_response(tailored_text_or_error)
+        print("AI tailoring successful.")
+
+        # 3. Create a new DOCX file
+        tailored_docx_filename = _tailored_docx_filename(filename)
+
+        if IN_MEMORY_PIPELINE:
+            print("Creating tailored DOCX in memory...")
+            stage_started = time.perf_counter()
+            docx_buffer = render_docx_to_buffer(tailored_text_or_error)
+            stage_timings["render"] = time.perf_counter() - stage_started
+            print("Tailored DOCX created.")
+            return _with_compaction_headers(_with_server_timing(send_file(
+                docx_buffer,
+                as_attachment=True,
+                mimetype=DOCX_MIMETYPE,
+                download_name=tailored_docx_filename
+            ), stage_timings), compaction_report, section_report)
+
+        # Use a temporary directory that cleans up automatically
+        with tempfile.TemporaryDirectory() as tmpdirname:
             tailored_docx_path = os.path.join(tmpdirname, tailored_docx_filename)
             
             print(f"Creating tailored DOCX at {tailored_docx_path}...")
+            stage_started = time.perf_counter()
             create_docx_from_text_content(tailored_text_or_error, tailored_docx_path)
+            stage_timings["render"] = time.perf_counter() - stage_started
             print("Tailored DOCX created.")
 
-            return send_file(
+            return _with_compaction_headers(_with_server_timing(send_file(
                 tailored_docx_path,
                 as_attachment=True,
-                mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+                mimetype=DOCX_MIMETYPE,
                 download_name=tailored_docx_filename # Use the generated name
-            )
+            ), stage_timings), compaction_report, section_report)
+            # tmpdirname and its contents are automatically cleaned up here
 
-        except ValueError as ve: # Catch errors from text extraction or unsupported format
-            print(f"ValueError: {ve}")
-            traceback.print_exc()
-            return jsonify({"error": str(ve)}), 400
+    except ParserBusyError as e:
+        return _parser_busy_response(e)
+    except ValueError as ve: # Catch errors from text extraction or unsupported format
+        print(f"ValueError: {ve}")
+        traceback.print_exc()
+        return jsonify({"error": str(ve)}), 400
+    except Exception as e:
+        print(f"An unexpected error occurred in /tailor_resume: {e}")
+        traceback.print_exc()
+        return jsonify({"error": "An unexpected server error occurred. Please try again."}), 500
+
+def _sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+@app.route('/tailor_resume/stream', methods=['POST'])
+def tailor_resume_stream_route():
+    resume, jd_text, filename, error_response = _validate_tailor_request()
+    if error_response:
+        return error_response
+
+    # Extraction happens before the stream starts so upload/format errors still get a normal 400
+    try:
+        print("Extracting text from resume...")
+        resume_text = read_resume_text(resume, filename)
+    except ParserBusyError as e:
+        return _parser_busy_response(e)
+    except ValueError as ve:
+        print(f"ValueError: {ve}")
+        traceback.print_exc()
+        return jsonify({"error": str(ve)}), 400
+    except Exception as e:
+        print(f"An unexpected error occurred in /tailor_resume/stream: {e}")
+        traceback.print_exc()
+        return jsonify({"error": "An unexpected server error occurred. Please try again."}), 500
+    if not resume_text:
+        return jsonify({"error": "Could not extract any text from the resume. It might be image-based or empty."}), 400
+
+    tailored_docx_filename = _tailored_docx_filename(filename)
+
+    def generate_events():
+        try:
+            for kind, text in stream_tailored_resume_with_gemini(jd_text, resume_text):
+                if kind == "chunk":
+                    yield _sse_event("chunk", {"text": text})
+                    continue
+
+                if text.startswith("Error:"):
+                    print(f"AI Tailoring Error: {text}")
+                    yield _sse_event("error", {"error": _user_facing_ai_error(text)})
+                    return
+
+                token = download_store.put(render_docx_to_buffer(text).getvalue(), tailored_docx_filename)
+                # "text" is the final resume the DOCX was rendered from. Clients should show it in
+                # place of the concatenated chunks: when the model dropped a [[KEEP]] marker, the
+                # chunks carry that entry at the end rather than in its place.
+                yield _sse_event("done", {
+                    "download_url": f"/tailor_resume/download/{token}",
+                    "filename": tailored_docx_filename,
+                    "text": text,
+                })
         except Exception as e:
-            print(f"An unexpected error occurred in /tailor_resume: {e}")
+            print(f"An unexpected error occurred while streaming /tailor_resume/stream: {e}")
             traceback.print_exc()
-            return jsonify({"error": "An unexpected server error occurred. Please try again."}), 500
-        # tmpdirname and its contents are automatically cleaned up here
+            yield _sse_event("error", {"error": "An unexpected server error occurred. Please try again."})
+
+    return Response(
+        generate_events(),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route('/tailor_resume/download/<token>', methods=['GET'])
+def download_tailored_resume_route(token):
+    entry = download_store.get(token)
+    if entry is None:
+        return jsonify({"error": "Download not found or expired."}), 404
+    data, tailored_docx_filename = entry
+    return send_file(
+        io.BytesIO(data),
+        as_attachment=True,
+        mimetype=DOCX_MIMETYPE,
+        download_name=tailored_docx_filename
+    )
+
+# --- Batch API ---
+BATCH_MAX_JOB_DESCRIPTIONS = int(os.getenv('BATCH_MAX_JOB_DESCRIPTIONS', 50))
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', 5))
+
+@app.route('/tailor_resume/batch', methods=['POST'])
+@request_profiler.sample
+def tailor_resume_batch_route():
+    resume, error_response = _stored_resume_from_form()
+    if error_response:
+        return error_response
+    if resume is not None:
+        filename = resume.filename
+    else:
+        if 'resume' not in request.files:
+            return jsonify({"error": "No resume file part in the request."}), 400
+        resume = request.files['resume']
+        if resume.filename == '':
+            return jsonify({"error": "No resume file selected."}), 400
+        filename = secure_filename(resume.filename)
+        if filename.split('.')[-1].lower() not in {'pdf', 'docx'}:
+            return jsonify({"error": "Invalid file type. Only PDF and DOCX are allowed."}), 400
+
+    try:
+        job_descriptions = parse_job_descriptions(
+            request.form.getlist('job_descriptions'), request.form.getlist('job_description')
+        )
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    if not job_descriptions:
+        return jsonify({"error": "At least one job description is required."}), 400
+    if len(job_descriptions) > BATCH_MAX_JOB_DESCRIPTIONS:
+        return jsonify({"error": f"Too many job descriptions. The maximum is {BATCH_MAX_JOB_DESCRIPTIONS}."}), 400
+
+    # Extract once, then fan the AI calls out
+    try:
+        resume_text = read_resume_text(resume, filename)
+    except ParserBusyError as e:
+        return _parser_busy_response(e)
+    except ValueError as ve:
+        print(f"ValueError: {ve}")
+        traceback.print_exc()
+        return jsonify({"error": str(ve)}), 400
+    except Exception as e:
+        print(f"An unexpected error occurred in /tailor_resume/batch: {e}")
+        traceback.print_exc()
+        return jsonify({"error": "An unexpected server error occurred. Please try again."}), 500
+    if not resume_text:
+        return jsonify({"error": "Could not extract any text from the resume. It might be image-based or empty."}), 400
+
+    base_name = _tailored_docx_filename(filename).rsplit('.', 1)[0]
+    print(f"Batch tailoring '{filename}' against {len(job_descriptions)} job descriptions...")
+
+    def tailor_one(indexed_jd):
+        index, jd = indexed_jd
+        tailored_text_or_error = tailor_resume_with_gemini(jd["text"], resume_text)
+        if tailored_text_or_error.startswith("Error:"):
+            print(f"AI Tailoring Error for JD #{index + 1}: {tailored_text_or_error}")
+            raise ValueError(_user_facing_ai_error(tailored_text_or_error))
+        docx_bytes = render_docx_to_buffer(tailored_text_or_error).getvalue()
+        return batch_entry_name(base_name, index, jd["title"]), docx_bytes
+
+    manifest = []
+
+    def zip_entries():
+        indexed_jds = list(enumerate(job_descriptions))
+        for index, result, error, elapsed in fan_out(indexed_jds, tailor_one, BATCH_CONCURRENCY):
+            item = {"index": index + 1, "title": job_descriptions[index]["title"]}
+            if error is not None:
+                item["status"] = "error"
+                item["error"] = str(error) if isinstance(error, ValueError) else "An unexpected server error occurred."
+            else:
+                archive_name, data = result
+                item.update(status="ok", filename=archive_name, elapsed_seconds=round(elapsed, 3))
+                yield archive_name, data
+            manifest.append(item)
+
+    def build_manifest():
+        items = sorted(manifest, key=lambda item: item["index"])
+        succeeded = sum(1 for item in items if item["status"] == "ok")
+        print(f"Batch finished: {succeeded}/{len(items)} succeeded.")
+        return {"resume": filename, "total": len(items), "succeeded": succeeded,
+                "failed": len(items) - succeeded, "items": items}
+
+    return Response(
+        iter_zip_stream(zip_entries(), build_manifest),
+        mimetype='application/zip',
+        headers={"Content-Disposition": f"attachment; filename={base_name}_batch.zip"}
+    )
+
+# --- Local JD Match Scoring ---
+SCORE_MAX_FILES = int(os.getenv('SCORE_MAX_FILES', 100))
+SCORE_MAX_TEXTS = int(os.getenv('SCORE_MAX_TEXTS', 10000))
+
+def _score_inputs_from_json(payload):
+    # Returns (jd_text, [(label, text)], top_k) from {"job_description", "resumes": [str | {"id", "text"}], "top_k"}
+    resumes = payload.get('resumes')
+    if not isinstance(resumes, list):
+        raise ValueError("'resumes' must be a list of texts or {\"id\", \"text\"} objects.")
+    if len(resumes) > SCORE_MAX_TEXTS:
+        raise ValueError(f"Too many resumes. The maximum is {SCORE_MAX_TEXTS}.")
+    labelled = []
+    for index, resume in enumerate(resumes):
+        if isinstance(resume, dict):
+            labelled.append((str(resume.get('id', index)), str(resume.get('text') or '')))
+        else:
+            labelled.append((str(index), str(resume or '')))
+    return str(payload.get('job_description') or '').strip(), labelled, payload.get('top_k')
+
+def _score_inputs_from_upload():
+    # Returns (jd_text, [(filename, text)], top_k, errors) from multipart resume/resumes files
+    files = request.files.getlist('resumes') + request.files.getlist('resume')
+    if not files:
+        raise ValueError("No resume files in the request. Upload them as 'resumes' (or 'resume').")
+    if len(files) > SCORE_MAX_FILES:
+        raise ValueError(f"Too many resume files. The maximum is {SCORE_MAX_FILES}.")
+    labelled, errors = [], []
+    for file in files:
+        filename = secure_filename(file.filename or '')
+        if filename.split('.')[-1].lower() not in {'pdf', 'docx'}:
+            errors.append({"filename": filename, "error": "Invalid file type. Only PDF and DOCX are allowed."})
+            continue
+        try:
+            labelled.append((filename, extract_resume_text(file.stream, filename)))
+        except ValueError as ve:
+            errors.append({"filename": filename, "error": str(ve)})
+    return request.form.get('job_description', '').strip(), labelled, request.form.get('top_k'), errors
+
+@app.route('/score', methods=['POST'])
+def score_route():
+    # Ranks one or many resumes against a JD locally (no model call): TF-IDF similarity plus keyword coverage
+    try:
+        if request.is_json:
+            jd_text, labelled, top_k = _score_inputs_from_json(request.get_json(silent=True) or {})
+            errors = []
+        else:
+            jd_text, labelled, top_k, errors = _score_inputs_from_upload()
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    try:
+        top_k = int(top_k) if top_k not in (None, '') else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "top_k must be an integer."}), 400
+    if top_k is not None and top_k < 1:
+        return jsonify({"error": "top_k must be at least 1."}), 400
+    if not jd_text:
+        return jsonify({"error": "Job description cannot be empty."}), 400
+    if not labelled:
+        return jsonify({"error": "No resume text to score.", "errors": errors}), 400
+
+    started = time.perf_counter()
+    with stage_seconds.time(stage='score'):
+        job_keywords, ranked = rank_resumes(jd_text, [text for _, text in labelled], top_k=top_k,
+                                            vector_cache=score_vector_cache)
+    results = [{"id": labelled[index][0], "rank": rank, **result} for rank, (index, result) in enumerate(ranked, start=1)]
+    return jsonify({
+        "job_keywords": job_keywords,
+        "scored": len(labelled),
+        "results": results,
+        "errors": errors,
+        "took_ms": round((time.perf_counter() - started) * 1000, 1),
+    })
+
+# --- Stored Resumes ---
+@app.route('/resumes', methods=['POST'])
+def store_resume_route():
+    # Upload once, tailor many times: returns a resume_id to send instead of the file
+    if resume_store is None:
+        return jsonify({"error": "Stored resumes are disabled on this server."}), 404
+    with stage_seconds.time(stage='upload'):
+        file = request.files.get('resume')
+    if file is None:
+        return jsonify({"error": "No resume file part in the request."}), 400
+    if file.filename == '':
+        return jsonify({"error": "No resume file selected."}), 400
+    filename = secure_filename(file.filename)
+    if filename.split('.')[-1].lower() not in {'pdf', 'docx'}:
+        return jsonify({"error": "Invalid file type. Only PDF and DOCX are allowed."}), 400
+
+    data = file.read()
+    bytes_processed.inc(len(data), kind='upload')
+    content_hash = content_hash_for(data, filename)
+    stored = resume_store.get_by_hash(content_hash)
+    if stored is not None: # Same file uploaded before: no parsing, same id
+        return jsonify({**stored.public_view(), "created": False}), 200
+
+    try:
+        resume_text = extract_resume_text(io.BytesIO(data), filename)
+    except ParserBusyError as e:
+        return _parser_busy_response(e)
+    except ValueError as ve:
+        print(f"ValueError: {ve}")
+        return jsonify({"error": str(ve)}), 400
+    except Exception as e:
+        print(f"An unexpected error occurred in /resumes: {e}")
+        traceback.print_exc()
+        return jsonify({"error": "An unexpected server error occurred. Please try again."}), 500
+    if not resume_text:
+        return jsonify({"error": "Could not extract any text from the resume. It might be image-based or empty."}), 400
+
+    resume_id, created = resume_store.put(content_hash, filename, resume_text)
+    stored = resume_store.get(resume_id, touch=False)
+    return jsonify({**stored.public_view(), "created": created}), 201 if created else 200
+
+@app.route('/resumes/<resume_id>', methods=['GET'])
+def stored_resume_route(resume_id):
+    stored = resume_store.get(resume_id, touch=False) if resume_store is not None else None
+    if stored is None:
+        return jsonify({"error": "Resume not found."}), 404
+    include_text = request.args.get('text', 'false').lower() in ('true', '1', 't')
+    return jsonify(stored.public_view(include_text=include_text))
+
+@app.route('/resumes/<resume_id>', methods=['DELETE'])
+def delete_stored_resume_route(resume_id):
+    if resume_store is None or not resume_store.delete(resume_id):
+        return jsonify({"error": "Resume not found."}), 404
+    return '', 204
+
+@app.route('/resume_store/stats', methods=['GET'])
+def resume_store_stats_route():
+    if resume_store is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **resume_store.stats()})
+
+# --- Job API ---
+def _run_tailoring_job(resume, filename, jd_text):
+    resume_text = read_resume_text(resume, filename)
+    if not resume_text:
+        raise JobFailedError("Could not extract any text from the resume. It might be image-based or empty.")
+
+    tailored_text_or_error = tailor_resume_with_gemini(jd_text, resume_text)
+    if tailored_text_or_error.startswith("Error:"):
+        print(f"AI Tailoring Error: {tailored_text_or_error}")
+        raise JobFailedError(_user_facing_ai_error(tailored_text_or_error))
+
+    return render_docx_to_buffer(tailored_text_or_error).getvalue(), _tailored_docx_filename(filename)
+
+@app.route('/jobs', methods=['POST'])
+def submit_job_route():
+    resume, jd_text, filename, error_response = _validate_tailor_request()
+    if error_response:
+        return error_response
+
+    if not isinstance(resume, StoredResume):
+        resume = resume.read()
+    try:
+        job_id = job_queue.submit(_run_tailoring_job, resume, filename, jd_text, filename=filename)
+    except JobQueueFullError as e:
+        print(f"Rejecting job: {e}")
+        return jsonify({"error": "The server is busy. Please try again shortly."}), 429, {"Retry-After": "5"}
+
+    return jsonify({
+        "job_id": job_id,
+        "status_url": f"/jobs/{job_id}",
+        "result_url": f"/jobs/{job_id}/result",
+    }), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status_route(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found or expired."}), 404
+    return jsonify(public_job_view(job))
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result_route(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found or expired."}), 404
+    if job['status'] == JOB_FAILED:
+        return jsonify({"error": job['error']}), 422
+    if job['status'] != JOB_DONE:
+        return jsonify({"error": "Job is not finished yet.", "status": job['status']}), 409
+    return send_file(
+        io.BytesIO(job['result']),
+        as_attachment=True,
+        mimetype=DOCX_MIMETYPE,
+        download_name=job['filename']
+    )
+
+@app.route('/jobs/stats', methods=['GET'])
+def job_stats_route():
+    return jsonify(job_queue.stats())
+
+@app.route('/extraction_cache/stats', methods=['GET'])
+def extraction_cache_stats_route():
+    if extraction_cache is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **extraction_cache.stats()})
+
+@app.route('/compaction/stats', methods=['GET'])
+def compaction_stats_route():
+    return jsonify({"enabled": INPUT_COMPACTION_ENABLED, "token_budget": INPUT_TOKEN_BUDGET,
+                    **compaction_stats.snapshot(),
+                    "entry_selection": entry_selector.stats() if entry_selector is not None else None})
+
+@app.route('/upstream/stats', methods=['GET'])
+def upstream_stats_route():
+    if upstream_guard is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **upstream_guard.stats()})
+
+@app.route('/routing/stats', methods=['GET'])
+def routing_stats_route():
+    hedging = {"enabled": False} if request_hedger is None else {"enabled": True, **request_hedger.stats()}
+    return jsonify({**model_router.stats(), "hedging": hedging})
+
+# --- Metrics ---
+# Endpoints whose response body is a document; "send" is the time from returning it to closing the response
+SEND_TIMED_ENDPOINTS = {'tailor_resume_route', 'tailor_resume_batch_route', 'download_tailored_resume_route', 'job_result_route'}
+
+@app.after_request
+def record_request_metrics(response):
+    http_requests.inc(endpoint=request.endpoint or 'unmatched', status=response.status_code)
+    if request.endpoint in SEND_TIMED_ENDPOINTS:
+        request.environ['tailor.send_started'] = time.perf_counter()
+    return response
+
+def _send_timing_middleware(wsgi_app):
+    # File responses are passed straight through to the server (call_on_close never fires for them),
+    # so "send" is measured by wrapping the WSGI iterable and observing when the server closes it
+    def middleware(environ, start_response):
+        app_iter = wsgi_app(environ, start_response)
+        send_started = environ.get('tailor.send_started')
+        if send_started is None:
+            return app_iter
+        return ClosingIterator(app_iter, lambda: stage_seconds.observe(time.perf_counter() - send_started, stage='send'))
+    return middleware
+
+app.wsgi_app = _send_timing_middleware(app.wsgi_app)
+
+def _collect_component_metrics():
+    cache_lookups = []
+    if extraction_cache is not None:
+        stats = extraction_cache.stats()
+        for result in ('hits', 'disk_hits', 'misses'):
+            cache_lookups.append(({"cache": "extraction", "result": result}, stats[result]))
+    if llm_cache is not None:
+        stats = llm_cache.stats()
+        for result in ('hits', 'coalesced', 'misses'):
+            cache_lookups.append(({"cache": "llm", "result": result}, stats[result]))
+    if score_vector_cache is not None:
+        stats = score_vector_cache.stats()
+        for result in ('hits', 'misses'):
+            cache_lookups.append(({"cache": "score_vectors", "result": result}, stats[result]))
+    if resume_store is not None:
+        for result, count in resume_store.lookup_counts().items():
+            cache_lookups.append(({"cache": "resume_store", "result": result}, count))
+    yield 'tailor_cache_lookups_total', 'counter', 'Cache lookups by cache and result.', cache_lookups
+    if upstream_guard is not None:
+        stats = upstream_guard.stats()
+        yield ('tailor_upstream_events_total', 'counter', 'Rate limiter and circuit breaker events in this process.',
+               [({"event": event}, stats[event]) for event in ('retries', 'failures', 'throttled', 'shed', 'circuit_rejections')])
+        yield ('tailor_upstream_throttled_seconds_total', 'counter', 'Time spent waiting for request/token quota.',
+               [({}, stats["throttled_seconds"])])
+        yield ('tailor_upstream_circuit_open', 'gauge', '1 while the circuit breaker rejects calls.',
+               [({}, int(stats["circuit"] != 'closed'))])
+    if entry_selector is not None:
+        stats = entry_selector.stats()
+        yield ('tailor_entry_selection_total', 'counter', 'Resume entries seen and held back from rewriting, and markers the model dropped.',
+               [({"event": event}, stats[event]) for event in ('entries', 'entries_held_back', 'tokens_held_back', 'missing_markers')])
+    yield ('tailor_model_routed_total', 'counter', 'Generations routed to each model tier (including cache hits).',
+           [({"model": model_name}, count) for model_name, count in model_router.stats()["routed"].items()])
+    if request_hedger is not None:
+        stats = request_hedger.stats()
+        yield ('tailor_hedge_events_total', 'counter', 'Hedged model calls: calls, hedges sent, which request won, hedges skipped over budget.',
+               [({"event": event}, stats[event]) for event in ('calls', 'hedged', 'hedge_wins', 'primary_wins', 'over_budget')])
+    if parse_sandbox is not None:
+        stats = parse_sandbox.stats()
+        yield ('tailor_parse_events_total', 'counter', 'Sandboxed parse jobs and worker failures.',
+               [({"event": event}, stats[event]) for event in ('jobs', 'failed', 'rejected', 'timeouts', 'crashes', 'busy', 'workers_started', 'workers_recycled')])
+    yield 'tailor_profiles_captured_total', 'counter', 'Sampled request profiles written to disk.', [({}, request_profiler.captured)]
+
+metrics.register_collector(_collect_component_metrics)
+
+@app.route('/metrics', methods=['GET'])
+def metrics_route():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/parser/stats', methods=['GET'])
+def parser_stats_route():
+    if parse_sandbox is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **parse_sandbox.stats()})
+
+@app.route('/llm_cache/stats', methods=['GET'])
+def llm_cache_stats_route():
+    if llm_cache is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **llm_cache.stats()})
+
+# --- Startup ---
+def warmup():
+    # Pull in the heavy libraries and build the Gemini client before serving traffic
+    started = time.perf_counter()
+    get_docx_renderer() # Imports python-docx and loads the DOCX template
+    import PyPDF2 # noqa: F401
+    if entry_selector is not None:
+        import numpy # noqa: F401 # Entry scoring runs on every long resume
+    if parse_sandbox is not None:
+        parse_sandbox.start()
+    if llm_backend.name != 'gemini':
+        return time.perf_counter() - started
+    try:
+        model_registry.warmup(
+            model_router.models,
+            generation_configs=[GENERATION_CONFIG],
+            ping=os.getenv('WARMUP_PING', 'False').lower() in ('true', '1', 't')
+        )
+    except Exception as e:
+        print(f"Warning: Gemini warmup failed: {e}")
+    return time.perf_counter() - started
+
+startup_stats = {"import_seconds": round(time.perf_counter() - _import_started, 4), "warmup_seconds": None}
+if os.getenv('WARMUP_ON_STARTUP', 'False').lower() in ('true', '1', 't'):
+    startup_stats["warmup_seconds"] = round(warmup(), 4)
+    print(f"Warmup finished in {startup_stats['warmup_seconds']}s.")
+print(f"App module loaded in {startup_stats['import_seconds']}s.")
+
+@app.route('/startup_stats', methods=['GET'])
+def startup_stats_route():
+    return jsonify(startup_stats)
 
 if __name__ == '__main__':
     # Get FLASK_DEBUG from .env, default to False if not set or invalid
@@ -0,0 +1,296 @@
+import asyncio
+import functools
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+
+import app as pipeline
+from llm_cache import is_cacheable_result, make_llm_cache_key
+from parse_sandbox import ParserBusyError
+from upstream_guard import UpstreamBusyError
+
+# Native asyncio serving path: a plain ASGI application for POST /tailor_resume with the same
+# request/response contract as the Flask route. The model call uses the async Gemini client,
+# so slow upstream calls wait on the event loop instead of each holding a thread; extraction,
+# prompt compaction and DOCX rendering run on a small thread pool. Caches, the upstream guard,
+# the parse sandbox and /metrics are shared with app.py.
+#
+#   cd backend && uvicorn async_app:asgi_app --port 5001 --workers 2
+
+ASYNC_CPU_WORKERS = int(os.getenv('ASYNC_CPU_WORKERS', min(8, (os.cpu_count() or 1) + 2)))
+_cpu_executor = ThreadPoolExecutor(max_workers=ASYNC_CPU_WORKERS, thread_name_prefix='async-cpu')
+_in_flight = {} # AI cache key -> asyncio.Task, so identical concurrent requests share one model call
+
+
+class _UploadTooLarge(Exception):
+    pass
+
+
+async def run_blocking(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(_cpu_executor, functools.partial(fn, *args))
+
+
+# --- AI Tailoring ---
+async def generate_text_async(prompt, generation_config, model_name):
+    # Async twin of app._generate_text: one model round trip (two if hedged), the text or an "Error: ..." string
+    model, error_message = pipeline._init_gemini_model(model_name)
+    if error_message:
+        return error_message
+
+    async def call_model():
+        print(f"Sending async request to Gemini model: {model_name}...")
+        with pipeline.stage_seconds.time(stage='model'):
+            return await model.generate_content_async(
+                prompt,
+                generation_config=pipeline.llm_backend.make_generation_config(generation_config),
+                safety_settings=pipeline.SAFETY_SETTINGS
+            )
+
+    async def attempt():
+        if pipeline.upstream_guard is None:
+            return await call_model()
+        return await pipeline.upstream_guard.call_async(call_model, cost_tokens=pipeline.estimate_tokens(prompt))
+
+    response = None
+    try:
+        if pipeline.request_hedger is None:
+            response = await attempt()
+        else:
+            response = await pipeline.request_hedger.call_async(attempt, model_name)
+        tailored_text_or_error = pipeline._extract_tailored_text(response)
+    except UpstreamBusyError as e:
+        tailored_text_or_error = pipeline._upstream_busy_to_error(e)
+    except Exception as e:
+        tailored_text_or_error = pipeline._gemini_exception_to_error(e)
+    pipeline._record_generation(prompt, response, tailored_text_or_error)
+    return tailored_text_or_error
+
+
+async def _cached_generation(cache_key, generate):
+    cached = pipeline.llm_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    task = _in_flight.get(cache_key)
+    if task is None:
+        task = asyncio.ensure_future(generate())
+        _in_flight[cache_key] = task
+        task.add_done_callback(lambda _: _in_flight.pop(cache_key, None))
+    else:
+        print(f"Coalescing AI request {cache_key[:12]}... with an in-flight identical request.")
+    # shield: one client disconnecting must not cancel the call other requests are waiting on
+    result = await asyncio.shield(task)
+    if is_cacheable_result(result):
+        pipeline.llm_cache.put(cache_key, result)
+    return result
+
+
+async def tailor_resume_async(job_description, resume_text, compaction_report=None):
+    if not resume_text:
+        return "Error: Resume text is empty. Cannot process."
+    if not job_description:
+        return "Error: Job description is empty. Cannot process."
+
+    job_description, resume_text = await run_blocking(
+        pipeline.prepare_prompt_inputs, job_description, resume_text, compaction_report
+    )
+    resume_text, held_entries = await run_blocking(
+        pipeline.select_prompt_entries, job_description, resume_text, compaction_report
+    )
+    prompt = pipeline.build_tailoring_prompt(job_description, resume_text, bool(held_entries))
+    model_name = pipeline.route_tailoring_model(prompt, resume_text)
+    if pipeline.llm_cache is None:
+        result = await generate_text_async(prompt, pipeline.GENERATION_CONFIG, model_name)
+    else:
+        cache_key = make_llm_cache_key(model_name, pipeline.GENERATION_CONFIG, job_description, resume_text)
+        result = await _cached_generation(cache_key, lambda: generate_text_async(prompt, pipeline.GENERATION_CONFIG, model_name))
+    return pipeline.restore_prompt_entries(result, held_entries)
+
+
+# --- HTTP plumbing ---
+def _header(scope, name):
+    for key, value in scope.get('headers', []):
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+
+async def read_multipart(scope, receive):
+    # Returns (fields, files) as {name: str} and {name: (filename, bytes)}, first value per name.
+    # The upload limit is enforced as the body streams in, before it is fully received.
+    max_bytes = pipeline.MAX_UPLOAD_BYTES
+    content_length = _header(scope, b'content-length')
+    if max_bytes and content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise _UploadTooLarge()
+    mimetype, options = parse_options_header(_header(scope, b'content-type') or '')
+    boundary = options.get('boundary', '').encode('latin-1')
+    decoder = MultipartDecoder(boundary) if mimetype == 'multipart/form-data' and boundary else None
+
+    fields, files, received = {}, {}, 0
+    part, chunks = None, []
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise ConnectionError("Client disconnected during upload.")
+        body = message.get('body', b'')
+        more_body = message.get('more_body', False)
+        received += len(body)
+        if max_bytes and received > max_bytes:
+            raise _UploadTooLarge()
+        if decoder is None:
+            continue
+        decoder.receive_data(body)
+        if not more_body:
+            decoder.receive_data(None)
+        while True:
+            event = decoder.next_event()
+            if isinstance(event, (NeedData, Epilogue)):
+                break
+            if isinstance(event, (Field, File)):
+                part, chunks = event, []
+            elif isinstance(event, Data):
+                chunks.append(event.data)
+                if not event.more_data and part is not None:
+                    if isinstance(part, File):
+                        files.setdefault(part.name, (part.filename, b''.join(chunks)))
+                    else:
+                        fields.setdefault(part.name, b''.join(chunks).decode('utf-8', 'replace'))
+                    part = None
+    pipeline.bytes_processed.inc(received, kind='upload')
+    return fields, files
+
+
+def _response(status, body, content_type, headers=None):
+    header_list = [(b'content-type', content_type.encode('latin-1')),
+                   (b'content-length', str(len(body)).encode('latin-1')),
+                   (b'access-control-allow-origin', b'*')] # Same as CORS(app) in app.py
+    header_list += [(name.lower().encode('latin-1'), str(value).encode('latin-1')) for name, value in (headers or {}).items()]
+    return status, header_list, body
+
+
+def json_response(payload, status=200, headers=None):
+    return _response(status, json.dumps(payload).encode('utf-8'), 'application/json', headers)
+
+
+async def tailor_resume_endpoint(scope, receive):
+    # Mirrors app.tailor_resume_route: same form fields, status codes, error bodies and headers
+    try:
+        with pipeline.stage_seconds.time(stage='upload'):
+            fields, files = await read_multipart(scope, receive)
+    except _UploadTooLarge:
+        return json_response({"error": f"The upload is too large. The maximum is {pipeline.MAX_UPLOAD_BYTES // (1024 * 1024)}MB."}, 413)
+    resume_filename, resume = files.get('resume', (None, None))
+    resume_id = fields.get('resume_id', '').strip()
+    if resume_id and resume is None: # A stored resume (POST /resumes) instead of an upload
+        if pipeline.resume_store is None:
+            return json_response({"error": "Stored resumes are disabled on this server. Upload the file instead."}, 400)
+        resume = await run_blocking(pipeline.resume_store.get, resume_id)
+        if resume is None:
+            return json_response({"error": "Resume not found. It may have expired; please upload it again."}, 404)
+        resume_filename = resume.filename
+    filename, error_message = pipeline.check_tailor_inputs(resume is not None, resume_filename, fields.get('job_description'))
+    if error_message:
+        return json_response({"error": error_message}, 400)
+    jd_text = fields['job_description'].strip()
+    tailoring_mode = fields.get('mode', pipeline.TAILORING_MODE).lower()
+    if tailoring_mode not in pipeline.TAILORING_MODES:
+        return json_response({"error": f"Invalid mode. Use one of: {', '.join(pipeline.TAILORING_MODES)}."}, 400)
+
+    stage_timings = {}
+    try:
+        stage_started = time.perf_counter()
+        resume_text = await run_blocking(pipeline.read_resume_text, resume, filename)
+        stage_timings["extract"] = time.perf_counter() - stage_started
+        if not resume_text:
+            return json_response({"error": "Could not extract any text from the resume. It might be image-based or empty."}, 400)
+
+        stage_started = time.perf_counter()
+        compaction_report, section_report = {}, {}
+        if tailoring_mode == 'sections':
+            # Section mode keeps its thread-based fan-out (section_tailoring), run off the event loop
+            tailored_text_or_error = await run_blocking(
+                pipeline.tailor_resume_by_sections, jd_text, resume_text, compaction_report, section_report
+            )
+        else:
+            tailored_text_or_error = await tailor_resume_async(jd_text, resume_text, compaction_report)
+        stage_timings["generate"] = time.perf_counter() - stage_started
+        if tailored_text_or_error.startswith("Error:"):
+            print(f"AI Tailoring Error: {tailored_text_or_error}")
+            payload, status, headers = pipeline.ai_error_payload(tailored_text_or_error)
+            return json_response(payload, status, headers)
+
+        stage_started = time.perf_counter()
+        docx_buffer = await run_blocking(pipeline.render_docx_to_buffer, tailored_text_or_error)
+        stage_timings["render"] = time.perf_counter() - stage_started
+    except ParserBusyError as e:
+        print(f"Rejecting upload: {e}")
+        return json_response({"error": "The server is busy reading other resumes. Please try again shortly."}, 503,
+                             {"Retry-After": e.retry_after})
+    except ValueError as ve:
+        print(f"ValueError: {ve}")
+        return json_response({"error": str(ve)}, 400)
+    except Exception as e:
+        print(f"An unexpected error occurred in async /tailor_resume: {e}")
+        traceback.print_exc()
+        return json_response({"error": "An unexpected server error occurred. Please try again."}, 500)
+
+    return _response(200, docx_buffer.getvalue(), pipeline.DOCX_MIMETYPE, {
+        "Content-Disposition": f'attachment; filename="{pipeline._tailored_docx_filename(filename)}"',
+        "Server-Timing": pipeline.server_timing_header(stage_timings),
+        **pipeline.compaction_headers(compaction_report, section_report),
+    })
+
+
+async def metrics_endpoint(scope, receive):
+    return _response(200, pipeline.metrics.render().encode('utf-8'), 'text/plain; version=0.0.4; charset=utf-8')
+
+
+ROUTES = {
+    '/tailor_resume': ('POST', tailor_resume_endpoint),
+    '/metrics': ('GET', metrics_endpoint),
+}
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            _cpu_executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def asgi_app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+    route = ROUTES.get(scope['path'])
+    if route is None:
+        status, headers, body = json_response({"error": "Not found."}, 404)
+    elif scope['method'] == 'OPTIONS': # CORS preflight
+        status, headers, body = _response(204, b'', 'text/plain', {
+            "Access-Control-Allow-Methods": route[0], "Access-Control-Allow-Headers": "*"})
+    elif scope['method'] != route[0]:
+        status, headers, body = json_response({"error": "Method not allowed."}, 405, {"Allow": route[0]})
+    else:
+        status, headers, body = await route[1](scope, receive)
+    pipeline.http_requests.inc(endpoint=f"async:{scope['path']}", status=status)
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+if __name__ == '__main__':
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit("async_app needs an ASGI server: pip install uvicorn (or run it under any ASGI server).")
+    uvicorn.run(asgi_app, host='127.0.0.1', port=int(os.getenv('ASYNC_PORT', 5001)))
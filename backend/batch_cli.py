@@ -0,0 +1,284 @@
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+# Offline bulk tailoring from a JSONL manifest, one record per line:
+#
+#   {"resume": "in/jane.pdf", "job_description": "...", "output": "out/jane_acme.docx", "id": "optional"}
+#   {"resume": "in/joe.docx", "job_description_file": "jds/acme.txt", "output": "out/joe_acme.docx"}
+#
+# Relative paths are resolved against the manifest's directory. The manifest is streamed, never
+# loaded whole. Extraction runs in the parse sandbox's worker processes and rendering in a
+# process pool, while --concurrency threads wait on model calls, all through the same functions
+# as app.py (compaction, AI cache, upstream guard). Every finished item is appended to a JSONL
+# results log with per-stage timings, and a checkpoint records how far the manifest is fully
+# done, so rerunning the same command after an interruption resumes where it stopped.
+#
+#   cd backend && python batch_cli.py nightly.jsonl --concurrency 16 --workers 4
+
+CHECKPOINT_INTERVAL_SECONDS = 2.0
+
+
+# --- Render worker processes (only docx_renderer is imported there, not the app) ---
+def _ignore_interrupts():
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # Ctrl-C is handled by the parent, which shuts the pool down
+
+
+def render_to_file(text_content, output_path):
+    from docx_renderer import get_renderer
+    directory = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{output_path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        get_renderer().render(text_content, f)
+    os.replace(tmp_path, output_path) # A crash never leaves a half-written document behind
+    return os.path.getsize(output_path)
+
+
+# --- Manifest, results log and checkpoint ---
+def iter_manifest(manifest_path, start_line=1, start_offset=0):
+    # Yields (line_number, end_offset, raw_line) from start_offset without reading the rest of the file
+    with open(manifest_path, 'rb') as f:
+        f.seek(start_offset)
+        offset = start_offset
+        for line_number, raw_line in enumerate(f, start=start_line):
+            offset += len(raw_line)
+            yield line_number, offset, raw_line
+
+
+def load_checkpoint(checkpoint_path, manifest_path):
+    # Returns (next_line, byte_offset): everything before them has a result in the log
+    try:
+        with open(checkpoint_path, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+    except FileNotFoundError:
+        return 1, 0
+    except (OSError, ValueError) as e:
+        print(f"Warning: ignoring unreadable checkpoint {checkpoint_path}: {e}")
+        return 1, 0
+    if checkpoint.get('manifest') != os.path.abspath(manifest_path) or checkpoint['offset'] > os.path.getsize(manifest_path):
+        print(f"Warning: checkpoint {checkpoint_path} is for a different manifest; starting from the top.")
+        return 1, 0
+    return checkpoint['line'], checkpoint['offset']
+
+
+def save_checkpoint(checkpoint_path, manifest_path, next_line, offset):
+    tmp_path = checkpoint_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"manifest": os.path.abspath(manifest_path), "line": next_line, "offset": offset,
+                   "updated_at": time.time()}, f)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def load_finished_lines(results_path, from_line, only_ok):
+    # Lines past the checkpoint can finish out of order; the log says which ones already did
+    finished = set()
+    try:
+        with open(results_path, 'r', encoding='utf-8') as f:
+            for raw in f:
+                try:
+                    result = json.loads(raw)
+                except ValueError:
+                    continue # A line cut short by the interruption
+                if result.get('line', 0) >= from_line:
+                    if result.get('status') == 'ok' or not only_ok:
+                        finished.add(result['line'])
+                    elif only_ok:
+                        finished.discard(result['line'])
+    except FileNotFoundError:
+        pass
+    return finished
+
+
+class Watermark:
+    # Tracks the longest fully finished prefix of the manifest while items complete out of order
+    def __init__(self, next_line, offset):
+        self.next_line = next_line
+        self.offset = offset
+        self._finished = {} # line -> end offset
+
+    def finish(self, line, end_offset):
+        self._finished[line] = end_offset
+        while self.next_line in self._finished:
+            self.offset = self._finished.pop(self.next_line)
+            self.next_line += 1
+
+
+# --- Items ---
+def _resolve(base_dir, path):
+    return path if os.path.isabs(path) else os.path.join(base_dir, path)
+
+
+def parse_record(raw_line, base_dir):
+    # Returns (record id, resume path, JD text, output path); raises ValueError for bad records
+    try:
+        record = json.loads(raw_line)
+    except ValueError as e:
+        raise ValueError(f"Invalid JSON: {e}")
+    if not isinstance(record, dict):
+        raise ValueError("Each manifest line must be a JSON object.")
+    if not record.get('resume') or not record.get('output'):
+        raise ValueError("Records need 'resume' and 'output' paths.")
+    job_description = record.get('job_description')
+    if not job_description and record.get('job_description_file'):
+        with open(_resolve(base_dir, record['job_description_file']), 'r', encoding='utf-8') as f:
+            job_description = f.read()
+    if not job_description or not job_description.strip():
+        raise ValueError("Records need a non-empty 'job_description' or 'job_description_file'.")
+    return (record.get('id'), _resolve(base_dir, record['resume']), job_description.strip(),
+            _resolve(base_dir, record['output']))
+
+
+def process_item(app_module, render_pool, line, raw_line, base_dir, mode):
+    # Runs in a model-call thread; always returns a result record, never raises
+    result = {"line": line, "id": None, "status": "error"}
+    timings = {}
+    started = time.perf_counter()
+    try:
+        record_id, resume_path, jd_text, output_path = parse_record(raw_line, base_dir)
+        result.update(id=record_id, resume=resume_path, output=output_path)
+
+        stage_started = time.perf_counter()
+        with open(resume_path, 'rb') as f:
+            resume_bytes = f.read()
+        resume_text = app_module.get_resume_text_from_bytes(resume_bytes, os.path.basename(resume_path))
+        timings["extract"] = time.perf_counter() - stage_started
+        if not resume_text:
+            raise ValueError("Could not extract any text from the resume. It might be image-based or empty.")
+
+        stage_started = time.perf_counter()
+        compaction_report = {}
+        if mode == 'sections':
+            tailored_text_or_error = app_module.tailor_resume_by_sections(jd_text, resume_text, compaction_report)
+        else:
+            tailored_text_or_error = app_module.tailor_resume_with_gemini(jd_text, resume_text, compaction_report)
+        timings["generate"] = time.perf_counter() - stage_started
+        if tailored_text_or_error.startswith("Error:"):
+            raise ValueError(tailored_text_or_error)
+
+        stage_started = time.perf_counter()
+        result["output_bytes"] = render_pool.submit(render_to_file, tailored_text_or_error, output_path).result()
+        timings["render"] = time.perf_counter() - stage_started
+        result["status"] = "ok"
+        if compaction_report:
+            result["input_tokens"] = compaction_report["tokens_after"]
+    except Exception as e:
+        result["error"] = str(e) or type(e).__name__
+    timings["total"] = time.perf_counter() - started
+    result["timings"] = {stage: round(seconds, 4) for stage, seconds in timings.items()}
+    result["finished_at"] = time.time()
+    return result
+
+
+def run(args):
+    manifest_path = args.manifest
+    results_path = args.results or manifest_path + '.results.jsonl'
+    checkpoint_path = results_path + '.checkpoint'
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+
+    if args.retry_failed:
+        start_line, start_offset = 1, 0
+    else:
+        start_line, start_offset = load_checkpoint(checkpoint_path, manifest_path)
+    finished = load_finished_lines(results_path, start_line, only_ok=args.retry_failed)
+    if start_line > 1 or finished:
+        print(f"Resuming at manifest line {start_line} ({len(finished)} later items already finished).")
+
+    # Settings for the app module must be in place before it is imported
+    if args.workers:
+        os.environ['PARSE_WORKERS'] = str(args.workers)
+    import app as app_module
+
+    watermark = Watermark(start_line, start_offset)
+    counts = {"ok": 0, "error": 0, "skipped": 0}
+    stage_totals = {}
+    max_in_flight = args.concurrency * 2 # Bounds memory: the manifest is read only this far ahead
+    last_checkpoint = time.monotonic()
+    run_started = time.perf_counter()
+
+    render_pool = ProcessPoolExecutor(max_workers=args.workers or min(4, os.cpu_count() or 1),
+                                      mp_context=multiprocessing.get_context('spawn'), initializer=_ignore_interrupts)
+    model_pool = ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix='batch-model')
+    pending = {}
+
+    def record(future, results_log):
+        nonlocal last_checkpoint
+        line, end_offset = pending.pop(future)
+        result = future.result()
+        results_log.write(json.dumps(result) + "\n")
+        results_log.flush()
+        counts[result["status"]] += 1
+        for stage, seconds in result["timings"].items():
+            stage_totals[stage] = stage_totals.get(stage, 0.0) + seconds
+        if result["status"] != "ok":
+            print(f"Line {line} failed: {result['error']}")
+        watermark.finish(line, end_offset)
+        if time.monotonic() - last_checkpoint >= CHECKPOINT_INTERVAL_SECONDS:
+            save_checkpoint(checkpoint_path, manifest_path, watermark.next_line, watermark.offset)
+            last_checkpoint = time.monotonic()
+
+    interrupted = False
+    try:
+        with open(results_path, 'a', encoding='utf-8') as results_log:
+            try:
+                for line, end_offset, raw_line in iter_manifest(manifest_path, start_line, start_offset):
+                    if args.limit and counts["ok"] + counts["error"] + len(pending) >= args.limit:
+                        break
+                    if line in finished or not raw_line.strip():
+                        counts["skipped"] += bool(raw_line.strip())
+                        watermark.finish(line, end_offset)
+                        continue
+                    while len(pending) >= max_in_flight:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            record(future, results_log)
+                    future = model_pool.submit(process_item, app_module, render_pool, line,
+                                               raw_line.decode('utf-8', 'replace'), base_dir, args.mode)
+                    pending[future] = (line, end_offset)
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        record(future, results_log)
+            except KeyboardInterrupt:
+                interrupted = True
+                print(f"Interrupted; {len(pending)} in-flight items will be redone on the next run "
+                      "(waiting for running model calls; Ctrl-C again to abort).")
+    finally:
+        model_pool.shutdown(wait=not interrupted, cancel_futures=True)
+        render_pool.shutdown(wait=not interrupted, cancel_futures=True)
+        save_checkpoint(checkpoint_path, manifest_path, watermark.next_line, watermark.offset)
+
+    wall_seconds = time.perf_counter() - run_started
+    processed = counts["ok"] + counts["error"]
+    print(f"Processed {processed} items ({counts['ok']} ok, {counts['error']} failed, {counts['skipped']} already done) "
+          f"in {wall_seconds:.1f}s" + (f", {processed / wall_seconds:.2f} items/s" if processed else "") + ".")
+    if processed:
+        print("Mean stage seconds: " + ", ".join(f"{stage}={seconds / processed:.3f}"
+                                                for stage, seconds in stage_totals.items()))
+    print(f"Results: {results_path}")
+    return 130 if interrupted else (1 if counts["error"] else 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tailor resumes in bulk from a JSONL manifest.')
+    parser.add_argument('manifest', help='JSONL file of {"resume", "job_description" | "job_description_file", "output"} records')
+    parser.add_argument('--results', help='JSONL results log (default: <manifest>.results.jsonl)')
+    parser.add_argument('--concurrency', type=int, default=8, help='model calls in flight at once')
+    parser.add_argument('--workers', type=int, default=0, help='extraction and render worker processes each')
+    parser.add_argument('--mode', choices=('single', 'sections'), default='single')
+    parser.add_argument('--limit', type=int, default=0, help='stop after this many items (0 = all)')
+    parser.add_argument('--retry-failed', action='store_true',
+                        help='rescan the whole manifest and redo every item without an ok result')
+    args = parser.parse_args()
+    if args.concurrency < 1:
+        parser.error('--concurrency must be at least 1')
+    sys.exit(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+import io
+import json
+import re
+import time
+import traceback
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Fan-out helpers for tailoring one resume against many job descriptions,
+# streaming the results back as a ZIP archive as each one finishes.
+
+
+def parse_job_descriptions(raw_values, text_values=()):
+    # raw_values (the job_descriptions field) may hold a JSON list of strings or {"title", "text"}
+    # objects; anything that is not a JSON list, e.g. "[Remote] Senior Engineer...", is plain text.
+    # text_values (repeated job_description fields) are always plain text.
+    job_descriptions = []
+    values = [(raw, True) for raw in raw_values] + [(raw, False) for raw in text_values]
+    for raw, may_be_json in values:
+        raw = raw.strip()
+        if not raw:
+            continue
+        items = [raw]
+        if may_be_json and raw.startswith('['):
+            try:
+                decoded = json.loads(raw)
+            except json.JSONDecodeError:
+                decoded = None
+            if isinstance(decoded, list):
+                items = decoded
+        for item in items:
+            if isinstance(item, str):
+                title, text = None, item
+            elif isinstance(item, dict):
+                title, text = item.get('title'), item.get('text', '')
+            else:
+                raise ValueError("Each job description must be a string or an object with a 'text' field.")
+            if not isinstance(text, str) or not text.strip():
+                raise ValueError(f"Job description #{len(job_descriptions) + 1} is empty.")
+            job_descriptions.append({"title": title, "text": text.strip()})
+    return job_descriptions
+
+
+def batch_entry_name(base_name, index, title):
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', title or '').strip('_')[:40]
+    suffix = f"{index + 1:02d}_{slug}" if slug else f"{index + 1:02d}"
+    return f"{base_name}_{suffix}.docx"
+
+
+def fan_out(items, fn, max_workers):
+    # Yields (index, result, error, elapsed_seconds) in completion order; one failure never cancels the rest
+    def timed_call(item):
+        started = time.perf_counter()
+        return fn(item), time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='batch-tailor') as executor:
+        futures = {executor.submit(timed_call, item): index for index, item in enumerate(items)}
+        try:
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    result, elapsed = future.result()
+                    yield index, result, None, elapsed
+                except Exception as e:
+                    if not isinstance(e, ValueError):
+                        traceback.print_exc()
+                    yield index, None, e, None
+        finally:
+            # If the client goes away mid-stream, don't start the calls that haven't begun yet
+            for future in futures:
+                future.cancel()
+
+
+class _ZipStreamBuffer(io.RawIOBase):
+    # Unseekable sink for zipfile; bytes are drained and sent to the client after each entry
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip_stream(entries, manifest_fn):
+    # entries yields (archive_name, data); manifest_fn() is called once all entries are written
+    sink = _ZipStreamBuffer()
+    with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for archive_name, data in entries:
+            archive.writestr(archive_name, data)
+            yield sink.drain()
+        archive.writestr('manifest.json', json.dumps(manifest_fn(), indent=2))
+    yield sink.drain()
@@ -0,0 +1,164 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Concurrency and memory of the asyncio serving path (async_app) against the threaded Flask
+# deployment, with many slow model calls in flight at once (fake LLM backend). Each mode runs
+# in its own process so memory numbers don't mix:
+# - threaded: one thread per in-flight request (werkzeug's threaded server; gthread workers
+#   behave the same up to their thread limit, see --threads)
+# - async: every request is a coroutine on one event loop, driven through the ASGI interface
+#
+#   cd backend && python benchmarks/bench_async.py --requests 1000 --latency 2
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_tailor import encode_multipart, percentile  # noqa: E402
+from sample_resumes import JOB_DESCRIPTION, sample_resume  # noqa: E402
+
+
+def rss_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return 0
+
+
+class PeakSampler:
+    # Samples RSS and live thread count in the background while requests are in flight
+    def __init__(self, interval=0.02):
+        self.interval = interval
+        self.peak_rss = self.peak_threads = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_rss = max(self.peak_rss, rss_bytes())
+            self.peak_threads = max(self.peak_threads, threading.active_count())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_threaded(app_module, requests, threads):
+    client = app_module.app.test_client()
+
+    def one(request_body):
+        body, content_type = request_body
+        started = time.perf_counter()
+        response = client.post('/tailor_resume', data=body, content_type=content_type)
+        return response.status_code, time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=threads or len(requests)) as executor:
+        return list(executor.map(one, requests))
+
+
+async def asgi_post(asgi_app, path, body, content_type, chunk_size=64 * 1024):
+    scope = {'type': 'http', 'method': 'POST', 'path': path,
+             'headers': [(b'content-type', content_type.encode()), (b'content-length', str(len(body)).encode())]}
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)] or [b'']
+    sent = {}
+
+    async def receive():
+        chunk = chunks.pop(0)
+        return {'type': 'http.request', 'body': chunk, 'more_body': bool(chunks)}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            sent['status'] = message['status']
+
+    started = time.perf_counter()
+    await asgi_app(scope, receive, send)
+    return sent['status'], time.perf_counter() - started
+
+
+def run_async(asgi_app, requests):
+    async def main():
+        return await asyncio.gather(*(asgi_post(asgi_app, '/tailor_resume', body, content_type)
+                                      for body, content_type in requests))
+    return asyncio.run(main())
+
+
+def child(args):
+    os.environ.update({
+        'LLM_BACKEND': 'fake',
+        'FAKE_LLM_LATENCY_SECONDS': str(args.latency),
+        'LLM_REQUESTS_PER_MINUTE': '1000000', # no quota waits; we measure waiting on the model
+        'LLM_CACHE_ENABLED': 'False',
+        'WARMUP_ON_STARTUP': 'True',
+    })
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app as app_module
+        import async_app
+        filename, data = sample_resume(args.size, 'pdf')
+        requests = [encode_multipart({'job_description': f"{JOB_DESCRIPTION}\nRef #{i}"}, {'resume': (filename, data)})
+                    for i in range(args.requests + 1)]
+        # One request first so parser workers, caches and lazy imports are not part of the measurement
+        if args.mode == 'async':
+            run_async(async_app.asgi_app, requests[:1])
+        else:
+            run_threaded(app_module, requests[:1], 1)
+        baseline_rss, baseline_threads = rss_bytes(), threading.active_count()
+        started = time.perf_counter()
+        with PeakSampler() as sampler:
+            if args.mode == 'async':
+                results = run_async(async_app.asgi_app, requests[1:])
+            else:
+                results = run_threaded(app_module, requests[1:], args.threads)
+        wall_seconds = time.perf_counter() - started
+    latencies = sorted(elapsed for status, elapsed in results if status == 200)
+    print(json.dumps({
+        "mode": args.mode, "requests": len(results), "errors": sum(1 for status, _ in results if status != 200),
+        "wall_seconds": wall_seconds, "p50": percentile(latencies, 50), "p95": percentile(latencies, 95),
+        "extra_threads": sampler.peak_threads - baseline_threads,
+        "extra_rss_mb": max(0, sampler.peak_rss - baseline_rss) / (1024 * 1024),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Threaded vs asyncio serving: concurrency and memory.')
+    parser.add_argument('--requests', type=int, default=500, help='requests in flight at once')
+    parser.add_argument('--latency', type=float, default=2.0, help='fake model latency (s)')
+    parser.add_argument('--size', default='small')
+    parser.add_argument('--threads', type=int, default=0,
+                        help='cap the threaded mode at this many threads (0 = one per request)')
+    parser.add_argument('--mode', choices=('threaded', 'async'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.mode:
+        return child(args)
+
+    print(f"{args.requests} concurrent requests, fake model latency {args.latency}s, {args.size} PDF resume")
+    print(f"{'mode':<10} {'wall':>8} {'req/s':>8} {'p50':>8} {'p95':>8} {'threads':>8} {'+RSS MB':>8} {'KB/req':>8}  errors")
+    for mode in ('threaded', 'async'):
+        command = [sys.executable, os.path.abspath(__file__), '--mode', mode, '--requests', str(args.requests),
+                   '--latency', str(args.latency), '--size', args.size, '--threads', str(args.threads)]
+        output = subprocess.run(command, capture_output=True, text=True, cwd=BACKEND_DIR)
+        if output.returncode:
+            print(f"{mode}: failed\n{output.stderr[-2000:]}")
+            continue
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+        print(f"{mode:<10} {result['wall_seconds']:7.2f}s {result['requests'] / result['wall_seconds']:8.1f} "
+              f"{result['p50']:7.2f}s {result['p95']:7.2f}s {result['extra_threads']:8d} "
+              f"{result['extra_rss_mb']:8.1f} {result['extra_rss_mb'] * 1024 / result['requests']:8.1f}  {result['errors']}")
+
+
+if __name__ == '__main__':
+    main()
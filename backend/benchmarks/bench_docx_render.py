@@ -0,0 +1,105 @@
+import argparse
+import io
+import os
+import sys
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+# Microbenchmark for DOCX rendering: the template-once, bulk-XML renderer in docx_renderer
+# against the previous per-line python-docx approach (kept below as the reference). Also
+# checks that both produce the same paragraphs and styles for every sample.
+#
+#   cd backend && python benchmarks/bench_docx_render.py --resumes 5000 --threads 8 --reference-resumes 50
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from docx_renderer import DocxRenderer  # noqa: E402
+from sample_resumes import SIZES, resume_lines  # noqa: E402
+
+
+def render_reference(text_content):
+    # Previous implementation: fresh Document() per call, one python-docx call per line
+    from docx import Document as DocxDocument
+    doc = DocxDocument()
+    last_line_empty = False
+    for line in text_content.split('\n'):
+        stripped_line = line.strip()
+        if not stripped_line:
+            if not last_line_empty:
+                doc.add_paragraph('')
+                last_line_empty = True
+            continue
+        last_line_empty = False
+        if stripped_line.isupper() and 1 < len(stripped_line.split()) < 5 and not stripped_line.endswith(('.', ':', ';', ',')):
+            doc.add_heading(stripped_line.title(), level=1)
+        elif stripped_line.startswith(('* ', '- ', '• ', 'o ')):
+            doc.add_paragraph(stripped_line[2:], style='ListBullet')
+        else:
+            doc.add_paragraph(stripped_line)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer
+
+
+def paragraph_signature(docx_buffer):
+    from docx import Document as DocxDocument
+    docx_buffer.seek(0)
+    return [(p.style.name, p.text) for p in DocxDocument(docx_buffer).paragraphs]
+
+
+def sample_texts(count, sizes):
+    texts = []
+    for index in range(count):
+        size = sizes[index % len(sizes)]
+        lines = resume_lines(size, seed=index)
+        # Exercise the edge cases too: blank runs, "o " bullets, tabs and XML special characters
+        lines += ['', '', 'o Volunteer <mentor> & organiser', 'Tools:\tGit, Make', 'ADDITIONAL INFORMATION']
+        texts.append('\n'.join(lines))
+    return texts
+
+
+def timed(label, render_fn, texts, threads):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        total_bytes = sum(len(buffer.getvalue()) for buffer in executor.map(render_fn, texts))
+    seconds = time.perf_counter() - started
+    print(f"{label:<10} {len(texts)} resumes in {seconds:7.2f}s  "
+          f"{len(texts) / seconds:8.1f} docs/s  {seconds / len(texts) * 1000:6.2f}ms/doc  "
+          f"avg {total_bytes / len(texts) / 1024:.1f}KB")
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description='DOCX rendering microbenchmark.')
+    parser.add_argument('--resumes', type=int, default=2000)
+    parser.add_argument('--sizes', default=','.join(SIZES))
+    parser.add_argument('--threads', type=int, default=1, help='render concurrently from this many threads')
+    parser.add_argument('--reference-resumes', type=int, default=100,
+                        help='resumes timed with the slow reference renderer, 0 = skip it')
+    parser.add_argument('--template', default=None, help='DOCX template for the new renderer')
+    args = parser.parse_args()
+    # The reference renderer looks up 'ListBullet' by style id, as the old code did
+    warnings.filterwarnings('ignore', message='style lookup by style_id is deprecated')
+
+    texts = sample_texts(args.resumes, args.sizes.split(','))
+    started = time.perf_counter()
+    renderer = DocxRenderer(args.template)
+    print(f"Template loaded once in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+    if not args.template:
+        mismatches = [index for index, text in enumerate(texts[:len(args.sizes.split(',')) * 3])
+                      if paragraph_signature(renderer.render(text)) != paragraph_signature(render_reference(text))]
+        print("Output parity with the reference renderer: " + ("OK" if not mismatches else f"MISMATCH in samples {mismatches}"))
+
+    new_seconds = timed('renderer', renderer.render, texts, args.threads) / len(texts)
+    reference_texts = texts[:args.reference_resumes]
+    if reference_texts:
+        reference_seconds = timed('reference', render_reference, reference_texts, args.threads) / len(reference_texts)
+        print(f"Speedup per document: {reference_seconds / new_seconds:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Prompt size, output size and latency of single-call tailoring with and without JD-relevance
+# entry selection (entry_selection.EntrySelector), per resume size, against the fake LLM backend
+# paced at --tokens-per-second so latency grows with the length of the rewrite. Each mode runs in
+# its own process because the settings are read at import time.
+#
+#   cd backend && python benchmarks/bench_entry_selection.py --requests 8 --top-k 6
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_tailor import percentile  # noqa: E402
+from sample_resumes import JOB_DESCRIPTION, SIZES, resume_lines  # noqa: E402
+
+_TOKENS_LINE = re.compile(r'^tailor_model_tokens_total\{direction="(\w+)"\} (\d+)$', re.M)
+
+
+def model_tokens(app_module):
+    return {direction: int(count) for direction, count in _TOKENS_LINE.findall(app_module.metrics.render())}
+
+
+def child(args):
+    os.environ.update({
+        'LLM_BACKEND': 'fake',
+        'FAKE_LLM_LATENCY_SECONDS': str(args.latency),
+        'FAKE_LLM_TOKENS_PER_SECOND': str(args.tokens_per_second),
+        'LLM_REQUESTS_PER_MINUTE': '1000000',
+        'LLM_TOKENS_PER_MINUTE': '1000000000',
+        'LLM_CACHE_ENABLED': 'False', # every request must reach the model
+        'ENTRY_SELECTION_ENABLED': str(args.mode == 'selected'),
+        'ENTRY_SELECTION_TOP_K': str(args.top_k),
+    })
+    results = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app as app_module
+        for size in SIZES:
+            resumes = ['\n'.join(resume_lines(size, seed)) for seed in range(args.requests)]
+            tokens_before = model_tokens(app_module)
+
+            def one(index):
+                started = time.perf_counter()
+                result = app_module.tailor_resume_with_gemini(f"{JOB_DESCRIPTION}\nRef #{index}", resumes[index])
+                return not result.startswith("Error:"), time.perf_counter() - started
+
+            with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+                outcomes = list(executor.map(one, range(args.requests)))
+            tokens_after = model_tokens(app_module)
+            latencies = sorted(elapsed for ok, elapsed in outcomes if ok)
+            results[size] = {
+                "errors": sum(1 for ok, _ in outcomes if not ok),
+                "input_tokens": (tokens_after.get('input', 0) - tokens_before.get('input', 0)) / args.requests,
+                "output_tokens": (tokens_after.get('output', 0) - tokens_before.get('output', 0)) / args.requests,
+                "p50": percentile(latencies, 50),
+                "p95": percentile(latencies, 95),
+            }
+    print(json.dumps(results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JD-relevance entry selection: prompt/output tokens and latency.')
+    parser.add_argument('--requests', type=int, default=8, help='requests per resume size')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.5, help='fake model time to first token (s)')
+    parser.add_argument('--tokens-per-second', type=float, default=400, help='fake model output rate')
+    parser.add_argument('--top-k', type=int, default=6, help='entries sent to the model in full')
+    parser.add_argument('--mode', choices=('all', 'selected'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.mode:
+        return child(args)
+
+    print(f"{args.requests} requests per size, concurrency {args.concurrency}, latency {args.latency}s, "
+          f"{args.tokens_per_second:g} output tokens/s, top {args.top_k} entries")
+    print(f"{'size':<8} {'mode':<9} {'in tok':>8} {'out tok':>8} {'p50':>7} {'p95':>7}")
+    for mode in ('all', 'selected'):
+        command = [sys.executable, os.path.abspath(__file__), '--mode', mode] + sys.argv[1:]
+        output = subprocess.run(command, capture_output=True, text=True, cwd=BACKEND_DIR)
+        if output.returncode:
+            print(f"{mode}: failed\n{output.stderr[-2000:]}")
+            continue
+        for size, result in json.loads(output.stdout.strip().splitlines()[-1]).items():
+            print(f"{size:<8} {mode:<9} {result['input_tokens']:8.0f} {result['output_tokens']:8.0f} "
+                  f"{result['p50']:6.2f}s {result['p95']:6.2f}s" + (f"  ({result['errors']} errors)" if result['errors'] else ""))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+import argparse
+import io
+import os
+import sys
+import time
+from collections import Counter
+
+# Microbenchmark for the text extractors in text_extraction: speed and yield of every
+# extractor on the same corpus, and which one the registry ends up using per document.
+# The synthetic corpus covers plain PDFs/DOCX, a DOCX with a header, a table and a text box,
+# and a PDF whose words run together; add real files with --corpus.
+#
+#   cd backend && python benchmarks/bench_extraction.py --repeats 20 --corpus ~/resumes
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sample_resumes import SIZES, make_pdf, resume_lines, sample_resume  # noqa: E402
+from text_extraction import EXTRACTORS, FORMAT_LABELS, available_extractors, extract_document, text_problem  # noqa: E402
+
+_TEXT_BOX_XML = (
+    '<w:p xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+    ' xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006"'
+    ' xmlns:wps="http://schemas.microsoft.com/office/word/2010/wordprocessingShape"'
+    ' xmlns:v="urn:schemas-microsoft-com:vml"><w:r><mc:AlternateContent>'
+    '<mc:Choice Requires="wps"><wps:txbx><w:txbxContent><w:p><w:r><w:t>{text}</w:t></w:r></w:p>'
+    '</w:txbxContent></wps:txbx></mc:Choice>'
+    '<mc:Fallback><v:textbox><w:txbxContent><w:p><w:r><w:t>{text}</w:t></w:r></w:p>'
+    '</w:txbxContent></v:textbox></mc:Fallback>'
+    '</mc:AlternateContent></w:r></w:p>'
+)
+
+
+def make_rich_docx(lines):
+    # Contact details in the page header, skills in a table and a call-out in a text box:
+    # all places the old paragraph-only extraction missed
+    from docx import Document
+    from docx.oxml import parse_xml
+    doc = Document()
+    doc.sections[0].header.paragraphs[0].text = lines[0] + ' | ' + lines[1]
+    for line in lines[2:-2]:
+        doc.add_paragraph(line)
+    table = doc.add_table(rows=2, cols=2)
+    for cell, text in zip(table._cells, ['Languages', 'Python, Go', 'Platforms', 'AWS, Kubernetes']):
+        cell.text = text
+    doc.element.body.insert(len(doc.element.body) - 1, parse_xml(_TEXT_BOX_XML.format(text='Open to relocation')))
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def build_corpus(corpus_dir=None):
+    corpus = []  # (label, ext, bytes)
+    for size in SIZES:
+        for file_format in FORMAT_LABELS:
+            name, data = sample_resume(size, file_format)
+            corpus.append((name, file_format, data))
+    corpus.append(('rich.docx', 'docx', make_rich_docx(resume_lines('small'))))
+    corpus.append(('run_together.pdf', 'pdf', make_pdf([line.replace(' ', '') for line in resume_lines('small')])))
+    if corpus_dir:
+        for name in sorted(os.listdir(corpus_dir)):
+            ext = name.rsplit('.', 1)[-1].lower()
+            if ext in FORMAT_LABELS:
+                with open(os.path.join(corpus_dir, name), 'rb') as f:
+                    corpus.append((name, ext, f.read()))
+    return corpus
+
+
+def time_call(fn, repeats):
+    started = time.perf_counter()
+    for _ in range(repeats):
+        result = fn()
+    return (time.perf_counter() - started) / repeats, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Text extractor microbenchmark.')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--corpus', default=None, help='directory of real PDF/DOCX resumes to include')
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.corpus)
+    for ext in FORMAT_LABELS:
+        missing = [name for name, _, _ in EXTRACTORS[ext] if name not in dict(available_extractors(ext))]
+        if missing:
+            print(f"{FORMAT_LABELS[ext]} extractors not installed, skipped: {', '.join(missing)}")
+
+    print(f"\n{'document':<22} {'extractor':<12} {'ms/doc':>8} {'chars':>7}  problem")
+    totals = {}  # extractor -> [seconds, chars, problems]
+    for label, ext, data in corpus:
+        for name, extract_fn in available_extractors(ext):
+            try:
+                seconds, (text, _) = time_call(lambda: extract_fn(data, parallel=False), args.repeats)
+                text = text.strip()
+                problem = text_problem(text)
+            except Exception as e:
+                seconds, text, problem = 0.0, '', f"error: {e}"
+            total = totals.setdefault(name, [0.0, 0, 0])
+            total[0] += seconds
+            total[1] += len(text)
+            total[2] += problem is not None
+            print(f"{label:<22} {name:<12} {seconds * 1000:8.2f} {len(text):7d}  {problem or '-'}")
+
+    print(f"\n{'extractor':<12} {'total ms':>9} {'chars':>8} {'problems':>9}")
+    for name, (seconds, chars, problems) in totals.items():
+        print(f"{name:<12} {seconds * 1000:9.2f} {chars:8d} {problems:9d}")
+
+    chosen = Counter()
+    registry_seconds = 0.0
+    for label, ext, data in corpus:
+        seconds, (_, report) = time_call(lambda: extract_document(data, ext, parallel=False), args.repeats)
+        registry_seconds += seconds
+        chosen[report["extractor"]] += 1
+    print(f"\nRegistry (fast path first, fallback on quality problems): {registry_seconds * 1000:.2f}ms "
+          f"for {len(corpus)} documents; used " + ", ".join(f"{name} x{count}" for name, count in chosen.items()))
+
+
+if __name__ == '__main__':
+    main()
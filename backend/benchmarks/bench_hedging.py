@@ -0,0 +1,98 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Tail latency of model calls with and without hedging (model_routing.RequestHedger), against the
+# fake LLM backend with an injected slow tail: --slow-rate of the calls take --slow-latency seconds.
+# Reports latency percentiles, how often a hedge was sent and won, and the extra model calls paid
+# for it. Each mode runs in its own process because the settings are read at import time.
+#
+#   cd backend && python benchmarks/bench_hedging.py --requests 400 --slow-rate 0.03 --slow-latency 5
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_tailor import percentile  # noqa: E402
+from sample_resumes import JOB_DESCRIPTION, SIZES, resume_lines  # noqa: E402
+
+
+def child(args):
+    os.environ.update({
+        'LLM_BACKEND': 'fake',
+        'FAKE_LLM_LATENCY_SECONDS': str(args.latency),
+        'FAKE_LLM_SLOW_RATE': str(args.slow_rate),
+        'FAKE_LLM_SLOW_LATENCY_SECONDS': str(args.slow_latency),
+        'LLM_REQUESTS_PER_MINUTE': '1000000',
+        'LLM_CACHE_ENABLED': 'False', # every request must reach the model
+        'HEDGE_ENABLED': str(args.mode == 'hedged'),
+        'HEDGE_PERCENTILE': str(args.percentile),
+        'HEDGE_MIN_DELAY_SECONDS': str(args.latency * 1.5),
+        'HEDGE_MIN_SAMPLES': '10',
+        'HEDGE_MAX_RATIO': str(args.max_ratio),
+        'MODEL_ROUTES': args.routes,
+    })
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app as app_module
+        sizes = list(SIZES)
+        resumes = ['\n'.join(resume_lines(sizes[i % len(sizes)])) for i in range(args.requests)]
+
+        def one(index):
+            started = time.perf_counter()
+            result = app_module.tailor_resume_with_gemini(f"{JOB_DESCRIPTION}\nRef #{index}", resumes[index])
+            return not result.startswith("Error:"), time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            results = list(executor.map(one, range(args.requests)))
+        wall_seconds = time.perf_counter() - started
+    latencies = sorted(elapsed for ok, elapsed in results if ok)
+    hedging = app_module.request_hedger.stats() if app_module.request_hedger else {}
+    print(json.dumps({
+        "mode": args.mode, "requests": len(results), "errors": sum(1 for ok, _ in results if not ok),
+        "wall_seconds": wall_seconds, "p50": percentile(latencies, 50), "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99), "max": latencies[-1] if latencies else 0.0,
+        "model_calls": app_module.llm_backend.calls, "hedged": hedging.get("hedged", 0),
+        "hedge_wins": hedging.get("hedge_wins", 0), "routed": app_module.model_router.stats()["routed"],
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Hedged model calls: tail latency vs extra cost.')
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--latency', type=float, default=0.3, help='usual fake model latency (s)')
+    parser.add_argument('--slow-rate', type=float, default=0.03, help='fraction of calls that are slow')
+    parser.add_argument('--slow-latency', type=float, default=4.0, help='latency of the slow calls (s)')
+    parser.add_argument('--percentile', type=float, default=95, help='hedge after this latency percentile')
+    parser.add_argument('--max-ratio', type=float, default=0.1, help='hedge at most this fraction of calls')
+    parser.add_argument('--routes', default='', help='MODEL_ROUTES for both modes, e.g. "900:fast,*:large"')
+    parser.add_argument('--mode', choices=('plain', 'hedged'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.mode:
+        return child(args)
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, latency {args.latency}s, "
+          f"{args.slow_rate:.0%} of calls take {args.slow_latency}s")
+    print(f"{'mode':<8} {'p50':>7} {'p95':>7} {'p99':>7} {'max':>7} {'calls':>6} {'extra':>6} {'hedged':>7} {'won':>5}  routed")
+    for mode in ('plain', 'hedged'):
+        command = [sys.executable, os.path.abspath(__file__), '--mode', mode] + sys.argv[1:]
+        output = subprocess.run(command, capture_output=True, text=True, cwd=BACKEND_DIR)
+        if output.returncode:
+            print(f"{mode}: failed\n{output.stderr[-2000:]}")
+            continue
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+        extra = result['model_calls'] / result['requests'] - 1
+        print(f"{mode:<8} {result['p50']:6.2f}s {result['p95']:6.2f}s {result['p99']:6.2f}s {result['max']:6.2f}s "
+              f"{result['model_calls']:6d} {extra:6.1%} {result['hedged']:7d} {result['hedge_wins']:5d}  "
+              + ", ".join(f"{model}={count}" for model, count in result['routed'].items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Resume store at scale: bulk-import rate, lookup latency by id and by content hash, database
+# size and eviction time for a store of --profiles synthetic resumes, plus what a stored-id
+# request saves compared with parsing the upload again.
+#
+#   cd backend && python benchmarks/bench_resume_store.py --profiles 200000
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_tailor import percentile  # noqa: E402
+from sample_resumes import resume_lines, sample_resume  # noqa: E402
+from resume_store import ResumeStore, content_hash_for  # noqa: E402
+from text_extraction import extract_document  # noqa: E402
+
+
+def time_lookups(fn, keys):
+    latencies = []
+    for key in keys:
+        started = time.perf_counter()
+        fn(key)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Resume store import, lookup and eviction benchmark.')
+    parser.add_argument('--profiles', type=int, default=50000)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--lookups', type=int, default=2000)
+    parser.add_argument('--db', default=None, help='database path (default: a temp file)')
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), 'resumes.sqlite3')
+    store = ResumeStore(db_path, max_entries=0, evict_every=10 ** 9) # Evicted explicitly below
+    sizes = ('small', 'medium')
+    texts = ['\n'.join(resume_lines(sizes[seed % 2], seed)) for seed in range(200)] # Varied bodies, reused
+
+    started = time.perf_counter()
+    ids, hashes = [], []
+    for start in range(0, args.profiles, args.batch_size):
+        batch = []
+        for index in range(start, min(args.profiles, start + args.batch_size)):
+            text = f"Candidate {index}\n" + texts[index % len(texts)]
+            content_hash = content_hash_for(text.encode('utf-8'), f"resume_{index}.pdf")
+            batch.append((content_hash, f"resume_{index}.pdf", text))
+            hashes.append(content_hash)
+        ids.extend(resume_id for resume_id, _ in store.put_many(batch, args.batch_size))
+    import_seconds = time.perf_counter() - started
+    stats = store.stats()
+    print(f"Imported {args.profiles} profiles in {import_seconds:.1f}s ({args.profiles / import_seconds:,.0f}/s); "
+          f"database {stats['db_bytes'] / (1024 * 1024):.1f}MB ({stats['db_bytes'] / args.profiles / 1024:.1f}KB/profile)")
+
+    rng = random.Random(0)
+    sample = rng.sample(range(args.profiles), min(args.lookups, args.profiles))
+    p50, p99 = time_lookups(store.get, [ids[i] for i in sample])
+    print(f"get(id):        p50 {p50:.3f}ms  p99 {p99:.3f}ms  (text and sections decompressed)")
+    p50, p99 = time_lookups(store.id_for_hash, [hashes[i] for i in sample])
+    print(f"id_for_hash():  p50 {p50:.3f}ms  p99 {p99:.3f}ms  (duplicate-upload check)")
+    p50, p99 = time_lookups(store.get, [f"missing-{i}" for i in range(len(sample))])
+    print(f"get(missing):   p50 {p50:.3f}ms  p99 {p99:.3f}ms")
+
+    store.max_entries = int(args.profiles * 0.9)
+    started = time.perf_counter()
+    evicted = store.evict()
+    print(f"Evicting {evicted} least recently used profiles took {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    for size in sizes:
+        filename, data = sample_resume(size, 'pdf')
+        started = time.perf_counter()
+        extract_document(data, 'pdf', parallel=False)
+        parse_ms = (time.perf_counter() - started) * 1000
+        print(f"{size} PDF: parsing the upload {parse_ms:.1f}ms and {len(data) / 1024:.0f}KB on the wire; "
+              f"a stored resume_id is {len(ids[0])} bytes")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+import argparse
+import os
+import sys
+import time
+
+# Microbenchmark for local JD-match scoring (jd_scoring): ranks N synthetic resumes against
+# one job description, cold (tokenizing every resume) and warm (term vectors cached).
+#
+#   cd backend && python benchmarks/bench_scoring.py --resumes 5000
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from jd_scoring import TermVectorCache, rank_resumes  # noqa: E402
+from sample_resumes import JOB_DESCRIPTION, SIZES, resume_lines  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JD-match scoring microbenchmark.')
+    parser.add_argument('--resumes', type=int, default=5000)
+    parser.add_argument('--sizes', default='small,medium')
+    parser.add_argument('--top-k', type=int, default=20)
+    parser.add_argument('--repeats', type=int, default=5, help='warm runs to average')
+    args = parser.parse_args()
+
+    sizes = [size for size in args.sizes.split(',') if size in SIZES]
+    texts = ['\n'.join(resume_lines(sizes[i % len(sizes)], seed=i)) for i in range(args.resumes)]
+    print(f"{len(texts)} resumes, avg {sum(map(len, texts)) // len(texts)} chars")
+
+    cache = TermVectorCache(max_entries=len(texts))
+    started = time.perf_counter()
+    keywords, ranked = rank_resumes(JOB_DESCRIPTION, texts, top_k=args.top_k, vector_cache=cache)
+    cold = time.perf_counter() - started
+    print(f"cold  {cold * 1000:8.1f}ms  ({cold / len(texts) * 1e6:.0f}us/resume, includes tokenization)")
+
+    started = time.perf_counter()
+    for _ in range(args.repeats):
+        rank_resumes(JOB_DESCRIPTION, texts, top_k=args.top_k, vector_cache=cache)
+    warm = (time.perf_counter() - started) / args.repeats
+    print(f"warm  {warm * 1000:8.1f}ms  ({warm / len(texts) * 1e6:.0f}us/resume, cached term vectors)")
+    print(f"top match: resume #{ranked[0][0]} score={ranked[0][1]['score']} "
+          f"coverage={ranked[0][1]['keyword_coverage']}")
+    print(f"JD keywords: {', '.join(keywords)}")
+
+
+if __name__ == '__main__':
+    main()
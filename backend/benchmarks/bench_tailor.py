@@ -0,0 +1,158 @@
+import argparse
+import contextlib
+import io
+import logging
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# End-to-end benchmark for POST /tailor_resume against the fake LLM backend.
+# Starts the Flask app on a local port, drives it with concurrent multipart uploads of
+# synthetic PDF/DOCX resumes, and reports throughput, latency percentiles and per-stage
+# breakdowns (from the Server-Timing header; "send" is the rest of the client-observed time).
+#
+#   cd backend && python benchmarks/bench_tailor.py --requests 200 --concurrency 16 --latency 0.8
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sample_resumes import JOB_DESCRIPTION, SIZES, sample_resume  # noqa: E402
+
+STAGES = ('extract', 'generate', 'render', 'send')
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def encode_multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    body = io.BytesIO()
+    for name, value in fields.items():
+        body.write(f"--{boundary}\r\nContent-Disposition: form-data; name=\"{name}\"\r\n\r\n".encode())
+        body.write(value.encode('utf-8') + b"\r\n")
+    for name, (filename, data) in files.items():
+        body.write(f"--{boundary}\r\nContent-Disposition: form-data; name=\"{name}\"; "
+                   f"filename=\"{filename}\"\r\nContent-Type: application/octet-stream\r\n\r\n".encode())
+        body.write(data + b"\r\n")
+    body.write(f"--{boundary}--\r\n".encode())
+    return body.getvalue(), f"multipart/form-data; boundary={boundary}"
+
+
+def parse_server_timing(header):
+    timings = {}
+    for item in (header or '').split(','):
+        name, _, params = item.strip().partition(';')
+        if params.startswith('dur='):
+            timings[name] = float(params[4:]) / 1000
+    return timings
+
+
+def run_one(url, filename, data, jd_text):
+    body, content_type = encode_multipart({'job_description': jd_text}, {'resume': (filename, data)})
+    req = urllib.request.Request(url, data=body, headers={'Content-Type': content_type}, method='POST')
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=300) as response:
+            response.read()
+            status, server_timing = response.status, response.headers.get('Server-Timing')
+    except urllib.error.HTTPError as e:
+        e.read()
+        status, server_timing = e.code, None
+    elapsed = time.perf_counter() - started
+    stages = parse_server_timing(server_timing)
+    if stages:
+        stages['send'] = max(0.0, elapsed - sum(stages.values()))
+    return status, elapsed, stages
+
+
+def report(label, results, wall_seconds):
+    latencies = sorted(elapsed for status, elapsed, _ in results if status == 200)
+    errors = sum(1 for status, _, _ in results if status != 200)
+    line = (f"{label:<20} n={len(results):<5} err={errors:<4} "
+            f"thr={len(results) / wall_seconds:7.2f} req/s  "
+            f"p50={percentile(latencies, 50) * 1000:8.1f}ms  "
+            f"p95={percentile(latencies, 95) * 1000:8.1f}ms  "
+            f"p99={percentile(latencies, 99) * 1000:8.1f}ms")
+    stage_means = []
+    for stage in STAGES:
+        values = [stages[stage] for status, _, stages in results if status == 200 and stage in stages]
+        if values:
+            stage_means.append(f"{stage}={sum(values) / len(values) * 1000:.1f}ms")
+    print(line)
+    if stage_means:
+        print(f"{'':<20} mean stages: " + "  ".join(stage_means))
+
+
+@contextlib.contextmanager
+def quiet_output(verbose):
+    if verbose:
+        yield
+        return
+    sink = io.StringIO()
+    with contextlib.redirect_stdout(sink), contextlib.redirect_stderr(sink):
+        yield
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end /tailor_resume benchmark against the fake LLM backend.')
+    parser.add_argument('--requests', type=int, default=50, help='requests per (format, size) combination')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--sizes', default=','.join(SIZES))
+    parser.add_argument('--formats', default='pdf,docx')
+    parser.add_argument('--latency', type=float, default=0.5, help='fake model time to first token (s)')
+    parser.add_argument('--tokens-per-second', type=float, default=0, help='fake model output rate, 0 = instant')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of fake model calls that fail')
+    parser.add_argument('--with-caches', action='store_true', help='keep extraction/response caches enabled')
+    parser.add_argument('--verbose', action='store_true', help='show the app log output')
+    args = parser.parse_args()
+
+    os.environ['LLM_BACKEND'] = 'fake'
+    os.environ['FAKE_LLM_LATENCY_SECONDS'] = str(args.latency)
+    os.environ['FAKE_LLM_TOKENS_PER_SECOND'] = str(args.tokens_per_second)
+    os.environ['FAKE_LLM_ERROR_RATE'] = str(args.error_rate)
+    # The fake backend has no quota; keep the upstream guard's limiter out of the measurement unless asked
+    os.environ.setdefault('LLM_REQUESTS_PER_MINUTE', '1000000')
+    if not args.with_caches:
+        os.environ['EXTRACTION_CACHE_ENABLED'] = 'False'
+        os.environ['LLM_CACHE_ENABLED'] = 'False'
+
+    from werkzeug.serving import make_server
+    import app as app_module
+
+    server = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/tailor_resume"
+
+    if not args.verbose:
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    print(f"Benchmarking {url}: {args.requests} requests per case, concurrency {args.concurrency}, "
+          f"fake latency {args.latency}s")
+    all_results, total_started = [], time.perf_counter()
+    try:
+        for file_format in args.formats.split(','):
+            for size in args.sizes.split(','):
+                filename, data = sample_resume(size, file_format)
+                started = time.perf_counter()
+                with quiet_output(args.verbose), ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+                    futures = [executor.submit(run_one, url, filename, data, f"{JOB_DESCRIPTION}\nRef #{i}")
+                               for i in range(args.requests)]
+                    results = [future.result() for future in futures]
+                report(f"{file_format}/{size} ({len(data) // 1024}KB)", results, time.perf_counter() - started)
+                all_results += results
+        report("overall", all_results, time.perf_counter() - total_started)
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+import io
+import random
+
+# Synthetic resumes and job descriptions for the benchmarks. Everything is generated
+# deterministically at runtime, so no binary fixtures live in the repo.
+
+SIZES = {
+    # name: number of experience entries (each ~6 bullets)
+    'small': 3,
+    'medium': 12,
+    'large': 60,
+}
+
+_SKILLS = [
+    'Python', 'Flask', 'Django', 'PostgreSQL', 'Redis', 'Kafka', 'Docker', 'Kubernetes', 'AWS', 'GCP',
+    'Terraform', 'React', 'TypeScript', 'GraphQL', 'CI/CD', 'Spark', 'Airflow', 'Pandas', 'NumPy', 'Go',
+]
+_VERBS = ['Led', 'Built', 'Designed', 'Migrated', 'Optimized', 'Automated', 'Launched', 'Scaled', 'Reduced', 'Owned']
+_OBJECTS = [
+    'a multi-tenant billing service', 'the customer onboarding pipeline', 'real-time fraud detection',
+    'the internal analytics platform', 'a public REST API', 'search ranking experiments',
+    'the data warehouse ingestion layer', 'mobile push notification delivery', 'on-call tooling',
+]
+_OUTCOMES = [
+    'cutting p95 latency by 40%', 'saving $120k per year in infrastructure', 'serving 2M daily users',
+    'improving conversion by 8%', 'reducing incident volume by half', 'shipping two weeks ahead of plan',
+]
+
+JOB_DESCRIPTION = """Senior Backend Engineer
+
+We are looking for a Senior Backend Engineer to design, build and operate the services behind our
+hiring platform. You will own APIs end to end, from data modelling in PostgreSQL to deployment on
+Kubernetes, and mentor engineers across the team.
+
+Requirements:
+- 5+ years building production services in Python (Flask or Django)
+- Strong experience with PostgreSQL, Redis and message queues such as Kafka
+- Hands-on with Docker, Kubernetes and a major cloud provider (AWS or GCP)
+- Experience improving latency, reliability and cost of high-traffic systems
+- Clear written communication and a habit of measuring impact
+
+We are an equal opportunity employer and value diversity at our company.
+"""
+
+
+def resume_lines(size, seed=0):
+    rng = random.Random(f"{size}-{seed}")
+    lines = [
+        'JANE DOE',
+        'jane.doe@example.com | +1 555 0100 | linkedin.com/in/janedoe',
+        '',
+        'PROFESSIONAL SUMMARY',
+        'Backend engineer with a decade of experience building reliable, high-traffic web services.',
+        '',
+        'WORK EXPERIENCE',
+    ]
+    for index in range(SIZES[size]):
+        lines.append(f"Software Engineer, Company {index + 1} ({2020 - index} - {2021 - index})")
+        for _ in range(6):
+            lines.append(f"- {rng.choice(_VERBS)} {rng.choice(_OBJECTS)} using "
+                         f"{rng.choice(_SKILLS)} and {rng.choice(_SKILLS)}, {rng.choice(_OUTCOMES)}.")
+        lines.append('')
+    lines += [
+        'EDUCATION',
+        'B.Sc. Computer Science, State University, 2010',
+        '',
+        'TECHNICAL SKILLS',
+        ', '.join(rng.sample(_SKILLS, 12)),
+    ]
+    return lines
+
+
+def _pdf_escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def make_pdf(lines, lines_per_page=48):
+    # Minimal single-font PDF writer; good enough for PyPDF2/pdfplumber text extraction
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        ("<< /Type /Pages /Kids [%s] /Count %d >>" % (
+            " ".join(f"{4 + 2 * i} 0 R" for i in range(len(pages))), len(pages))).encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for index, page_lines in enumerate(pages):
+        content = "BT /F1 10 Tf 50 760 Td 14 TL " + " ".join(
+            f"({_pdf_escape(line)}) Tj T*" for line in page_lines) + " ET"
+        objects.append((f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                        f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * index} 0 R >>").encode())
+        objects.append(f"<< /Length {len(content)} >>\nstream\n{content}\nendstream".encode('latin-1', 'replace'))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref_offset = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def make_docx(lines):
+    from docx import Document
+    doc = Document()
+    for line in lines:
+        doc.add_paragraph(line)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def sample_resume(size, file_format, seed=0):
+    # Returns (filename, file_bytes)
+    lines = resume_lines(size, seed)
+    if file_format == 'pdf':
+        return f"resume_{size}.pdf", make_pdf(lines)
+    if file_format == 'docx':
+        return f"resume_{size}.docx", make_docx(lines)
+    raise ValueError(f"Unknown format '{file_format}'.")
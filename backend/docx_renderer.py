@@ -0,0 +1,145 @@
+import io
+import os
+import re
+import threading
+import zipfile
+from xml.sax.saxutils import escape
+
+# DOCX rendering without per-line python-docx calls. The styled template is loaded once per
+# process and split around the body; each render builds the body XML in one pass and zips it
+# with the cached template parts straight into a buffer. No state outlives a single call.
+
+_BODY_MARKER = 'RESUME_BODY'
+# Characters XML 1.0 cannot carry (python-docx would raise on them)
+_INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+# Line kinds produced by classify_line
+BLANK, HEADING, BULLET, TEXT = 'blank', 'heading', 'bullet', 'text'
+
+
+def classify_line(stripped_line):
+    # Returns (kind, text); same heuristics as the original per-line renderer
+    if not stripped_line:
+        return BLANK, ''
+    # Basic heading detection (all caps, few words)
+    if stripped_line.isupper() and 1 < len(stripped_line.split()) < 5 and not stripped_line.endswith(('.', ':', ';', ',')):
+        return HEADING, stripped_line.title()
+    # Bullet point detection ("o " is another common bullet)
+    if stripped_line.startswith(('* ', '- ', '• ', 'o ')):
+        return BULLET, stripped_line[2:]
+    return TEXT, stripped_line
+
+
+def iter_lines(text_content):
+    # Yields (kind, text) per output paragraph, collapsing runs of blank lines into one
+    last_line_empty = False
+    for line in text_content.split('\n'):
+        kind, text = classify_line(line.strip())
+        if kind == BLANK:
+            if not last_line_empty:
+                last_line_empty = True
+                yield kind, text
+            continue
+        last_line_empty = False
+        yield kind, text
+
+
+def _run_xml(text):
+    text = escape(_INVALID_XML_CHARS.sub('', text))
+    # Tabs become <w:tab/> elements inside the run, as python-docx writes them
+    return '<w:r>' + '<w:tab/>'.join(f'<w:t xml:space="preserve">{part}</w:t>' for part in text.split('\t')) + '</w:r>'
+
+
+def _paragraph_xml(text, style_id=None):
+    properties = f'<w:pPr><w:pStyle w:val="{style_id}"/></w:pPr>' if style_id else ''
+    if not text:
+        return f'<w:p>{properties}</w:p>'
+    return f'<w:p>{properties}{_run_xml(text)}</w:p>'
+
+
+class DocxRenderer:
+    def __init__(self, template_path=None):
+        from docx import Document as DocxDocument
+        doc = DocxDocument(template_path)
+        self.template_path = template_path
+        self.heading_style_id = self._style_id(doc, 'Heading 1')
+        self.bullet_style_id = self._style_id(doc, 'List Bullet')
+        if self.heading_style_id is None:
+            print("Warning: DOCX template has no 'Heading 1' style; headings render as plain paragraphs.")
+
+        # Mark where the resume body goes: after any template content, before the section properties
+        from lxml import etree
+        body = doc.element.body
+        marker = etree.Comment(_BODY_MARKER)
+        section_properties = body.find('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}sectPr')
+        if section_properties is not None:
+            section_properties.addprevious(marker)
+        else:
+            body.append(marker)
+
+        template_buffer = io.BytesIO()
+        doc.save(template_buffer)
+        document_name = doc.part.partname.lstrip('/')
+        # Static parts (styles, theme, numbering...) are compressed once into a base archive;
+        # each render copies it and appends only the generated document part
+        base_buffer = io.BytesIO()
+        with zipfile.ZipFile(template_buffer) as template_zip, \
+                zipfile.ZipFile(base_buffer, 'w', zipfile.ZIP_DEFLATED) as base_zip:
+            for info in template_zip.infolist():
+                data = template_zip.read(info.filename)
+                if info.filename == document_name:
+                    prefix, _, suffix = data.decode('utf-8').partition(f'<!--{_BODY_MARKER}-->')
+                    self._document_prefix, self._document_suffix = prefix, suffix
+                    continue
+                base_zip.writestr(info.filename, data)
+        self._document_name = document_name
+        self._base_archive = base_buffer.getvalue()
+
+    @staticmethod
+    def _style_id(doc, style_name):
+        try:
+            return doc.styles[style_name].style_id
+        except KeyError:
+            return None
+
+    def body_xml(self, text_content):
+        paragraphs = []
+        for kind, text in iter_lines(text_content):
+            if kind == HEADING:
+                paragraphs.append(_paragraph_xml(text, self.heading_style_id))
+            elif kind == BULLET:
+                paragraphs.append(_paragraph_xml(text, self.bullet_style_id))
+            else:
+                paragraphs.append(_paragraph_xml(text))
+        return ''.join(paragraphs)
+
+    def render(self, text_content, output=None):
+        # Writes the DOCX to output (a path or a binary file object); returns a rewound BytesIO if none given
+        document_xml = (self._document_prefix + self.body_xml(text_content) + self._document_suffix).encode('utf-8')
+        buffer = io.BytesIO(self._base_archive)
+        buffer.seek(0, io.SEEK_END)
+        with zipfile.ZipFile(buffer, 'a', zipfile.ZIP_DEFLATED) as out_zip:
+            out_zip.writestr(self._document_name, document_xml)
+        if output is None:
+            buffer.seek(0)
+            return buffer
+        if hasattr(output, 'write'):
+            output.write(buffer.getvalue())
+        else:
+            with open(output, 'wb') as f:
+                f.write(buffer.getvalue())
+        return output
+
+
+_lock = threading.Lock()
+_default_renderer = None
+
+
+def get_renderer():
+    # Process-wide renderer, built on first use from DOCX_TEMPLATE_PATH (or python-docx's default template)
+    global _default_renderer
+    if _default_renderer is None:
+        with _lock:
+            if _default_renderer is None:
+                _default_renderer = DocxRenderer(os.getenv('DOCX_TEMPLATE_PATH') or None)
+    return _default_renderer
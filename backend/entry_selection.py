@@ -0,0 +1,217 @@
+import os
+import re
+import threading
+from collections import Counter
+
+from jd_scoring import relevance_scores
+from section_tailoring import ENTRY_KINDS, Section, join_sections, split_sections
+from text_compaction import estimate_tokens
+
+# JD-relevance selection of experience/project entries for long resumes. Every entry (a job or
+# project: its title line plus bullets) is scored against the JD in one vectorized TF-IDF pass
+# (jd_scoring.relevance_scores). Only the top-K entries, plus the most recent one(s) of each
+# section, go to the model in full; each run of the remaining entries is replaced by a one-line
+# [[KEEP n]] marker that the model copies through, and the original text is put back in its
+# place afterwards. Long resumes send and generate far fewer tokens, and the entries the JD
+# does not care about come back exactly as the candidate wrote them.
+
+_MARKER = '[[KEEP {}]]'
+# Tolerates the model decorating the marker line, e.g. "- [[KEEP 2]]" or "**[[KEEP 2]]**"
+_MARKER_LINE = re.compile(r'^[^\w\n]*\[\[KEEP (\d+)\]\][^\w\n]*$')
+# A marker the model wove into a sentence ("see [[KEEP 1]] above") is stripped, never rendered;
+# its entry counts as missing and is re-inserted like a dropped marker's
+_INLINE_MARKER = re.compile(r'[ \t]*\[\[KEEP \d+\]\]')
+_BLANK_LINES = re.compile(r'\n{3,}')
+
+
+def restore_held_entries(text, held_entries):
+    # Replaces each marker line with the entries it stands for. Markers the model dropped are put
+    # back right after the previous marker (or before the next one), so no entry is ever lost;
+    # only their position relative to rewritten entries in between can shift.
+    # Returns (text, missing_marker_count).
+    out, present = [], set()
+    for line in text.split('\n'):
+        match = _MARKER_LINE.match(line)
+        if not match:
+            out.append(_INLINE_MARKER.sub('', line) if '[[KEEP' in line else line)
+            continue
+        key = int(match.group(1))
+        if key in held_entries and key not in present:  # Unknown or repeated markers are dropped
+            present.add(key)
+            out.append(key)
+    missing = [key for key in sorted(held_entries) if key not in present]
+    if missing:
+        if not present:
+            for key in missing:
+                out.extend(['', key])
+        else:
+            leading = []
+            for key in missing:
+                previous = key - 1
+                if previous in present:
+                    # Chains: once inserted, this key is the anchor for the next missing one
+                    out[out.index(previous) + 1:out.index(previous) + 1] = ['', key]
+                    present.add(key)
+                else:
+                    leading.append(key)
+            for key in reversed(leading):  # Before the first marker the model kept
+                following = min(present)
+                out[out.index(following):out.index(following)] = [key, '']
+                present.add(key)
+    restored = '\n'.join(held_entries[item] if isinstance(item, int) else item for item in out)
+    return (_BLANK_LINES.sub('\n\n', restored).strip() if missing else restored), len(missing)
+
+
+class HeldEntryStream:
+    # Restores markers in streamed output; text is released a whole line at a time so a marker
+    # split across chunks is still recognized. Unknown and repeated markers are dropped and inline
+    # ones stripped, as in restore_held_entries, and flush() appends the entries whose markers
+    # never came, so the stream never loses or repeats an entry. Only the position of a dropped
+    # marker's entry can differ from restore_held_entries' text, which is what gets rendered.
+    def __init__(self, held_entries):
+        self.held_entries = held_entries
+        self._pending = ''
+        self._restored = set()
+
+    def _restore(self, text):
+        out = []
+        for line in text.split('\n'):
+            match = _MARKER_LINE.match(line)
+            if not match:
+                out.append(_INLINE_MARKER.sub('', line) if '[[KEEP' in line else line)
+                continue
+            key = int(match.group(1))
+            if key in self.held_entries and key not in self._restored:
+                self._restored.add(key)
+                out.append(self.held_entries[key])
+        return '\n'.join(out)
+
+    def feed(self, chunk):
+        complete, newline, self._pending = (self._pending + chunk).rpartition('\n')
+        return self._restore(complete) + newline if newline else ''
+
+    def flush(self):
+        text, self._pending = self._restore(self._pending), ''
+        missing = [self.held_entries[key] for key in sorted(self.held_entries) if key not in self._restored]
+        self._restored.update(self.held_entries)
+        if missing:
+            text = text.rstrip('\n') + '\n\n' + '\n\n'.join(missing)
+        return text
+
+
+class EntrySelector:
+    def __init__(self, top_k=6, keep_recent=1, min_resume_tokens=1500):
+        self.top_k = top_k
+        self.keep_recent = keep_recent  # Leading entries of each section, usually the latest roles
+        self.min_resume_tokens = min_resume_tokens
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.applied = 0
+        self.entries = 0
+        self.entries_held_back = 0
+        self.tokens_held_back = 0
+        self.missing_markers = 0
+
+    def _held_back_indices(self, sections, job_description, resume_tokens):
+        candidates = [index for index, section in enumerate(sections) if section.kind in ENTRY_KINDS]
+        if resume_tokens < self.min_resume_tokens or len(candidates) <= self.top_k:
+            return set()
+        keep, position = set(), Counter()
+        for index in candidates:
+            if position[sections[index].heading] < self.keep_recent:
+                keep.add(index)
+            position[sections[index].heading] += 1
+        scores = relevance_scores(job_description, [sections[index].text for index in candidates])
+        # Highest score first; ties go to the earlier (more recent) entry
+        for row in sorted(range(len(candidates)), key=lambda row: -scores[row]):
+            if len(keep) >= self.top_k:
+                break
+            keep.add(candidates[row])
+        return set(candidates) - keep
+
+    def hold_back_sections(self, sections, job_description, resume_tokens):
+        # For section-parallel tailoring: indices of the entries to pass through without a model call
+        held_back = self._held_back_indices(sections, job_description, resume_tokens)
+        self._record(sum(1 for section in sections if section.kind in ENTRY_KINDS), len(held_back),
+                     sum(estimate_tokens(sections[index].text) for index in held_back))
+        return held_back
+
+    def hold_back(self, job_description, resume_text):
+        # Returns (resume_text_with_markers, held_entries {marker number: original text}, report)
+        sections = split_sections(resume_text)
+        resume_tokens = estimate_tokens(resume_text)
+        held_back = self._held_back_indices(sections, job_description, resume_tokens)
+        entry_count = sum(1 for section in sections if section.kind in ENTRY_KINDS)
+        if not held_back:
+            self._record(entry_count, 0, 0)
+            return resume_text, {}, None
+
+        kept_sections, held_entries = [], {}
+        for index, section in enumerate(sections):
+            if index not in held_back:
+                kept_sections.append(section)
+            elif index - 1 in held_back and sections[index - 1].heading == section.heading:
+                # Adjacent held entries in the same section share one marker
+                held_entries[len(held_entries)] += '\n\n' + section.text
+            else:
+                held_entries[len(held_entries) + 1] = section.text
+                kept_sections.append(Section(section.kind, _MARKER.format(len(held_entries)), section.heading))
+        marked_text = join_sections(kept_sections, [section.text for section in kept_sections])
+
+        tokens_held_back = resume_tokens - estimate_tokens(marked_text)
+        self._record(entry_count, len(held_back), tokens_held_back)
+        report = {
+            "entries": entry_count,
+            "entries_held_back": len(held_back),
+            "tokens_held_back": tokens_held_back,
+        }
+        return marked_text, held_entries, report
+
+    def restore(self, text, held_entries):
+        text, missing = restore_held_entries(text, held_entries)
+        if missing:
+            print(f"Warning: the model dropped {missing} of {len(held_entries)} [[KEEP]] markers; "
+                  "re-inserted the held-back entries next to their neighbours.")
+            with self._lock:
+                self.missing_markers += missing
+        return text
+
+    def _record(self, entries, held_back, tokens_held_back):
+        with self._lock:
+            self.requests += 1
+            self.entries += entries
+            if held_back:
+                self.applied += 1
+                self.entries_held_back += held_back
+                self.tokens_held_back += tokens_held_back
+
+    def stats(self):
+        with self._lock:
+            return {
+                "top_k": self.top_k,
+                "keep_recent": self.keep_recent,
+                "min_resume_tokens": self.min_resume_tokens,
+                "requests": self.requests,
+                "applied": self.applied,
+                "entries": self.entries,
+                "entries_held_back": self.entries_held_back,
+                "tokens_held_back": self.tokens_held_back,
+                "missing_markers": self.missing_markers,
+            }
+
+
+def create_entry_selector_from_env():
+    if os.getenv('ENTRY_SELECTION_ENABLED', 'True').lower() not in ('true', '1', 't'):
+        return None
+    try:
+        selector = EntrySelector(
+            top_k=int(os.getenv('ENTRY_SELECTION_TOP_K', 6)),
+            keep_recent=int(os.getenv('ENTRY_SELECTION_KEEP_RECENT', 1)),
+            min_resume_tokens=int(os.getenv('ENTRY_SELECTION_MIN_TOKENS', 1500)),
+        )
+    except ValueError:
+        print("Warning: invalid ENTRY_SELECTION_* settings, using the defaults.")
+        selector = EntrySelector()
+    print(f"Entry selection: resumes over ~{selector.min_resume_tokens} tokens send their top {selector.top_k} "
+          f"JD-relevant experience/project entries to the model; the rest pass through verbatim.")
+    return selector
@@ -0,0 +1,187 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from text_extraction import EXTRACTION_FINGERPRINT
+
+# Content-addressed cache for extracted resume text.
+# Keys are a SHA-256 of the uploaded bytes plus the file extension and the extractor version,
+# so the same resume uploaded against different JDs is only parsed once, and text cached on
+# disk by an older extractor is not reused after an upgrade.
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        print(f"Warning: invalid value for {name}, using default {default}.")
+        return default
+
+
+def hash_file_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_stream(stream, chunk_size=1024 * 1024):
+    # Hashes from the current position and rewinds, so the stream can be parsed afterwards
+    start = stream.tell()
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(chunk_size), b''):
+        digest.update(chunk)
+    stream.seek(start)
+    return digest.hexdigest()
+
+
+def hash_file(filepath, chunk_size=1024 * 1024):
+    with open(filepath, 'rb') as f:
+        return hash_stream(f, chunk_size)
+
+
+class ExtractionCache:
+    def __init__(self, max_entries=256, max_bytes=32 * 1024 * 1024, disk_dir=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()  # key -> text, most recently used last
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(content_hash, ext):
+        return f"{content_hash}.{EXTRACTION_FINGERPRINT}.{ext.lower()}"
+
+    @staticmethod
+    def _size_of(text):
+        return len(text.encode('utf-8'))
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], key + '.txt')
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            print(f"Warning: could not read extraction cache file {path}: {e}")
+            return None
+
+    def _write_disk(self, key, text):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file first so a crash never leaves a truncated entry behind
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Warning: could not write extraction cache file {path}: {e}")
+
+    def _put_memory(self, key, text):
+        size = self._size_of(text)
+        if size > self.max_bytes:
+            return  # Too large to keep in memory; the disk tier still has it
+        if key in self._entries:
+            self._bytes -= self._size_of(self._entries.pop(key))
+        self._entries[key] = text
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= self._size_of(evicted)
+            self.evictions += 1
+
+    def get(self, key):
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return text
+        text = self._read_disk(key)
+        with self._lock:
+            if text is not None:
+                self.disk_hits += 1
+                self._put_memory(key, text)
+            else:
+                self.misses += 1
+        return text
+
+    def put(self, key, text):
+        with self._lock:
+            self._put_memory(key, text)
+        self._write_disk(key, text)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "disk_dir": self.disk_dir,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+def _cached_extract_by_key(cache, key, extract_thunk):
+    text = cache.get(key)
+    if text is not None:
+        print(f"Extraction cache hit for {key[:12]}...")
+        return text
+    text = extract_thunk()
+    if text:  # Don't cache empty extractions, they are reported as errors upstream
+        cache.put(key, text)
+    return text
+
+
+def cached_extract(cache, filepath, extract_fn):
+    if cache is None:
+        return extract_fn(filepath)
+    ext = os.path.basename(filepath).split('.')[-1]
+    key = ExtractionCache.make_key(hash_file(filepath), ext)
+    return _cached_extract_by_key(cache, key, lambda: extract_fn(filepath))
+
+
+def cached_extract_stream(cache, stream, filename, extract_fn):
+    # Same as cached_extract, for an upload stream that never touches the filesystem
+    if cache is None:
+        return extract_fn(stream, filename)
+    ext = filename.split('.')[-1]
+    key = ExtractionCache.make_key(hash_stream(stream), ext)
+    return _cached_extract_by_key(cache, key, lambda: extract_fn(stream, filename))
+
+
+def create_extraction_cache_from_env():
+    if os.getenv('EXTRACTION_CACHE_ENABLED', 'True').lower() not in ('true', '1', 't'):
+        print("Extraction cache disabled.")
+        return None
+    return ExtractionCache(
+        max_entries=_env_int('EXTRACTION_CACHE_MAX_ENTRIES', 256),
+        max_bytes=_env_int('EXTRACTION_CACHE_MAX_BYTES', 32 * 1024 * 1024),
+        disk_dir=os.getenv('EXTRACTION_CACHE_DIR') or None,
+    )
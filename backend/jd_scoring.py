@@ -0,0 +1,218 @@
+import hashlib
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+
+from text_compaction import tokenize
+
+# Local JD-match scoring, no network involved: TF-IDF cosine similarity between one job
+# description and many resumes, plus the JD keywords each resume matches or misses.
+# Each resume is reduced once to a sparse vector (term hashes + counts); scoring a batch is
+# a handful of NumPy reductions over the concatenated vectors in a hashed feature space.
+# Building a vector (tokenization) dominates: ~0.7ms per 5KB resume on one core, so a batch of
+# thousands of unseen resumes takes seconds. Once their vectors are cached (TermVectorCache),
+# ranking thousands against a posting takes well under a second (~40us per resume); see
+# benchmarks/bench_scoring.py.
+
+DEFAULT_KEYWORD_COUNT = 25
+HASH_BUCKETS = 2 ** 20  # feature space for document frequencies; must be a power of two
+SMALL_HASH_BUCKETS = 2 ** 16  # for the few thousand terms of a single resume and JD
+
+# Common JD words that make useless "missing keyword" advice
+_KEYWORD_FILLER = frozenset("""
+ability able behind build building candidate candidates clear company day end etc excellent experience
+good great habit help ideal including join looking major must new own plus preferred required
+requirements responsibilities responsible role should strong such team teams understanding well work
+working year years
+""".split())
+_BULLET_LINE = re.compile(r'^\s*([*\-•o▪●]|\d+[.)])\s+')
+
+
+def extract_job_keywords(job_description, max_keywords=DEFAULT_KEYWORD_COUNT):
+    # Returns [(term, weight)] heaviest first. Weights depend only on the JD (not on the resumes
+    # being ranked): repeated terms, skill-like words (capitalised mid-sentence, or containing
+    # + # . or digits, e.g. PostgreSQL, C++, S3) and words from requirement bullets rank higher.
+    skill_like, bullet_words = set(), set()
+    for line in job_description.split('\n'):
+        words = line.split()
+        for previous, word in zip([''] + words, words):
+            if (word[:1].isupper() and previous and not previous.endswith(('.', ':', '!', '?'))) \
+                    or any(char in word for char in '+#') or any(char.isdigit() for char in word):
+                skill_like.update(tokenize(word))
+        if _BULLET_LINE.match(line):
+            bullet_words.update(tokenize(line))
+
+    weights = {}
+    for term, count in Counter(extract_terms(job_description)).items():
+        words = term.split(' ')
+        # Bigrams only when the JD repeats them, to skip incidental word pairs
+        if any(word in _KEYWORD_FILLER for word in words) or (len(words) > 1 and count < 2):
+            continue
+        weight = 1 + math.log(count)
+        if any(word in skill_like for word in words):
+            weight *= 2
+        if all(word in bullet_words for word in words):
+            weight *= 1.5
+        weights[term] = weight
+    # sorted() is stable, so equal weights keep the JD's order
+    return sorted(weights.items(), key=lambda item: -item[1])[:max_keywords]
+
+
+def extract_terms(text):
+    # Unigrams plus adjacent-word bigrams within a line ("distributed systems", "machine learning")
+    terms = []
+    for line in text.split('\n'):
+        words = tokenize(line)
+        terms.extend(words)
+        terms.extend(f"{first} {second}" for first, second in zip(words, words[1:]))
+    return terms
+
+
+def _term_counts(text):
+    # Same terms as extract_terms, counted, from a single tokenize() pass over the whole text
+    # instead of one per line; this is most of the cost of scoring a resume the cache has not seen
+    words = tokenize(text, keep_line_breaks=True)
+    counts = Counter(word for word in words if word != '\n')
+    counts.update(bigram for bigram in map(' '.join, zip(words, words[1:])) if '\n' not in bigram)
+    return counts
+
+
+class TermVector:
+    # Sparse term counts; hashes are Python's str hash, stable for the life of the process
+    __slots__ = ('hashes', 'counts')
+
+    def __init__(self, text):
+        import numpy as np
+        term_counts = _term_counts(text or '')
+        self.hashes = np.fromiter(map(hash, term_counts), dtype=np.int64, count=len(term_counts))
+        self.counts = np.fromiter(term_counts.values(), dtype=np.float64, count=len(term_counts))
+
+
+class TermVectorCache:
+    # LRU of term vectors keyed by a hash of the text, so re-ranking known resumes skips tokenization
+    def __init__(self, max_entries=20000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text):
+        key = hashlib.sha256((text or '').encode('utf-8', 'replace')).digest()
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vector
+            self.misses += 1
+        vector = TermVector(text)
+        with self._lock:
+            self._entries[key] = vector
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return vector
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries,
+                    "hits": self.hits, "misses": self.misses}
+
+
+def _cosine_scores(vectors, hash_buckets=HASH_BUCKETS):
+    # TF-IDF cosine of every vector against the last one (the JD), which also counts as a document
+    # for document frequencies. Returns (scores, all_hashes, doc_index, jd_start).
+    import numpy as np
+    jd_vector = vectors[-1]
+    doc_count = len(vectors)
+
+    lengths = np.fromiter((len(vector.hashes) for vector in vectors), dtype=np.int64, count=doc_count)
+    all_hashes = np.concatenate([vector.hashes for vector in vectors])
+    all_counts = np.concatenate([vector.counts for vector in vectors])
+    doc_index = np.repeat(np.arange(doc_count), lengths)
+
+    # Hashed feature space: terms are unique within a vector, so per-bucket occurrence counts are
+    # document frequencies, computed with a bincount instead of sorting the whole vocabulary
+    buckets = all_hashes & (hash_buckets - 1)
+    document_frequency = np.bincount(buckets, minlength=hash_buckets)
+    idf = np.log((1 + doc_count) / (1 + document_frequency[buckets])) + 1
+    weights = (1 + np.log(all_counts)) * idf  # sublinear tf
+    norms = np.sqrt(np.bincount(doc_index, weights=weights ** 2, minlength=doc_count))
+
+    jd_start = len(all_hashes) - len(jd_vector.hashes)
+    query = np.zeros(hash_buckets)
+    query[buckets[jd_start:]] = weights[jd_start:]
+    dots = np.bincount(doc_index[:jd_start], weights=weights[:jd_start] * query[buckets[:jd_start]],
+                       minlength=doc_count - 1)
+    denominators = norms[:-1] * norms[-1]
+    scores = np.divide(dots, denominators, out=np.zeros(doc_count - 1), where=denominators > 0)
+    return scores, all_hashes, doc_index, jd_start
+
+
+def _score(job_description, resume_texts, keyword_count, vector_cache):
+    # Returns (job_keywords, scores, coverage, matched) as arrays aligned with resume_texts
+    import numpy as np
+    make_vector = vector_cache.get if vector_cache is not None else TermVector
+    vectors = [make_vector(text) for text in resume_texts] + [TermVector(job_description)]
+    doc_count = len(vectors)
+    scores, all_hashes, doc_index, jd_start = _cosine_scores(vectors)
+
+    # Which resumes contain which JD keyword, as one (resumes x keywords) boolean matrix
+    keywords = extract_job_keywords(job_description, keyword_count)
+    job_keywords = [term for term, _ in keywords]
+    keyword_weights = np.array([weight for _, weight in keywords], dtype=np.float64)
+    matched = np.zeros((doc_count - 1, len(job_keywords)), dtype=bool)
+    if job_keywords:
+        keyword_hashes = np.fromiter((hash(term) for term in job_keywords), dtype=np.int64, count=len(job_keywords))
+        order = np.argsort(keyword_hashes)
+        resume_hashes = all_hashes[:jd_start]
+        hit = np.isin(resume_hashes, keyword_hashes)
+        slots = order[np.searchsorted(keyword_hashes[order], resume_hashes[hit])]
+        matched[doc_index[:jd_start][hit], slots] = True
+    total_keyword_weight = keyword_weights.sum()
+    coverage = (matched @ keyword_weights) / total_keyword_weight if total_keyword_weight else np.zeros(doc_count - 1)
+    return job_keywords, scores, coverage, matched
+
+
+def _result(job_keywords, scores, coverage, matched, row):
+    return {
+        "score": round(float(scores[row]), 4),
+        "keyword_coverage": round(float(coverage[row]), 4),
+        "matched_keywords": [keyword for keyword, hit in zip(job_keywords, matched[row]) if hit],
+        "missing_keywords": [keyword for keyword, hit in zip(job_keywords, matched[row]) if not hit],
+    }
+
+
+def score_resumes(job_description, resume_texts, keyword_count=DEFAULT_KEYWORD_COUNT, vector_cache=None):
+    # Returns (job_keywords, results) with one result dict per resume text, in input order
+    job_keywords, *arrays = _score(job_description, resume_texts, keyword_count, vector_cache)
+    return job_keywords, [_result(job_keywords, *arrays, row) for row in range(len(resume_texts))]
+
+
+def rank_resumes(job_description, resume_texts, top_k=None, keyword_count=DEFAULT_KEYWORD_COUNT, vector_cache=None):
+    # Returns (job_keywords, [(input_index, result), ...]) best match first; only the top_k results are built
+    import numpy as np
+    job_keywords, scores, coverage, matched = _score(job_description, resume_texts, keyword_count, vector_cache)
+    order = np.argsort(-scores, kind='stable')[:top_k or None]
+    return job_keywords, [(int(row), _result(job_keywords, scores, coverage, matched, row)) for row in order]
+
+
+def relevance_scores(job_description, texts):
+    # Cosine similarity of each text (e.g. the entries of one resume) to the JD, as a NumPy array
+    # aligned with texts; no keyword analysis, so it is cheap enough to run on every request
+    import numpy as np
+    if not texts:
+        return np.zeros(0)
+    vectors = [TermVector(text) for text in texts] + [TermVector(job_description)]
+    return _cosine_scores(vectors, SMALL_HASH_BUCKETS)[0]
+
+
+def create_vector_cache_from_env():
+    try:
+        max_entries = int(os.getenv('SCORE_VECTOR_CACHE_ENTRIES', 20000))
+    except ValueError:
+        print("Warning: invalid SCORE_VECTOR_CACHE_ENTRIES, using the default.")
+        max_entries = 20000
+    return TermVectorCache(max_entries=max_entries) if max_entries > 0 else None
@@ -0,0 +1,293 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Background job queue for resume tailoring: submit returns a job id right away,
+# a bounded worker pool does the work, and clients poll for status/results.
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+ACTIVE_STATUSES = (JOB_QUEUED, JOB_RUNNING)
+
+PUBLIC_JOB_FIELDS = ('id', 'status', 'created_at', 'started_at', 'finished_at', 'error', 'filename')
+ABANDONED_JOB_ERROR = "The job was interrupted (the server restarted). Please submit it again."
+
+
+class JobQueueFullError(Exception):
+    pass
+
+
+class JobFailedError(Exception):
+    # Raised by job functions for expected failures; the message is shown to the client
+    pass
+
+
+# --- Job stores ---
+class InMemoryJobStore:
+    # Jobs live and die with this process, so none can be left behind by another one
+    shared = False
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, record, max_active):
+        with self._lock:
+            active = sum(1 for job in self._jobs.values() if job['status'] in ACTIVE_STATUSES)
+            if active >= max_active:
+                return False
+            self._jobs[record['id']] = dict(record)
+            return True
+
+    def update(self, job_id, expected_status=None, **fields):
+        # Returns False, changing nothing, when the job is gone or not in expected_status
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or (expected_status is not None and job['status'] != expected_status):
+                return False
+            job.update(fields)
+            return True
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def count_active(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job['status'] in ACTIVE_STATUSES)
+
+    def purge_finished_before(self, cutoff):
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job['status'] not in ACTIVE_STATUSES and (job['finished_at'] or 0) < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+            return len(expired)
+
+
+class SqliteJobStore:
+    # Local stand-in for a shared store: several worker processes on one host can point at the same file.
+    # Each job records the process that owns it, and owners heartbeat their active jobs.
+    shared = True
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, status TEXT NOT NULL, created_at REAL, started_at REAL, "
+                "finished_at REAL, error TEXT, filename TEXT, result BLOB)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)")
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, column_type in (('owner', 'TEXT'), ('heartbeat_at', 'REAL')):
+                if column not in columns: # Files created before jobs had owners
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def create(self, record, max_active):
+        conn = self._connect()
+        try:
+            # BEGIN IMMEDIATE takes the write lock so the depth check and insert are atomic across processes
+            conn.execute("BEGIN IMMEDIATE")
+            (active,) = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", ACTIVE_STATUSES
+            ).fetchone()
+            if active >= max_active:
+                conn.execute("ROLLBACK")
+                return False
+            conn.execute(
+                "INSERT INTO jobs (id, status, created_at, started_at, finished_at, error, filename, result, "
+                "owner, heartbeat_at) VALUES (:id, :status, :created_at, :started_at, :finished_at, :error, "
+                ":filename, :result, :owner, :created_at)",
+                record,
+            )
+            conn.execute("COMMIT")
+            return True
+        finally:
+            conn.close()
+
+    def update(self, job_id, expected_status=None, **fields):
+        # Returns False, changing nothing, when the job is gone or not in expected_status
+        if not fields:
+            return False
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        condition, params = "id = ?", [job_id]
+        if expected_status is not None:
+            condition += " AND status = ?"
+            params.append(expected_status)
+        conn = self._connect()
+        try:
+            cursor = conn.execute(f"UPDATE jobs SET {assignments} WHERE {condition}", (*fields.values(), *params))
+            return cursor.rowcount > 0
+        finally:
+            conn.close()
+
+    def get(self, job_id):
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return dict(row) if row else None
+        finally:
+            conn.close()
+
+    def count_active(self):
+        conn = self._connect()
+        try:
+            (active,) = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", ACTIVE_STATUSES
+            ).fetchone()
+            return active
+        finally:
+            conn.close()
+
+    def purge_finished_before(self, cutoff):
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "DELETE FROM jobs WHERE status NOT IN (?, ?) AND finished_at < ?", (*ACTIVE_STATUSES, cutoff)
+            )
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+    def heartbeat(self, owner, now):
+        conn = self._connect()
+        try:
+            conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND status IN (?, ?)",
+                         (now, owner, *ACTIVE_STATUSES))
+        finally:
+            conn.close()
+
+    def fail_abandoned(self, stale_before, now):
+        # Active rows whose owner stopped heartbeating (crashed or restarted) would otherwise count
+        # against max_active forever. Jobs of a live owner are never touched, however long they run.
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, error = ? "
+                "WHERE status IN (?, ?) AND COALESCE(heartbeat_at, started_at, created_at) < ?",
+                (JOB_FAILED, now, ABANDONED_JOB_ERROR, *ACTIVE_STATUSES, stale_before),
+            )
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+
+# --- Queue ---
+class JobQueue:
+    def __init__(self, store, max_workers=4, max_queue_depth=32, result_ttl_seconds=900, heartbeat_seconds=30):
+        self.store = store
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self.result_ttl_seconds = result_ttl_seconds
+        # In a shared store, active jobs whose owner has not heartbeated for 4 intervals are abandoned
+        self.heartbeat_seconds = heartbeat_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tailor-job')
+        if store.shared and heartbeat_seconds:
+            threading.Thread(target=self._heartbeat_loop, name='tailor-job-heartbeat', daemon=True).start()
+        self._purge_expired()
+
+    def _heartbeat_loop(self):
+        while True:
+            time.sleep(self.heartbeat_seconds)
+            try:
+                self.store.heartbeat(self.owner, time.time())
+            except Exception as e:
+                print(f"Warning: job heartbeat failed: {e}")
+
+    def _purge_expired(self):
+        now = time.time()
+        self.store.purge_finished_before(now - self.result_ttl_seconds)
+        if self.store.shared and self.heartbeat_seconds:
+            abandoned = self.store.fail_abandoned(stale_before=now - 4 * self.heartbeat_seconds, now=now)
+            if abandoned:
+                print(f"Marked {abandoned} abandoned job(s) as failed.")
+
+    def submit(self, job_fn, *args, filename=None):
+        # job_fn(*args) must return (result_bytes, result_filename) or raise
+        self._purge_expired()
+        job_id = uuid.uuid4().hex
+        record = {
+            'id': job_id, 'status': JOB_QUEUED, 'created_at': time.time(), 'started_at': None,
+            'finished_at': None, 'error': None, 'filename': filename, 'result': None, 'owner': self.owner,
+        }
+        if not self.store.create(record, self.max_queue_depth):
+            raise JobQueueFullError(f"Job queue is full ({self.max_queue_depth} jobs queued or running).")
+        self._executor.submit(self._run, job_id, job_fn, args)
+        return job_id
+
+    def _run(self, job_id, job_fn, args):
+        # Every transition is conditional on the current status: a job another process has already
+        # marked failed is never run or revived
+        if not self.store.update(job_id, expected_status=JOB_QUEUED, status=JOB_RUNNING, started_at=time.time()):
+            print(f"Job {job_id} is no longer queued; skipping it.")
+            return
+        try:
+            result_bytes, result_filename = job_fn(*args)
+            finished = self.store.update(job_id, expected_status=JOB_RUNNING, status=JOB_DONE, finished_at=time.time(),
+                                         result=result_bytes, filename=result_filename)
+            print(f"Job {job_id} finished." if finished else f"Job {job_id} finished after it was marked failed.")
+        except (JobFailedError, ValueError) as e:
+            print(f"Job {job_id} failed: {e}")
+            self.store.update(job_id, expected_status=JOB_RUNNING, status=JOB_FAILED, finished_at=time.time(),
+                              error=str(e))
+        except Exception as e:
+            print(f"Job {job_id} crashed: {e}")
+            traceback.print_exc()
+            self.store.update(job_id, expected_status=JOB_RUNNING, status=JOB_FAILED, finished_at=time.time(),
+                              error="An unexpected server error occurred. Please try again.")
+
+    def get(self, job_id):
+        self._purge_expired()
+        return self.store.get(job_id)
+
+    def stats(self):
+        self._purge_expired()
+        return {
+            "active": self.store.count_active(),
+            "max_workers": self.max_workers,
+            "max_queue_depth": self.max_queue_depth,
+            "result_ttl_seconds": self.result_ttl_seconds,
+            "heartbeat_seconds": self.heartbeat_seconds if self.store.shared else None,
+        }
+
+
+def public_job_view(job):
+    return {field: job.get(field) for field in PUBLIC_JOB_FIELDS}
+
+
+def create_job_queue_from_env():
+    try:
+        max_workers = int(os.getenv('JOB_WORKERS', 4))
+        max_queue_depth = int(os.getenv('JOB_MAX_QUEUE_DEPTH', 32))
+        result_ttl_seconds = float(os.getenv('JOB_RESULT_TTL_SECONDS', 900))
+        heartbeat_seconds = float(os.getenv('JOB_HEARTBEAT_SECONDS', 30))
+    except ValueError:
+        print("Warning: invalid JOB_* settings, using defaults.")
+        max_workers, max_queue_depth, result_ttl_seconds, heartbeat_seconds = 4, 32, 900, 30
+
+    store_type = os.getenv('JOB_STORE', 'memory').lower()
+    if store_type == 'sqlite':
+        store = SqliteJobStore(os.getenv('JOB_STORE_PATH', 'jobs.sqlite3'))
+    elif store_type == 'memory':
+        store = InMemoryJobStore()
+    else:
+        raise ValueError(f"Unknown JOB_STORE '{store_type}'. Use 'memory' or 'sqlite'.")
+    return JobQueue(store, max_workers=max_workers, max_queue_depth=max_queue_depth,
+                    result_ttl_seconds=result_ttl_seconds, heartbeat_seconds=heartbeat_seconds)
@@ -0,0 +1,195 @@
+import asyncio
+import os
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+import model_registry
+
+# Generation backends. Each backend hands out model objects with a Gemini-compatible
+# generate_content(prompt, generation_config=..., safety_settings=..., stream=...) method
+# and its generate_content_async counterpart (used by async_app.py), so the response
+# checks in app.py work unchanged whichever backend is active.
+
+
+class GeminiBackend:
+    name = 'gemini'
+
+    def get_model(self, model_name):
+        return model_registry.get_model(model_name)
+
+    def make_generation_config(self, config):
+        return model_registry.get_generation_config(config)
+
+
+# --- Fake backend for load tests ---
+def _fake_response(text, finish_reason='STOP'):
+    part = SimpleNamespace(text=text)
+    candidate = SimpleNamespace(
+        content=SimpleNamespace(parts=[part] if text else []),
+        finish_reason=SimpleNamespace(name=finish_reason),
+        safety_ratings=[],
+    )
+    return SimpleNamespace(candidates=[candidate], prompt_feedback=None)
+
+
+_FAKE_PROMPT_FEEDBACK = SimpleNamespace(block_reason=SimpleNamespace(name='SAFETY'))
+
+
+def _fake_blocked_response():
+    # What Gemini returns for a blocked prompt: no candidates, the reason in prompt_feedback
+    return SimpleNamespace(candidates=[], prompt_feedback=_FAKE_PROMPT_FEEDBACK)
+
+
+class _FakeStreamingResponse:
+    # Mirrors the streamed GenerateContentResponse: iterate for chunks, then read .candidates.
+    # A blocked stream raises google-generativeai's BlockedPromptException after the first chunk,
+    # as the real client does while it is iterated.
+    def __init__(self, chunks, blocked=False):
+        self._chunks = chunks
+        self._parts = []
+        self._blocked = blocked
+        self.prompt_feedback = None
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            self._parts.append(chunk)
+            yield _fake_response(chunk)
+            if self._blocked:
+                self.prompt_feedback = _FAKE_PROMPT_FEEDBACK
+                raise model_registry.get_genai().types.BlockedPromptException(_fake_blocked_response())
+
+    @property
+    def candidates(self):
+        return _fake_response("".join(self._parts)).candidates
+
+
+class FakeModel:
+    def __init__(self, model_name, backend):
+        self.model_name = model_name
+        self.backend = backend
+
+    def generate_content(self, prompt, generation_config=None, safety_settings=None, stream=False):
+        backend = self.backend
+        backend.record_call()
+        time.sleep(backend.call_latency())  # time to first token
+        if backend.error_rate and backend.random() < backend.error_rate:
+            raise RuntimeError(backend.error_message)
+        blocked = bool(backend.block_rate) and backend.random() < backend.block_rate
+        if blocked and not stream:
+            return _fake_blocked_response()
+
+        output = backend.fake_output(prompt)
+        max_tokens = (generation_config or {}).get('max_output_tokens')
+        words = output.split(' ')
+        if max_tokens:
+            words = words[:max_tokens]
+        # Emit in chunks of ~20 tokens, pacing each chunk by the configured token rate
+        chunks = [' '.join(words[i:i + 20]) + (' ' if i + 20 < len(words) else '') for i in range(0, len(words), 20)]
+        if stream:
+            return _FakeStreamingResponse(self._paced(chunks), blocked=blocked)
+        for _ in self._paced(chunks):
+            pass
+        return _fake_response("".join(chunks))
+
+    async def generate_content_async(self, prompt, generation_config=None, safety_settings=None):
+        # Same behaviour as generate_content, waiting on the event loop instead of sleeping a thread
+        backend = self.backend
+        backend.record_call()
+        await asyncio.sleep(backend.call_latency())
+        if backend.error_rate and backend.random() < backend.error_rate:
+            raise RuntimeError(backend.error_message)
+        if backend.block_rate and backend.random() < backend.block_rate:
+            return _fake_blocked_response()
+
+        words = backend.fake_output(prompt).split(' ')
+        max_tokens = (generation_config or {}).get('max_output_tokens')
+        if max_tokens:
+            words = words[:max_tokens]
+        if backend.tokens_per_second:
+            await asyncio.sleep(len(words) / backend.tokens_per_second)
+        return _fake_response(' '.join(words))
+
+    def _paced(self, chunks):
+        for chunk in chunks:
+            if self.backend.tokens_per_second:
+                time.sleep(len(chunk.split()) / self.backend.tokens_per_second)
+            yield chunk
+
+    def count_tokens(self, text):
+        return SimpleNamespace(total_tokens=len(text.split()))
+
+
+class FakeBackend:
+    # Local stand-in for Gemini with configurable latency (including a slow tail), token rate, error
+    # injection and blocked responses (block_rate; streams are cut off after their first chunk)
+    name = 'fake'
+    # The resume (single-call prompts) or resume part (section prompts) block; the payload may
+    # itself contain '---' lines, so the block ends at the last '---' before the next heading
+    _resume_pattern = re.compile(
+        r'\*\*(?:Original Resume Text|Resume Part \([^\n]*\)):\*\*\s*---\s*(.*)\n\s*---\s*\*\*', re.S)
+    _last_block_pattern = re.compile(r'---\s*(.*?)\s*---\s*(?:\*\*[^\n]*)?\s*$', re.S)
+
+    def __init__(self, latency_seconds=0.5, tokens_per_second=0, error_rate=0.0,
+                 error_message="429 RESOURCE_EXHAUSTED: Quota exceeded (injected by fake backend)", seed=None,
+                 slow_rate=0.0, slow_latency_seconds=0.0, block_rate=0.0):
+        self.latency_seconds = latency_seconds
+        self.slow_rate = slow_rate
+        self.slow_latency_seconds = slow_latency_seconds
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.error_message = error_message
+        self.block_rate = block_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def random(self):
+        with self._lock:
+            return self._random.random()
+
+    def call_latency(self):
+        # slow_rate of the calls take slow_latency_seconds instead, like an occasional stuck upstream request
+        if self.slow_rate and self.random() < self.slow_rate:
+            return self.slow_latency_seconds
+        return self.latency_seconds
+
+    def record_call(self):
+        with self._lock:
+            self.calls += 1
+
+    def fake_output(self, prompt):
+        # Echo only the resume text being rewritten so output size scales with it, like a real
+        # rewrite; other prompts echo their last '---' block, the payload, rather than the instructions
+        match = self._resume_pattern.search(prompt) or self._last_block_pattern.search(prompt)
+        return match.group(1).strip() if match else prompt
+
+    def get_model(self, model_name):
+        return FakeModel(model_name, self)
+
+    def make_generation_config(self, config):
+        return dict(config)
+
+
+def create_llm_backend_from_env():
+    backend_name = os.getenv('LLM_BACKEND', 'gemini').lower()
+    if backend_name == 'gemini':
+        return GeminiBackend()
+    if backend_name == 'fake':
+        backend = FakeBackend(
+            latency_seconds=float(os.getenv('FAKE_LLM_LATENCY_SECONDS', 0.5)),
+            tokens_per_second=float(os.getenv('FAKE_LLM_TOKENS_PER_SECOND', 0)),
+            error_rate=float(os.getenv('FAKE_LLM_ERROR_RATE', 0)),
+            slow_rate=float(os.getenv('FAKE_LLM_SLOW_RATE', 0)),
+            slow_latency_seconds=float(os.getenv('FAKE_LLM_SLOW_LATENCY_SECONDS', 10)),
+            block_rate=float(os.getenv('FAKE_LLM_BLOCK_RATE', 0)),
+        )
+        print(f"Using fake LLM backend (latency={backend.latency_seconds}s, "
+              f"tokens/s={backend.tokens_per_second or 'unlimited'}, error_rate={backend.error_rate}"
+              + (f", {backend.slow_rate:.0%} of calls take {backend.slow_latency_seconds}s" if backend.slow_rate else "")
+              + (f", {backend.block_rate:.0%} of calls blocked" if backend.block_rate else "")
+              + ").")
+        return backend
+    raise ValueError(f"Unknown LLM_BACKEND '{backend_name}'. Use 'gemini' or 'fake'.")
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Response cache for AI tailoring calls, with single-flight coalescing so concurrent
+# identical requests (double-submits, retries) share one upstream call.
+
+
+def _normalize_text(text):
+    # Line endings and trailing whitespace differ between browsers/OSes but don't change the prompt meaning
+    text = (text or '').replace('\r\n', '\n').replace('\r', '\n')
+    return '\n'.join(line.rstrip() for line in text.split('\n')).strip()
+
+
+def make_llm_cache_key(model_name, generation_config, job_description, resume_text):
+    payload = json.dumps({
+        "model": model_name,
+        "config": generation_config,
+        "jd": _normalize_text(job_description),
+        "resume": _normalize_text(resume_text),
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def make_prompt_cache_key(model_name, generation_config, prompt):
+    payload = json.dumps({
+        "model": model_name,
+        "config": generation_config,
+        "prompt": _normalize_text(prompt),
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def is_cacheable_result(result):
+    return isinstance(result, str) and bool(result.strip()) and not result.startswith("Error:")
+
+
+class _InFlight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.exception = None
+        self.waiters = 0
+
+
+class LLMResponseCache:
+    def __init__(self, ttl_seconds=3600, max_entries=512):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, text), most recently used last
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _get_locked(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, text = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return text
+
+    def _put_locked(self, key, text):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, text)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key):
+        with self._lock:
+            text = self._get_locked(key)
+            if text is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return text
+
+    def put(self, key, text):
+        if not is_cacheable_result(text):
+            return
+        with self._lock:
+            self._put_locked(key, text)
+
+    def get_or_compute(self, key, compute_fn):
+        with self._lock:
+            text = self._get_locked(key)
+            if text is not None:
+                self.hits += 1
+                return text
+            flight = self._in_flight.get(key)
+            if flight is not None:
+                flight.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                flight = _InFlight()
+                self._in_flight[key] = flight
+                self.misses += 1
+                leader = True
+
+        if not leader:
+            print(f"Coalescing AI request {key[:12]}... with an in-flight identical request.")
+            flight.event.wait()
+            if flight.exception is not None:
+                raise flight.exception
+            return flight.result
+
+        try:
+            result = compute_fn()
+            flight.result = result
+        except Exception as e:
+            flight.exception = e
+            raise
+        finally:
+            with self._lock:
+                # Error strings are shared with coalesced waiters but never cached
+                if flight.exception is None and is_cacheable_result(flight.result):
+                    self._put_locked(key, flight.result)
+                self._in_flight.pop(key, None)
+            flight.event.set()
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "in_flight": len(self._in_flight),
+                "ttl_seconds": self.ttl_seconds,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+def create_llm_cache_from_env():
+    if os.getenv('LLM_CACHE_ENABLED', 'True').lower() not in ('true', '1', 't'):
+        print("AI response cache disabled.")
+        return None
+    try:
+        ttl_seconds = float(os.getenv('LLM_CACHE_TTL_SECONDS', 3600))
+        max_entries = int(os.getenv('LLM_CACHE_MAX_ENTRIES', 512))
+    except ValueError:
+        print("Warning: invalid LLM_CACHE_* settings, using defaults.")
+        ttl_seconds, max_entries = 3600, 512
+    return LLMResponseCache(ttl_seconds=ttl_seconds, max_entries=max_entries)
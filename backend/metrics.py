@@ -0,0 +1,186 @@
+import bisect
+import cProfile
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# In-process metrics rendered in the Prometheus text exposition format (no client library
+# needed), plus an opt-in sampling profiler. Values are per process: with several workers,
+# scrape each one and let Prometheus aggregate.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape_label_value(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}  # label values tuple -> total
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(zip(self.label_names, key))} {_format_value(value)}"
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values tuple -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series_items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in series_items:
+            labels = list(zip(self.label_names, key))
+            cumulative = 0
+            # Counts are stored per bucket and made cumulative here, as the format requires
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield f"{self.name}_bucket{_format_labels(labels + [('le', _format_value(float(bound)))])} {cumulative}"
+            yield f"{self.name}_bucket{_format_labels(labels + [('le', '+Inf')])} {series[-1]}"
+            yield f"{self.name}_sum{_format_labels(labels)} {_format_value(float(series[-2]))}"
+            yield f"{self.name}_count{_format_labels(labels)} {series[-1]}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help_text, label_names=()):
+        metric = Counter(name, help_text, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help_text, label_names, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collect_fn):
+        # collect_fn() -> iterable of (name, type, help_text, [(labels_dict, value), ...]), read at scrape time
+        self._collectors.append(collect_fn)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.collect())
+        for collect_fn in self._collectors:
+            try:
+                samples = list(collect_fn())
+            except Exception as e:
+                print(f"Warning: metrics collector {getattr(collect_fn, '__name__', collect_fn)} failed: {e}")
+                continue
+            for name, metric_type, help_text, values in samples:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in values:
+                    lines.append(f"{name}{_format_labels(sorted(labels.items()))} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+class SamplingProfiler:
+    # Runs 1 in every `sample_every` calls under cProfile and dumps the stats to output_dir
+    # (inspect with `python -m pstats <file>` or snakeviz). Only the calling thread is profiled,
+    # and only one call at a time, so worker-pool threads show up as time spent waiting.
+    def __init__(self, sample_every=0, output_dir='profiles', max_files=100):
+        self.sample_every = sample_every
+        self.output_dir = output_dir
+        self.max_files = max_files
+        self.captured = 0
+        self._calls = itertools.count(1)
+        self._active = threading.Lock()
+
+    def _should_sample(self):
+        return bool(self.sample_every) and self.captured < self.max_files and next(self._calls) % self.sample_every == 0
+
+    def _dump(self, profiler, label):
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.captured += 1
+        path = os.path.join(self.output_dir, f"{label}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self.captured}.prof")
+        profiler.dump_stats(path)
+        print(f"Profile saved to {path}")
+
+    def sample(self, fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not self._should_sample() or not self._active.acquire(blocking=False):
+                return fn(*args, **kwargs)
+            try:
+                profiler = cProfile.Profile()
+                try:
+                    return profiler.runcall(fn, *args, **kwargs)
+                finally:
+                    self._dump(profiler, fn.__name__)
+            finally:
+                self._active.release()
+        return wrapper
+
+
+def create_profiler_from_env():
+    try:
+        sample_every = int(os.getenv('PROFILE_SAMPLE_EVERY', 0))
+        max_files = int(os.getenv('PROFILE_MAX_FILES', 100))
+    except ValueError:
+        print("Warning: invalid PROFILE_* settings, profiling disabled.")
+        sample_every, max_files = 0, 100
+    profiler = SamplingProfiler(sample_every, os.getenv('PROFILE_DIR', 'profiles'), max_files)
+    if sample_every:
+        print(f"Profiling 1 in {sample_every} requests into '{profiler.output_dir}' (max {max_files} files).")
+    return profiler
@@ -0,0 +1,84 @@
+import os
+import threading
+import time
+
+# Process-wide Gemini client state. google-generativeai is imported lazily, genai.configure runs
+# once, and GenerativeModel / GenerationConfig objects are built once and reused across requests.
+
+_lock = threading.Lock()
+_genai = None
+_configured = False
+_models = {}
+_generation_configs = {}
+
+
+def get_genai():
+    global _genai
+    if _genai is None:
+        with _lock:
+            if _genai is None:
+                import google.generativeai as genai
+                _genai = genai
+    return _genai
+
+
+def configure_genai():
+    global _configured
+    if _configured:
+        return
+    genai = get_genai()
+    with _lock:
+        if _configured:
+            return
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            raise ValueError("GOOGLE_API_KEY not found in environment variables. Please set it in the .env file.")
+        genai.configure(api_key=api_key)
+        _configured = True
+
+
+def get_model(model_name):
+    model = _models.get(model_name)
+    if model is not None:
+        return model
+    configure_genai()
+    genai = get_genai()
+    with _lock:
+        model = _models.get(model_name)
+        if model is None:
+            model = genai.GenerativeModel(model_name)
+            _models[model_name] = model
+    return model
+
+
+def get_generation_config(config):
+    key = tuple(sorted(config.items()))
+    generation_config = _generation_configs.get(key)
+    if generation_config is None:
+        generation_config = get_genai().types.GenerationConfig(**config)
+        _generation_configs[key] = generation_config
+    return generation_config
+
+
+def reset():
+    # Drops cached clients, e.g. after the API key changes
+    global _configured
+    with _lock:
+        _models.clear()
+        _generation_configs.clear()
+        _configured = False
+
+
+def warmup(model_names, generation_configs=(), ping=False):
+    # Builds clients ahead of the first request; ping=True makes a cheap count_tokens call to open the connection
+    started = time.perf_counter()
+    for model_name in model_names:
+        model = get_model(model_name)
+        if ping:
+            try:
+                model.count_tokens("warmup")
+            except Exception as e:
+                print(f"Warning: warmup ping to '{model_name}' failed: {e}")
+    for config in generation_configs:
+        get_generation_config(config)
+    return time.perf_counter() - started
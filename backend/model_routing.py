@@ -0,0 +1,242 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+
+# Length-aware model routing and hedged model calls.
+# - ModelRouter picks a model tier from the estimated input + output tokens of a call, so short
+#   rewrites can go to a fast model and long ones to a model with a bigger context window.
+# - RequestHedger cuts tail latency: when the primary call has not answered by a deadline taken
+#   from a latency percentile of recent calls to that model, a second identical call is sent and
+#   whichever answers first wins. Hedges are capped at a fraction of calls, because every hedge
+#   is a second paid request.
+
+
+class ModelRouter:
+    def __init__(self, routes):
+        # routes: [(max_tokens or None, model_name)], checked in order; None means no limit.
+        # Calls larger than every limit go to the last route.
+        if not routes:
+            raise ValueError("ModelRouter needs at least one route.")
+        self.routes = list(routes)
+        self._lock = threading.Lock()
+        self.routed = {model_name: 0 for _, model_name in self.routes}
+
+    @property
+    def models(self):
+        return list(dict.fromkeys(model_name for _, model_name in self.routes))
+
+    def route(self, input_tokens, output_tokens=0):
+        total_tokens = input_tokens + output_tokens
+        model_name = self.routes[-1][1]
+        for max_tokens, candidate in self.routes:
+            if max_tokens is None or total_tokens <= max_tokens:
+                model_name = candidate
+                break
+        with self._lock:
+            self.routed[model_name] += 1
+        return model_name
+
+    def stats(self):
+        with self._lock:
+            return {
+                "routes": [{"max_tokens": max_tokens, "model": model_name} for max_tokens, model_name in self.routes],
+                "routed": dict(self.routed),
+            }
+
+
+def parse_model_routes(spec):
+    # "8000:gemini-1.0-pro,*:gemini-1.5-pro-latest" -> [(8000, 'gemini-1.0-pro'), (None, 'gemini-1.5-pro-latest')]
+    routes = []
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        limit, _, model_name = item.partition(':')
+        if not model_name.strip():
+            raise ValueError(f"Invalid model route '{item}'. Use <max tokens>:<model> or *:<model>.")
+        limit = limit.strip()
+        routes.append((None if limit == '*' else int(limit), model_name.strip()))
+    return sorted(routes, key=lambda route: float('inf') if route[0] is None else route[0])
+
+
+def create_model_router_from_env(default_model):
+    spec = os.getenv('MODEL_ROUTES', '').strip()
+    if not spec:
+        return ModelRouter([(None, default_model)])
+    try:
+        router = ModelRouter(parse_model_routes(spec))
+    except ValueError as e:
+        print(f"Warning: invalid MODEL_ROUTES ({e}), sending every request to {default_model}.")
+        return ModelRouter([(None, default_model)])
+    print("Model routing: " + ", ".join(f"<= {max_tokens} tokens -> {model_name}" if max_tokens is not None
+                                        else f"larger -> {model_name}" for max_tokens, model_name in router.routes))
+    return router
+
+
+def _percentile(sorted_values, percent):
+    index = min(len(sorted_values) - 1, max(0, int(round(percent / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+class RequestHedger:
+    def __init__(self, percentile=95, min_delay_seconds=1.0, min_samples=20, window=200, max_hedge_ratio=0.1):
+        self.percentile = percentile
+        self.min_delay_seconds = min_delay_seconds
+        self.min_samples = min_samples
+        self.window = window
+        self.max_hedge_ratio = max_hedge_ratio
+        self._lock = threading.Lock()
+        self._latencies = {} # model -> deque of recent successful call latencies
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.primary_wins = 0 # Hedged, but the primary still answered first
+        self.over_budget = 0 # Past the deadline, but hedging would exceed max_hedge_ratio
+
+    def record_latency(self, model_name, seconds):
+        with self._lock:
+            samples = self._latencies.get(model_name)
+            if samples is None:
+                samples = self._latencies[model_name] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def hedge_delay(self, model_name):
+        # Seconds to wait for the primary before hedging, or None while there are too few samples
+        with self._lock:
+            samples = self._latencies.get(model_name)
+            if samples is None or len(samples) < self.min_samples:
+                return None
+            return max(self.min_delay_seconds, _percentile(sorted(samples), self.percentile))
+
+    def _begin_call(self, model_name):
+        with self._lock:
+            self.calls += 1
+        return self.hedge_delay(model_name)
+
+    def _take_hedge_budget(self):
+        with self._lock:
+            if self.hedged + 1 > self.max_hedge_ratio * self.calls:
+                self.over_budget += 1
+                return False
+            self.hedged += 1
+            return True
+
+    def _pick_winner(self, attempts, done, pending):
+        # First successful attempt wins; a failure only wins once nothing else is still running
+        finished = sorted(done, key=lambda attempt: attempt.exception() is not None)
+        winner = finished[0]
+        if winner.exception() is not None and pending:
+            return None
+        with self._lock:
+            if attempts[winner] == 'hedge':
+                self.hedge_wins += 1
+            else:
+                self.primary_wins += 1
+        return winner
+
+    def _start(self, fn, model_name):
+        future = Future()
+        started = time.perf_counter()
+
+        def run():
+            try:
+                result = fn()
+            except BaseException as e:
+                future.set_exception(e)
+                return
+            self.record_latency(model_name, time.perf_counter() - started)
+            future.set_result(result)
+
+        future.set_running_or_notify_cancel()
+        threading.Thread(target=run, name='hedged-call', daemon=True).start()
+        return future
+
+    def call(self, fn, model_name):
+        # Runs fn() and returns its result, hedging with a second fn() if it is slower than the deadline
+        delay = self._begin_call(model_name)
+        if delay is None:
+            started = time.perf_counter()
+            result = fn()
+            self.record_latency(model_name, time.perf_counter() - started)
+            return result
+        primary = self._start(fn, model_name)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._take_hedge_budget():
+            return primary.result()
+        print(f"No answer from {model_name} after {delay:.2f}s; sending a hedged request.")
+        hedge = self._start(fn, model_name)
+        attempts = {primary: 'primary', hedge: 'hedge'}
+        pending = set(attempts)
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = self._pick_winner(attempts, done, pending)
+            if winner is not None:
+                # A blocking client call cannot be interrupted; the loser's thread finishes on its own
+                # and its result is dropped (its latency still feeds the percentile)
+                return winner.result()
+
+    async def _timed_async(self, coroutine_fn, model_name):
+        started = time.perf_counter()
+        result = await coroutine_fn()
+        self.record_latency(model_name, time.perf_counter() - started)
+        return result
+
+    async def call_async(self, coroutine_fn, model_name):
+        # call() for coroutines; here the losing request really is cancelled
+        delay = self._begin_call(model_name)
+        primary = asyncio.ensure_future(self._timed_async(coroutine_fn, model_name))
+        if delay is None:
+            return await primary
+        attempts = {primary: 'primary'}
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done or not self._take_hedge_budget():
+                return await primary
+            print(f"No answer from {model_name} after {delay:.2f}s; sending a hedged request.")
+            attempts[asyncio.ensure_future(self._timed_async(coroutine_fn, model_name))] = 'hedge'
+            pending = set(attempts)
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = self._pick_winner(attempts, done, pending)
+                if winner is not None:
+                    return winner.result()
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+    def stats(self):
+        delays = {model_name: self.hedge_delay(model_name) for model_name in list(self._latencies)}
+        with self._lock:
+            return {
+                "percentile": self.percentile,
+                "max_hedge_ratio": self.max_hedge_ratio,
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "hedge_rate": round(self.hedged / self.calls, 4) if self.calls else 0.0,
+                "hedge_wins": self.hedge_wins,
+                "primary_wins": self.primary_wins,
+                "over_budget": self.over_budget,
+                "hedge_delay_seconds": {model_name: round(delay, 3) if delay is not None else None
+                                        for model_name, delay in delays.items()},
+            }
+
+
+def create_hedger_from_env():
+    if os.getenv('HEDGE_ENABLED', 'False').lower() not in ('true', '1', 't'):
+        return None
+    try:
+        hedger = RequestHedger(
+            percentile=float(os.getenv('HEDGE_PERCENTILE', 95)),
+            min_delay_seconds=float(os.getenv('HEDGE_MIN_DELAY_SECONDS', 1.0)),
+            min_samples=int(os.getenv('HEDGE_MIN_SAMPLES', 20)),
+            window=int(os.getenv('HEDGE_WINDOW', 200)),
+            max_hedge_ratio=float(os.getenv('HEDGE_MAX_RATIO', 0.1)),
+        )
+    except ValueError:
+        print("Warning: invalid HEDGE_* settings, using the defaults.")
+        hedger = RequestHedger()
+    print(f"Hedging model calls slower than p{hedger.percentile:g} of recent latency "
+          f"(at most {hedger.max_hedge_ratio:.0%} of calls).")
+    return hedger
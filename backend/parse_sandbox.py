@@ -0,0 +1,274 @@
+import os
+import queue
+import signal
+import socket
+import subprocess
+import sys
+import threading
+
+from text_extraction import FORMAT_LABELS, check_docx_archive, extract_document
+
+# Resume parsing in a pool of reusable, resource-bounded worker processes. PyPDF2 and
+# python-docx never run inside the web worker: each job gets a wall-clock timeout, every
+# worker has a capped address space, and a worker that times out, crashes or runs out of
+# memory is killed and replaced, so a hostile file costs one parse instead of a web worker.
+# Cheap structural limits (upload size, DOCX uncompressed size, PDF page count) are checked
+# before any text is extracted. The page limit only turns away absurd documents; long CVs are
+# truncated to PDF_MAX_PAGES / PDF_MAX_CHARS by the extractor like outside the sandbox.
+# Long PDFs can still be split over page_workers processes (pdf_extraction's page pool) started
+# by each worker; they inherit its memory cap and are killed with it, as one process group.
+
+class DocumentRejectedError(ValueError):
+    # The document broke a limit or could not be parsed; request handlers turn ValueError into a 400
+    pass
+
+
+class ParserBusyError(Exception):
+    def __init__(self, message, retry_after=5):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _address_space_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def _apply_memory_limit(limit_bytes):
+    # The cap is headroom on top of what the worker has mapped after its imports
+    if not limit_bytes:
+        return
+    try:
+        import resource
+    except ImportError: # Not available on Windows; timeouts still apply
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    limit = _address_space_bytes() + limit_bytes
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _worker_main(conn, memory_limit_bytes, max_pdf_pages, max_docx_uncompressed_bytes, page_workers):
+    # Imports happen before the memory cap so they are part of the baseline, not the budget
+    import PyPDF2 # noqa: F401
+    import docx # noqa: F401
+    from lxml import etree # noqa: F401
+    _apply_memory_limit(memory_limit_bytes)
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            return
+        if job is None:
+            return
+        data, ext = job
+        try:
+            conn.send(('ok', extract_document(data, ext, reject_over_pages=max_pdf_pages,
+                                              max_docx_uncompressed_bytes=max_docx_uncompressed_bytes,
+                                              parallel=page_workers > 1)))
+        except MemoryError:
+            conn.send(('error', "the document needs too much memory to parse"))
+            return # Start over in a fresh process rather than keep a fragmented heap
+        except Exception as e:
+            conn.send(('error', str(e) or e.__class__.__name__))
+
+
+class _Worker:
+    # A fresh interpreter running this file, not a multiprocessing child: those are forked from the
+    # threaded web process or re-import its __main__ (app.py) on start, neither of which we want here
+    def __init__(self, worker_args, page_workers=1):
+        from multiprocessing.connection import Connection
+        parent_socket, child_socket = socket.socketpair()
+        with child_socket:
+            # Own session, so kill() also reaches the page-extraction processes the worker forks
+            self.process = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), str(child_socket.fileno()), *map(str, worker_args)],
+                pass_fds=(child_socket.fileno(),), stdin=subprocess.DEVNULL, start_new_session=True,
+                env={**os.environ, 'PDF_EXTRACT_WORKERS': str(page_workers)},
+            )
+        self.conn = Connection(parent_socket.detach())
+        self.jobs = 0
+
+    def is_alive(self):
+        return self.process.poll() is None
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.conn.close()
+        try:
+            self.process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            self.kill()
+
+    def kill(self):
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (AttributeError, OSError): # No process groups on Windows, or already gone
+            self.process.kill()
+        self.process.wait()
+        self.conn.close()
+
+
+class ParseSandbox:
+    def __init__(self, workers=2, timeout_seconds=20, memory_limit_mb=512, max_file_bytes=10 * 1024 * 1024,
+                 max_pdf_pages=500, max_docx_uncompressed_bytes=100 * 1024 * 1024, max_jobs_per_worker=500,
+                 queue_timeout_seconds=30, page_workers=2):
+        self.workers = workers
+        self.timeout_seconds = timeout_seconds
+        self.memory_limit_mb = memory_limit_mb
+        self.max_file_bytes = max_file_bytes
+        self.max_pdf_pages = max_pdf_pages
+        self.max_docx_uncompressed_bytes = max_docx_uncompressed_bytes
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.page_workers = page_workers # Per worker, only for PDFs of PDF_PARALLEL_MIN_PAGES or more
+        self._worker_args = (memory_limit_mb * 1024 * 1024, max_pdf_pages, max_docx_uncompressed_bytes, page_workers)
+        # One slot per worker; None means "start a process on first use"
+        self._idle = queue.Queue()
+        for _ in range(workers):
+            self._idle.put(None)
+        self._lock = threading.Lock()
+        self.counts = {"jobs": 0, "failed": 0, "rejected": 0, "timeouts": 0, "crashes": 0,
+                       "busy": 0, "workers_started": 0, "workers_recycled": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def _start_worker(self):
+        self._count('workers_started')
+        return _Worker(self._worker_args, self.page_workers)
+
+    def start(self):
+        # Starts every idle worker now (e.g. during warmup) instead of on first use
+        slots = []
+        while True:
+            try:
+                slots.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        for worker in slots:
+            self._idle.put(worker if worker is not None else self._start_worker())
+
+    def _precheck(self, data, ext):
+        if ext not in FORMAT_LABELS:
+            raise ValueError("Unsupported file format. Only PDF and DOCX are supported.")
+        if self.max_file_bytes and len(data) > self.max_file_bytes:
+            self._count('rejected')
+            raise DocumentRejectedError(f"The resume file is too large. The maximum is "
+                                        f"{self.max_file_bytes // (1024 * 1024)}MB.")
+        if ext == 'docx':
+            try:
+                check_docx_archive(data, self.max_docx_uncompressed_bytes)
+            except ValueError as e:
+                self._count('rejected')
+                raise DocumentRejectedError(f"Could not extract text from DOCX: {e}")
+
+    def parse(self, data, ext):
+        # Returns (text, extraction report); raises DocumentRejectedError or ParserBusyError
+        self._precheck(data, ext)
+        label = FORMAT_LABELS[ext]
+        try:
+            worker = self._idle.get(timeout=self.queue_timeout_seconds)
+        except queue.Empty:
+            self._count('busy')
+            raise ParserBusyError("All document parsers are busy.", retry_after=max(1, int(self.timeout_seconds)))
+        try:
+            if worker is not None and not worker.is_alive():
+                print(f"Parse worker {worker.process.pid} died while idle (exit code {worker.process.returncode}); replacing it.")
+                self._count('crashes')
+                worker.kill()
+                worker = None
+            if worker is None:
+                worker = self._start_worker()
+            self._count('jobs')
+            try:
+                worker.conn.send((data, ext))
+                finished = worker.conn.poll(self.timeout_seconds)
+                result = worker.conn.recv() if finished else None
+            except (EOFError, OSError):
+                self._count('crashes')
+                worker.kill()
+                exitcode = worker.process.returncode
+                worker = None
+                raise DocumentRejectedError(f"Could not extract text from {label}: the parser stopped unexpectedly"
+                                            f"{f' (exit code {exitcode})' if exitcode is not None else ''}.")
+            if result is None:
+                print(f"Parse worker {worker.process.pid} exceeded {self.timeout_seconds}s; killing it.")
+                self._count('timeouts')
+                worker.kill()
+                worker = None
+                raise DocumentRejectedError(f"Could not extract text from {label}: "
+                                            f"parsing took longer than {self.timeout_seconds}s.")
+            worker.jobs += 1
+            status, payload = result
+            if status != 'ok':
+                self._count('failed')
+                raise DocumentRejectedError(f"Could not extract text from {label}: {payload}")
+            return payload
+        finally:
+            if worker is not None and self.max_jobs_per_worker and worker.jobs >= self.max_jobs_per_worker:
+                # Recycle long-lived workers so slow leaks in the parsers cannot accumulate
+                self._count('workers_recycled')
+                worker.stop()
+                worker = None
+            self._idle.put(worker)
+
+    def close(self):
+        for _ in range(self.workers):
+            worker = self._idle.get()
+            if worker is not None:
+                worker.stop()
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+        return {
+            "workers": self.workers,
+            "idle": self._idle.qsize(),
+            "timeout_seconds": self.timeout_seconds,
+            "memory_limit_mb": self.memory_limit_mb,
+            "max_file_bytes": self.max_file_bytes,
+            "max_pdf_pages": self.max_pdf_pages,
+            "page_workers": self.page_workers,
+            **counts,
+        }
+
+
+def create_parse_sandbox_from_env():
+    if os.getenv('PARSE_SANDBOX_ENABLED', 'True').lower() not in ('true', '1', 't'):
+        return None
+    try:
+        sandbox = ParseSandbox(
+            workers=int(os.getenv('PARSE_WORKERS', min(4, os.cpu_count() or 1))),
+            timeout_seconds=float(os.getenv('PARSE_TIMEOUT_SECONDS', 20)),
+            memory_limit_mb=int(os.getenv('PARSE_MEMORY_LIMIT_MB', 512)),
+            max_file_bytes=int(os.getenv('PARSE_MAX_FILE_BYTES', 10 * 1024 * 1024)),
+            max_pdf_pages=int(os.getenv('PARSE_MAX_PDF_PAGES', 500)),
+            max_docx_uncompressed_bytes=int(os.getenv('PARSE_MAX_DOCX_UNCOMPRESSED_BYTES', 100 * 1024 * 1024)),
+            max_jobs_per_worker=int(os.getenv('PARSE_MAX_JOBS_PER_WORKER', 500)),
+            queue_timeout_seconds=float(os.getenv('PARSE_QUEUE_TIMEOUT_SECONDS', 30)),
+            page_workers=int(os.getenv('PARSE_PDF_PAGE_WORKERS', min(2, os.cpu_count() or 1))),
+        )
+    except ValueError:
+        print("Warning: invalid PARSE_* settings, using the defaults.")
+        sandbox = ParseSandbox()
+    print(f"Parsing resumes in {sandbox.workers} sandboxed worker processes "
+          f"({sandbox.timeout_seconds}s timeout, {sandbox.memory_limit_mb}MB memory cap"
+          + (f", long PDFs split over {sandbox.page_workers} page processes each" if sandbox.page_workers > 1 else "")
+          + ").")
+    return sandbox
+
+
+if __name__ == '__main__':
+    # Worker entry point, see _Worker: parse_sandbox.py <socket fd> <memory bytes> <max PDF pages> <max DOCX bytes> <page workers>
+    from multiprocessing.connection import Connection
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # The parent stops workers on Ctrl-C
+    _worker_main(Connection(int(sys.argv[1])), *map(int, sys.argv[2:6]))
@@ -0,0 +1,154 @@
+import io
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# PDF text extraction engine: serial for short resumes, page ranges spread over a process
+# pool for long CVs, with an optional page/character budget so we stop once the prompt is full.
+
+
+class LimitExceededError(ValueError):
+    pass
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        print(f"Warning: invalid value for {name}, using default {default}.")
+        return default
+
+
+PDF_PARALLEL_MIN_PAGES = _env_int('PDF_PARALLEL_MIN_PAGES', 12)
+# In the web process this only applies with PARSE_SANDBOX_ENABLED=False; sandbox workers are
+# started with PDF_EXTRACT_WORKERS set to PARSE_PDF_PAGE_WORKERS instead
+PDF_EXTRACT_WORKERS = _env_int('PDF_EXTRACT_WORKERS', min(4, os.cpu_count() or 1))
+PDF_MAX_PAGES = _env_int('PDF_MAX_PAGES', 0)  # 0 = no limit
+# Roughly the input window of the tailoring prompt; anything past this is never sent to the model
+PDF_MAX_CHARS = _env_int('PDF_MAX_CHARS', 120000)  # 0 = no limit
+# Pages are separated by a form-feed line, so later stages (header/footer removal) know where pages end
+PAGE_BREAK = '\n\f\n'
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PDF_EXTRACT_WORKERS)
+        return _pool
+
+
+def _extract_page_range(pdf_bytes, start, stop):
+    # Runs in a worker process; returns [(page_index, text, seconds), ...]
+    from PyPDF2 import PdfReader
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    results = []
+    for index in range(start, stop):
+        started = time.perf_counter()
+        page_text = reader.pages[index].extract_text() or ""
+        results.append((index, page_text, time.perf_counter() - started))
+    return results
+
+
+def _read_source_bytes(source):
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            return f.read()
+    source.seek(0)
+    return source.read()
+
+
+def _split_ranges(page_count, parts):
+    size, remainder = divmod(page_count, parts)
+    ranges, start = [], 0
+    for part in range(parts):
+        stop = start + size + (1 if part < remainder else 0)
+        if stop > start:
+            ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+def extract_pdf_text(source, max_pages=None, max_chars=None, reject_over_pages=0, parallel=True):
+    # Returns (text, stats). source is a path or a seekable binary stream.
+    # reject_over_pages raises LimitExceededError before any page is extracted; parallel=False keeps the
+    # work in this process. Parse-sandbox workers get their own PDF_EXTRACT_WORKERS (PARSE_PDF_PAGE_WORKERS).
+    from PyPDF2 import PdfReader # Imported lazily to keep worker boot fast
+    max_pages = PDF_MAX_PAGES if max_pages is None else max_pages
+    max_chars = PDF_MAX_CHARS if max_chars is None else max_chars
+    started = time.perf_counter()
+
+    reader = PdfReader(source)
+    total_pages = len(reader.pages)
+    if reject_over_pages and total_pages > reject_over_pages:
+        raise LimitExceededError(f"the PDF has {total_pages} pages; the maximum is {reject_over_pages}")
+    page_count = min(total_pages, max_pages) if max_pages else total_pages
+
+    page_texts = []  # joined once at the end instead of repeated string concatenation
+    page_timings = []
+    chars = 0
+    mode = 'serial'
+
+    if parallel and page_count >= PDF_PARALLEL_MIN_PAGES and PDF_EXTRACT_WORKERS > 1:
+        mode = 'parallel'
+        pdf_bytes = _read_source_bytes(source)
+        # Twice as many ranges as workers so an early stop can skip the tail of the document
+        ranges = _split_ranges(page_count, PDF_EXTRACT_WORKERS * 2)
+        pool = _get_pool()
+        futures = [pool.submit(_extract_page_range, pdf_bytes, start, stop) for start, stop in ranges]
+        try:
+            for future in futures:
+                for index, page_text, seconds in future.result():
+                    page_timings.append((index, seconds))
+                    if page_text:
+                        page_texts.append(page_text)
+                        chars += len(page_text) + len(PAGE_BREAK)
+                if max_chars and chars >= max_chars:
+                    break
+        finally:
+            for future in futures:
+                future.cancel()
+    else:
+        for index in range(page_count):
+            page_started = time.perf_counter()
+            page_text = reader.pages[index].extract_text()
+            page_timings.append((index, time.perf_counter() - page_started))
+            if page_text:
+                page_texts.append(page_text)
+                chars += len(page_text) + len(PAGE_BREAK)
+            if max_chars and chars >= max_chars:
+                break
+
+    text = PAGE_BREAK.join(page_texts)
+    truncated = len(page_timings) < total_pages
+    if max_chars and len(text) > max_chars:
+        text = text[:max_chars]
+        truncated = True
+
+    stats = {
+        "mode": mode,
+        "total_pages": total_pages,
+        "pages_extracted": len(page_timings),
+        "chars": len(text),
+        "truncated": truncated,
+        "seconds": time.perf_counter() - started,
+        "page_seconds": [seconds for _, seconds in sorted(page_timings)],
+    }
+    return text, stats
+
+
+def format_pdf_stats(stats):
+    page_seconds = stats["page_seconds"]
+    summary = (f"{stats['pages_extracted']}/{stats['total_pages']} pages, {stats['chars']} chars "
+               f"in {stats['seconds']:.3f}s ({stats['mode']})")
+    if page_seconds:
+        slowest = max(range(len(page_seconds)), key=page_seconds.__getitem__)
+        summary += (f", avg {sum(page_seconds) / len(page_seconds) * 1000:.1f}ms/page, "
+                    f"slowest page {slowest + 1} {page_seconds[slowest] * 1000:.1f}ms")
+    if stats["truncated"]:
+        summary += ", stopped early at budget"
+    return summary
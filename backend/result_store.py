@@ -0,0 +1,116 @@
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Short-lived store for generated documents, handed out by opaque download tokens.
+# ResultStore keeps them in process memory: with several gunicorn workers, a download that lands
+# on another worker gets a 404 unless the load balancer is sticky. SqliteResultStore keeps them in
+# a file every worker on the host shares (DOWNLOAD_STORE=sqlite, like JOB_STORE=sqlite).
+
+
+class ResultStore:
+    def __init__(self, ttl_seconds=900, max_entries=256):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # token -> (expires_at, data, filename)
+        self._lock = threading.Lock()
+
+    def _purge_expired_locked(self):
+        now = time.monotonic()
+        expired = [token for token, (expires_at, _, _) in self._entries.items() if expires_at <= now]
+        for token in expired:
+            del self._entries[token]
+
+    def put(self, data, filename):
+        token = secrets.token_urlsafe(24)
+        with self._lock:
+            self._purge_expired_locked()
+            self._entries[token] = (time.monotonic() + self.ttl_seconds, data, filename)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return token
+
+    def get(self, token):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires_at, data, filename = entry
+            if expires_at <= time.monotonic():
+                del self._entries[token]
+                return None
+            return data, filename
+
+
+class SqliteResultStore:
+    # Same interface as ResultStore; expiry uses wall-clock time because it is shared between processes
+    def __init__(self, path, ttl_seconds=900, max_entries=256):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS downloads ("
+                "token TEXT PRIMARY KEY, expires_at REAL NOT NULL, filename TEXT, data BLOB)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS downloads_expires_at ON downloads (expires_at)")
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def put(self, data, filename):
+        token = secrets.token_urlsafe(24)
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM downloads WHERE expires_at <= ?", (now,))
+            conn.execute("INSERT INTO downloads (token, expires_at, filename, data) VALUES (?, ?, ?, ?)",
+                         (token, now + self.ttl_seconds, filename, data))
+            # Oldest first, like the in-memory store's LRU order
+            conn.execute(
+                "DELETE FROM downloads WHERE token IN (SELECT token FROM downloads ORDER BY expires_at DESC "
+                "LIMIT -1 OFFSET ?)", (self.max_entries,)
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return token
+
+    def get(self, token):
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT expires_at, data, filename FROM downloads WHERE token = ?", (token,)).fetchone()
+            if row is None:
+                return None
+            expires_at, data, filename = row
+            if expires_at <= time.time():
+                conn.execute("DELETE FROM downloads WHERE token = ?", (token,))
+                return None
+            return bytes(data), filename
+        finally:
+            conn.close()
+
+
+def create_result_store_from_env():
+    try:
+        ttl_seconds = int(os.getenv('DOWNLOAD_TTL_SECONDS', 900))
+        max_entries = int(os.getenv('DOWNLOAD_MAX_ENTRIES', 256))
+    except ValueError:
+        print("Warning: invalid DOWNLOAD_* settings, using defaults.")
+        ttl_seconds, max_entries = 900, 256
+    # Defaults to the job store's type: a deployment that shares jobs across workers shares downloads too
+    store_type = os.getenv('DOWNLOAD_STORE', os.getenv('JOB_STORE', 'memory')).lower()
+    if store_type == 'sqlite':
+        return SqliteResultStore(os.getenv('DOWNLOAD_STORE_PATH', 'downloads.sqlite3'),
+                                 ttl_seconds=ttl_seconds, max_entries=max_entries)
+    if store_type == 'memory':
+        return ResultStore(ttl_seconds=ttl_seconds, max_entries=max_entries)
+    raise ValueError(f"Unknown DOWNLOAD_STORE '{store_type}'. Use 'memory' or 'sqlite'.")
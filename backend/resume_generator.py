@@ -1,6 +1,6 @@
-import google.generativeai as genai
 import os
 from docx import Document
+import model_registry
 # from docx2pdf import convert # Optional for PDF conversion
 
 def tailor_resume_with_ai(job_description, resume_text):
@@ -15,7 +15,7 @@ def tailor_resume_with_ai(job_description, resume_text):
         return "Error: AI API Key is not configured. Please contact support."
 
     try:
-        genai.configure(api_key=api_key)
+        model_registry.configure_genai() # No-op after the first call
     except Exception as e:
         print(f"Error configuring Gemini API: {e}")
         return f"Error configuring AI service: {e}"
@@ -24,7 +24,7 @@ def tailor_resume_with_ai(job_description, resume_text):
     # 'gemini-1.0-pro' is a good general text model. 'gemini-1.5-pro-latest' might be newer/better.
     model_name = 'gemini-1.0-pro' # or 'gemini-1.5-pro-latest' if available and preferred
     try:
-        model = genai.GenerativeModel(model_name)
+        model = model_registry.get_model(model_name) # Reused across calls
     except Exception as e:
         print(f"Error initializing Gemini model '{model_name}': {e}")
         return f"Error initializing AI model: {e}"
@@ -60,14 +60,14 @@ def tailor_resume_with_ai(job_description, resume_text):
     **Tailored Resume Text (Full Content):**
     """
 
-    generation_config = genai.types.GenerationConfig(
-        # candidate_count=1, # Default
-        # stop_sequences=None,
-        max_output_tokens=8192, # Gemini 1.0 Pro has a large token limit, adjust if using other models or expecting very long outputs
-        temperature=0.4,      # Lower temperature for more deterministic, factual output
-        # top_p=0.95,
-        # top_k=40
-    )
+    generation_config = model_registry.get_generation_config({
+        # "candidate_count": 1, # Default
+        # "stop_sequences": None,
+        "max_output_tokens": 8192, # Gemini 1.0 Pro has a large token limit, adjust if using other models or expecting very long outputs
+        "temperature": 0.4,      # Lower temperature for more deterministic, factual output
+        # "top_p": 0.95,
+        # "top_k": 40
+    })
 
     # Configure safety settings to be less restrictive if needed, but be mindful of policy.
     # Default is often BLOCK_MEDIUM_AND_ABOVE for most categories.
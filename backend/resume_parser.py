@@ -1,48 +1,25 @@
-import PyPDF2
-from docx import Document
 import os
-# import pdfplumber # Uncomment if you prefer pdfplumber
+from text_extraction import extract_document
 
-def extract_text_from_pdf(pdf_path):
-    text = ""
+# Path-based helpers kept for scripts; extraction itself lives in text_extraction (shared with
+# the app), including the pdfplumber fallback, which is used whenever pdfplumber is installed.
+
+def _extract_file(file_path, ext):
     try:
-        with open(pdf_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            if not reader.pages:
-                print(f"Warning: No pages found in PDF {pdf_path}.")
-                return "" # Or handle as an error
-            for page_num in range(len(reader.pages)):
-                page = reader.pages[page_num]
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text
-        # if not text: # Fallback or alternative if PyPDF2 fails or extracts poorly
-            # print(f"PyPDF2 extracted no text from {pdf_path}. Trying pdfplumber...")
-            # try:
-            #     with pdfplumber.open(pdf_path) as pdf:
-            #         for page in pdf.pages:
-            #             page_text = page.extract_text()
-            #             if page_text:
-            #                 text += page_text + "\n"
-            # except Exception as e_plumber:
-            #     print(f"pdfplumber also failed for {pdf_path}: {e_plumber}")
-        if not text:
-             print(f"Warning: Could not extract text from PDF {pdf_path} using available methods.")
+        with open(file_path, 'rb') as file:
+            text, _ = extract_document(file.read(), ext)
     except Exception as e:
-        print(f"Error reading PDF {pdf_path}: {e}")
+        print(f"Error reading {ext.upper()} {file_path}: {e}")
         return None # Indicates a hard error during parsing
+    if not text:
+        print(f"Warning: Could not extract text from {ext.upper()} {file_path} using available methods.")
     return text
 
+def extract_text_from_pdf(pdf_path):
+    return _extract_file(pdf_path, 'pdf')
+
 def extract_text_from_docx(docx_path):
-    text = ""
-    try:
-        doc = Document(docx_path)
-        for para in doc.paragraphs:
-            text += para.text + "\n"
-    except Exception as e:
-        print(f"Error reading DOCX {docx_path}: {e}")
-        return None # Indicates a hard error during parsing
-    return text
+    return _extract_file(docx_path, 'docx')
 
 def get_resume_text(file_path):
     _, file_extension = os.path.splitext(file_path)
@@ -52,4 +29,4 @@ def get_resume_text(file_path):
         return extract_text_from_docx(file_path)
     else:
         print(f"Unsupported file type: {file_extension}")
-        return None
\ No newline at end of file
+        return None
@@ -0,0 +1,419 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+
+from extraction_cache import ExtractionCache, hash_file_bytes
+from section_tailoring import split_sections
+
+# Persistent resume profiles: a resume is uploaded and parsed once, then tailoring requests
+# refer to it by id instead of re-sending the file. Profiles (zlib-compressed extracted text plus
+# its sections) live in a SQLite database indexed by id and by content hash, so uploading the
+# same file again returns the existing id without parsing it. WAL mode lets several worker
+# processes read concurrently while one writes. Eviction keeps the table under max_entries
+# (least recently used or oldest first) and drops profiles idle for longer than max_idle_seconds.
+# Profiles are extracted resume text (personal data), so they always expire: 30 days unused by
+# default. The database lives in DATA_DIR, not wherever the process happens to start.
+
+EVICTION_POLICIES = ('lru', 'fifo')
+DEFAULT_MAX_IDLE_SECONDS = 30 * 24 * 3600
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+_TOUCH_INTERVAL_SECONDS = 60 # last_used_at is refreshed at most this often, so reads rarely write
+
+
+class StoredResume:
+    __slots__ = ('id', 'content_hash', 'filename', 'text', 'sections', 'created_at', 'last_used_at')
+
+    def __init__(self, id, content_hash, filename, text, sections, created_at, last_used_at):
+        self.id = id
+        self.content_hash = content_hash
+        self.filename = filename
+        self.text = text
+        self.sections = sections # [(kind, heading, text)] as split by section_tailoring
+        self.created_at = created_at
+        self.last_used_at = last_used_at
+
+    def public_view(self, include_text=False):
+        view = {
+            "resume_id": self.id,
+            "filename": self.filename,
+            "chars": len(self.text),
+            "created_at": self.created_at,
+            "last_used_at": self.last_used_at,
+            "sections": [{"kind": kind, "heading": heading, "chars": len(text)} for kind, heading, text in self.sections],
+        }
+        if include_text:
+            view["text"] = self.text
+        return view
+
+
+def content_hash_for(data, filename):
+    # Includes the extractor version, so after an extractor upgrade the same upload is parsed and
+    # stored again instead of returning text from the old extractor
+    return ExtractionCache.make_key(hash_file_bytes(data), filename.split('.')[-1])
+
+
+def split_profile_sections(text):
+    return [(section.kind, section.heading, section.text) for section in split_sections(text)]
+
+
+def _encode_sections(text, sections):
+    # Sections are stored as [kind, heading, start, end] offsets into the text rather than a second
+    # copy of it; a section that is not a verbatim slice (none today) keeps its own text
+    encoded, cursor = [], 0
+    for kind, heading, section_text in sections:
+        start = text.find(section_text, cursor)
+        if start < 0:
+            encoded.append([kind, heading, section_text])
+            continue
+        cursor = start + len(section_text)
+        encoded.append([kind, heading, start, cursor])
+    return json.dumps(encoded, ensure_ascii=False)
+
+
+def _decode_sections(text, encoded):
+    return [(item[0], item[1], text[item[2]:item[3]] if len(item) == 4 else item[2]) for item in json.loads(encoded)]
+
+
+def _pack(value):
+    return zlib.compress(value.encode('utf-8'), 6)
+
+
+def _unpack(blob):
+    return zlib.decompress(blob).decode('utf-8')
+
+
+class ResumeStore:
+    def __init__(self, path, max_entries=500000, max_idle_seconds=DEFAULT_MAX_IDLE_SECONDS, eviction_policy='lru',
+                 evict_every=500):
+        if eviction_policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy '{eviction_policy}'. Use one of: {', '.join(EVICTION_POLICIES)}.")
+        self.path = path
+        self.max_entries = max_entries
+        self.max_idle_seconds = max_idle_seconds
+        self.eviction_policy = eviction_policy
+        self.evict_every = evict_every # The table may overshoot max_entries by up to this many inserts
+        # last_used_at writes are throttled, but never so much that a profile in use looks idle
+        self.touch_interval = min(_TOUCH_INTERVAL_SECONDS, max_idle_seconds / 10) if max_idle_seconds else _TOUCH_INTERVAL_SECONDS
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._inserts_since_evict = 0
+        self.hits = 0
+        self.misses = 0
+        self.inserts = 0
+        self.deduplicated = 0
+        self.evictions = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS resumes ("
+            "id TEXT PRIMARY KEY, content_hash TEXT NOT NULL, filename TEXT, text BLOB NOT NULL, "
+            "sections TEXT NOT NULL, chars INTEGER, created_at REAL, last_used_at REAL)"
+        )
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS resumes_content_hash ON resumes (content_hash)")
+        conn.execute("CREATE INDEX IF NOT EXISTS resumes_last_used ON resumes (last_used_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS resumes_created ON resumes (created_at)")
+
+    def _conn(self):
+        # One connection per thread, kept open: lookups are a single indexed read
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL") # Safe with WAL; a power cut can only lose the last commits
+            self._local.conn = conn
+        return conn
+
+    def _count(self, **increments):
+        with self._lock:
+            for name, amount in increments.items():
+                setattr(self, name, getattr(self, name) + amount)
+
+    @staticmethod
+    def _row_to_resume(row):
+        resume_id, content_hash, filename, text, sections, created_at, last_used_at = row
+        text = _unpack(text)
+        return StoredResume(resume_id, content_hash, filename, text, _decode_sections(text, sections), created_at, last_used_at)
+
+    def _select(self, column, value):
+        return self._conn().execute(
+            "SELECT id, content_hash, filename, text, sections, created_at, last_used_at "
+            f"FROM resumes WHERE {column} = ?", (value,)
+        ).fetchone()
+
+    def _drop_if_idle(self, resume_id, last_used_at):
+        # Profiles past max_idle_seconds are misses as soon as they are looked up, not only once
+        # evict() gets round to them, and are deleted on the spot
+        if not self.max_idle_seconds or (last_used_at or 0) >= time.time() - self.max_idle_seconds:
+            return False
+        if self._conn().execute("DELETE FROM resumes WHERE id = ? AND last_used_at = ?", (resume_id, last_used_at)).rowcount:
+            self._count(evictions=1)
+        return True
+
+    def get(self, resume_id, touch=True):
+        row = self._select('id', resume_id)
+        if row is None or self._drop_if_idle(row[0], row[6]):
+            self._count(misses=1)
+            return None
+        self._count(hits=1)
+        resume = self._row_to_resume(row)
+        now = time.time()
+        if touch and now - (resume.last_used_at or 0) >= self.touch_interval:
+            resume.last_used_at = now
+            self._conn().execute("UPDATE resumes SET last_used_at = ? WHERE id = ?", (now, resume_id))
+        return resume
+
+    def get_by_hash(self, content_hash):
+        row = self._select('content_hash', content_hash)
+        if row is None or self._drop_if_idle(row[0], row[6]):
+            return None
+        return self._row_to_resume(row)
+
+    def id_for_hash(self, content_hash):
+        row = self._conn().execute(
+            "SELECT id, last_used_at FROM resumes WHERE content_hash = ?", (content_hash,)
+        ).fetchone()
+        if row is None or self._drop_if_idle(*row):
+            return None
+        return row[0]
+
+    @staticmethod
+    def _prepare_row(content_hash, filename, text, now):
+        # Sectioning and compression happen before the write transaction, not while holding its lock
+        sections = _encode_sections(text, split_profile_sections(text))
+        return (uuid.uuid4().hex, content_hash, filename, _pack(text), sections, len(text), now, now)
+
+    def _insert_rows(self, conn, rows):
+        # Returns [(resume_id, created)] in the same order as rows
+        results = []
+        for row in rows:
+            if self.max_idle_seconds: # An idle copy is replaced, not revived
+                conn.execute("DELETE FROM resumes WHERE content_hash = ? AND last_used_at < ?",
+                             (row[1], time.time() - self.max_idle_seconds))
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO resumes (id, content_hash, filename, text, sections, chars, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", row
+            )
+            if cursor.rowcount:
+                results.append((row[0], True))
+            else: # Same content already stored, possibly by another process a moment ago
+                results.append((conn.execute("SELECT id FROM resumes WHERE content_hash = ?", (row[1],)).fetchone()[0], False))
+        return results
+
+    def put(self, content_hash, filename, text):
+        # Returns (resume_id, created); created is False when the same file was already stored
+        return self.put_many([(content_hash, filename, text)])[0]
+
+    def put_many(self, profiles, batch_size=500):
+        # Bulk insert: one transaction per batch_size profiles instead of one per profile
+        now = time.time()
+        rows = [self._prepare_row(content_hash, filename, text, now) for content_hash, filename, text in profiles]
+        results = []
+        conn = self._conn()
+        for start in range(0, len(rows), batch_size):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                results.extend(self._insert_rows(conn, rows[start:start + batch_size]))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        created = sum(1 for _, was_created in results if was_created)
+        self._count(inserts=created, deduplicated=len(results) - created)
+        with self._lock:
+            self._inserts_since_evict += created
+            evict_now = self._inserts_since_evict >= self.evict_every
+            if evict_now:
+                self._inserts_since_evict = 0
+        if evict_now:
+            self.evict()
+        return results
+
+    def delete(self, resume_id):
+        return self._conn().execute("DELETE FROM resumes WHERE id = ?", (resume_id,)).rowcount > 0
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM resumes").fetchone()[0]
+
+    def evict(self):
+        # Drops idle profiles, then the least recently used (or oldest) ones above max_entries
+        conn = self._conn()
+        evicted = 0
+        if self.max_idle_seconds:
+            evicted += conn.execute("DELETE FROM resumes WHERE last_used_at < ?",
+                                    (time.time() - self.max_idle_seconds,)).rowcount
+        if self.max_entries:
+            excess = self.count() - self.max_entries
+            if excess > 0:
+                order_column = 'last_used_at' if self.eviction_policy == 'lru' else 'created_at'
+                evicted += conn.execute(
+                    f"DELETE FROM resumes WHERE id IN (SELECT id FROM resumes ORDER BY {order_column} LIMIT ?)", (excess,)
+                ).rowcount
+        if evicted:
+            self._count(evictions=evicted)
+            print(f"Resume store: evicted {evicted} profiles.")
+        return evicted
+
+    def lookup_counts(self):
+        # Cheap subset of stats() for metrics scrapes: no COUNT(*) over the table
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def stats(self):
+        conn = self._conn()
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        entries = self.count()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "path": self.path,
+                "entries": entries,
+                "db_bytes": page_count * page_size,
+                "max_entries": self.max_entries,
+                "max_idle_seconds": self.max_idle_seconds,
+                "eviction_policy": self.eviction_policy,
+                "hits": self.hits,
+                "misses": self.misses,
+                "inserts": self.inserts,
+                "deduplicated": self.deduplicated,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def create_resume_store_from_env():
+    if os.getenv('RESUME_STORE_ENABLED', 'True').lower() not in ('true', '1', 't'):
+        print("Resume store disabled.")
+        return None
+    try:
+        settings = dict(
+            max_entries=int(os.getenv('RESUME_STORE_MAX_ENTRIES', 500000)),
+            max_idle_seconds=float(os.getenv('RESUME_STORE_MAX_IDLE_SECONDS', DEFAULT_MAX_IDLE_SECONDS)),
+            eviction_policy=os.getenv('RESUME_STORE_EVICTION', 'lru').lower(),
+        )
+    except ValueError:
+        print("Warning: invalid RESUME_STORE_* settings, using defaults.")
+        settings = {}
+    if not settings.get('max_idle_seconds', DEFAULT_MAX_IDLE_SECONDS) > 0:
+        print("Warning: RESUME_STORE_MAX_IDLE_SECONDS must be positive (stored resumes always expire), "
+              "using the default.")
+        settings['max_idle_seconds'] = DEFAULT_MAX_IDLE_SECONDS
+    default_path = os.path.join(os.getenv('DATA_DIR', DEFAULT_DATA_DIR), 'resumes.sqlite3')
+    return ResumeStore(os.getenv('RESUME_STORE_PATH', default_path), **settings)
+
+
+# --- Bulk import ---
+def iter_resume_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in sorted(names):
+                    if name.split('.')[-1].lower() in ('pdf', 'docx'):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def bulk_import(store, paths, parse_fn, workers=4, batch_size=500):
+    # Parses every PDF/DOCX under paths with parse_fn(data, filename) -> text (run on `workers`
+    # threads, so a process-pool parser such as the parse sandbox runs that many parses at once)
+    # and stores them in batches. Files whose content is already stored are not parsed again.
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+
+    counts = {"imported": 0, "already_stored": 0, "failed": 0}
+
+    def parse_one(path):
+        # Unreadable files (permissions, dangling symlinks) fail like unparseable ones
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            return path, None, e.strerror or str(e)
+        filename = os.path.basename(path)
+        content_hash = content_hash_for(data, filename)
+        if store.id_for_hash(content_hash) is not None:
+            return path, None, None
+        try:
+            text = parse_fn(data, filename)
+        except Exception as e:
+            return path, None, str(e) or type(e).__name__
+        if not text:
+            return path, None, "no text extracted"
+        return path, (content_hash, filename, text), None
+
+    def store_batch(profiles):
+        created = sum(1 for _, was_created in store.put_many(profiles, batch_size) if was_created)
+        counts["imported"] += created
+        counts["already_stored"] += len(profiles) - created # Duplicates within the batch
+
+    def parsed():
+        # Files are submitted a bounded window at a time rather than all up front, so a tree of
+        # hundreds of thousands of resumes never queues every path and file body at once
+        in_flight = deque()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for path in iter_resume_files(paths):
+                in_flight.append(executor.submit(parse_one, path))
+                if len(in_flight) >= workers * 4:
+                    yield in_flight.popleft().result()
+            while in_flight:
+                yield in_flight.popleft().result()
+
+    pending = []
+    for path, profile, error in parsed():
+        if error is not None:
+            counts["failed"] += 1
+            print(f"Skipping {path}: {error}")
+        elif profile is None:
+            counts["already_stored"] += 1
+        else:
+            pending.append(profile)
+        if len(pending) >= batch_size:
+            store_batch(pending)
+            pending = []
+    if pending:
+        store_batch(pending)
+    store.evict()
+    return counts
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Bulk-import PDF/DOCX resumes into the resume store.')
+    parser.add_argument('paths', nargs='+', help='resume files or directories (searched recursively)')
+    parser.add_argument('--workers', type=int, default=0, help='parallel parses (default: parse sandbox size)')
+    args = parser.parse_args()
+
+    # Parsing goes through the same sandboxed workers (and limits) as uploads
+    from parse_sandbox import create_parse_sandbox_from_env
+    from text_extraction import extract_document
+
+    store = create_resume_store_from_env()
+    if store is None:
+        raise SystemExit("RESUME_STORE_ENABLED is off; nothing to import into.")
+    sandbox = create_parse_sandbox_from_env()
+
+    def parse(data, filename):
+        ext = filename.split('.')[-1].lower()
+        if sandbox is not None:
+            return sandbox.parse(data, ext)[0]
+        return extract_document(data, ext)[0]
+
+    started = time.perf_counter()
+    try:
+        counts = bulk_import(store, args.paths, parse, workers=args.workers or (sandbox.workers if sandbox else 4))
+    finally:
+        if sandbox is not None:
+            sandbox.close()
+    elapsed = time.perf_counter() - started
+    print(f"Imported {counts['imported']} resumes ({counts['already_stored']} already stored, {counts['failed']} failed) "
+          f"in {elapsed:.1f}s; the store now holds {store.count()} profiles.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+import re
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from text_compaction import keyword_set
+
+# Section-parallel tailoring: split the resume into sections (and experience/project
+# entries), rewrite the ones the JD cares about concurrently, pass the rest through
+# untouched, and reassemble everything in the original order.
+
+# Canonical section kinds and the headings that map to them
+_SECTION_ALIASES = {
+    'summary': ('summary', 'professional summary', 'profile', 'objective', 'career objective', 'about me'),
+    'experience': ('experience', 'work experience', 'professional experience', 'employment history',
+                   'employment', 'work history', 'relevant experience'),
+    'projects': ('projects', 'personal projects', 'key projects', 'selected projects'),
+    'skills': ('skills', 'technical skills', 'core competencies', 'key skills', 'technologies', 'competencies'),
+    'education': ('education', 'academic background', 'qualifications'),
+    'certifications': ('certifications', 'certificates', 'licenses', 'licenses & certifications'),
+    'awards': ('awards', 'honors', 'honours', 'achievements'),
+    'publications': ('publications',),
+    'languages': ('languages',),
+    'interests': ('interests', 'hobbies'),
+    'references': ('references',),
+}
+_HEADING_TO_KIND = {alias: kind for kind, aliases in _SECTION_ALIASES.items() for alias in aliases}
+
+TAILORED_KINDS = frozenset(('summary', 'experience', 'projects', 'skills'))
+# Experience/project sections are split further so each entry is its own model call
+ENTRY_KINDS = frozenset(('experience', 'projects'))
+
+_BULLET = re.compile(r'^\s*([*\-•o▪●]|\d+[.)])\s+')
+
+
+class Section:
+    def __init__(self, kind, text, heading=None):
+        self.kind = kind
+        self.heading = heading
+        self.text = text
+
+    @property
+    def tailored(self):
+        return self.kind in TAILORED_KINDS
+
+
+def classify_heading(line, allow_unknown=True):
+    stripped = line.strip().rstrip(':').strip()
+    if not stripped or len(stripped) > 40 or _BULLET.match(line):
+        return None
+    kind = _HEADING_TO_KIND.get(stripped.lower())
+    if kind:
+        return kind
+    # Unknown all-caps headings (e.g. "VOLUNTEERING") start a pass-through section
+    if allow_unknown and stripped.isupper() and len(stripped.split()) < 5 and not stripped.endswith(('.', ',', ';')):
+        return 'other'
+    return None
+
+
+def _split_entries(lines):
+    # An entry starts at a non-bullet line that follows a bullet or a blank line
+    entries, current, previous_was_bullet_or_blank = [], [], True
+    for line in lines:
+        is_bullet = bool(_BULLET.match(line))
+        is_blank = not line.strip()
+        if not is_bullet and not is_blank and previous_was_bullet_or_blank and any(l.strip() for l in current):
+            entries.append(current)
+            current = []
+        current.append(line)
+        if not is_blank:
+            previous_was_bullet_or_blank = is_bullet
+        else:
+            previous_was_bullet_or_blank = True
+    if any(l.strip() for l in current):
+        entries.append(current)
+    return ['\n'.join(entry).strip() for entry in entries]
+
+
+def split_sections(resume_text):
+    lines = resume_text.split('\n')
+    raw_sections = []  # (kind, heading, body_lines)
+    kind, heading, body = 'contact', None, []
+    for line in lines:
+        # Before the first known heading, all-caps lines are the candidate's name, not a section
+        line_kind = classify_heading(line, allow_unknown=kind != 'contact')
+        if line_kind:
+            raw_sections.append((kind, heading, body))
+            kind, heading, body = line_kind, line.strip(), []
+        else:
+            body.append(line)
+    raw_sections.append((kind, heading, body))
+
+    sections = []
+    for kind, heading, body in raw_sections:
+        body_text = '\n'.join(body).strip()
+        if heading is None and not body_text:
+            continue
+        if heading is not None:
+            sections.append(Section('heading', heading, heading=heading))
+        if not body_text:
+            continue
+        if kind in ENTRY_KINDS:
+            sections.extend(Section(kind, entry, heading=heading) for entry in _split_entries(body))
+        else:
+            sections.append(Section(kind, body_text, heading=heading))
+    return sections
+
+
+def analyze_job_description(job_description, max_keywords=30, max_requirements=15):
+    # Shared, local JD analysis sent with every section prompt instead of the full JD
+    lines = [line.strip() for line in job_description.split('\n') if line.strip()]
+    requirements = [_BULLET.sub('', line) for line in lines if _BULLET.match(line)]
+    if not requirements:
+        requirements = [line for line in lines if len(line.split()) > 4]
+    words = [word for line in lines for word in keyword_set(line)]
+    keywords = [word for word, _ in Counter(words).most_common(max_keywords)]
+    title = lines[0] if lines else ''
+    return (f"Target role: {title}\n"
+            f"Key requirements:\n" + '\n'.join(f"- {req}" for req in requirements[:max_requirements]) +
+            f"\nImportant keywords: {', '.join(keywords)}")
+
+
+def build_section_prompt(section, jd_analysis):
+    label = section.heading or section.kind.title()
+    return f"""
+    You are an expert career coach and professional resume writer.
+    Rewrite ONE part of a resume so it aligns with the target job below.
+
+    **Rules:**
+    1.  Keep every fact truthful; rephrase and reorder, incorporate JD keywords naturally, and quantify where the original supports it.
+    2.  Keep the same format: bullet points stay bullet points, the first line of a job/project entry (title, company, dates) stays as-is.
+    3.  Output ONLY the rewritten text of this part. No headings that were not in the input, no introductions, no explanations.
+
+    **Target Job Analysis:**
+    ---
+    {jd_analysis}
+    ---
+
+    **Resume Part ({label}):**
+    ---
+    {section.text}
+    ---
+
+    **Rewritten Resume Part:**
+    """
+
+
+def tailor_sections(resume_text, job_description, generate_fn, max_workers=6, hold_back_fn=None):
+    # generate_fn(prompt, section) -> text or an "Error: ..." string.
+    # hold_back_fn(sections) -> indices of tailorable sections to pass through verbatim anyway.
+    # Returns (tailored_text_or_error, report).
+    started = time.perf_counter()
+    sections = split_sections(resume_text)
+    jd_analysis = analyze_job_description(job_description)
+    held_back = hold_back_fn(sections) if hold_back_fn is not None else set()
+    targets = [index for index, section in enumerate(sections) if section.tailored and index not in held_back]
+
+    def run(index):
+        call_started = time.perf_counter()
+        result = generate_fn(build_section_prompt(sections[index], jd_analysis), sections[index])
+        return index, result, time.perf_counter() - call_started
+
+    outputs = {}
+    call_seconds, errors = [], []
+    if targets:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(targets))),
+                                thread_name_prefix='section-tailor') as executor:
+            for index, result, seconds in executor.map(run, targets):
+                call_seconds.append(seconds)
+                if result.startswith("Error:"):
+                    errors.append(result)
+                else:
+                    outputs[index] = result.strip()
+
+    if targets and not outputs:
+        # Nothing could be tailored; surface the error like the single-call path would
+        return errors[0], None
+
+    parts = []
+    for index, section in enumerate(sections):
+        # A failed section falls back to its original text rather than sinking the whole resume
+        parts.append(outputs.get(index, section.text))
+    tailored_text = join_sections(sections, parts)
+
+    wall_seconds = time.perf_counter() - started
+    serial_seconds = sum(call_seconds)
+    report = {
+        "sections": len(sections),
+        "model_calls": len(targets),
+        "passed_through": len(sections) - len(targets),
+        "held_back": len(held_back),
+        "failed_sections": len(errors),
+        "wall_seconds": round(wall_seconds, 3),
+        # Summed call time approximates the single-call path, where the same output is generated serially
+        "serial_seconds_estimate": round(serial_seconds, 3),
+        "seconds_saved_estimate": round(max(0.0, serial_seconds - wall_seconds), 3),
+    }
+    return tailored_text, report
+
+
+def join_sections(sections, parts):
+    out, previous = [], None
+    for section, part in zip(sections, parts):
+        # Blank line before every heading and between consecutive experience/project entries
+        starts_block = section.kind == 'heading' or (section.kind in ENTRY_KINDS and previous in ENTRY_KINDS)
+        if out and starts_block:
+            out.append('')
+        out.append(part)
+        previous = section.kind
+    return '\n'.join(out).strip()
@@ -0,0 +1,32 @@
+import os
+import re
+import tempfile
+
+# app reads its settings at import time
+os.environ.update({
+    'LLM_BACKEND': 'fake',
+    'FAKE_LLM_LATENCY_SECONDS': '0',
+    'LLM_CACHE_ENABLED': 'False',
+    'RESUME_STORE_PATH': os.path.join(tempfile.mkdtemp(), 'resumes.sqlite3'),
+})
+
+import app  # noqa: E402
+
+RESUME = "Jane Doe\n\nExperience\nEngineer, Acme (2019 - 2021)\n- Built the billing service in Python"
+JOB_DESCRIPTION = "Backend engineer, Python and billing systems"
+
+
+def blocked_errors():
+    match = re.search(r'^tailor_ai_errors_total\{error_class="blocked"\} (\d+)$', app.metrics.render(), re.M)
+    return int(match.group(1)) if match else 0
+
+
+def test_prompt_blocked_mid_stream_is_reported_as_blocked(monkeypatch):
+    monkeypatch.setattr(app.llm_backend, 'block_rate', 1.0)
+    errors_before = blocked_errors()
+    events = list(app.stream_tailored_resume_with_gemini(JOB_DESCRIPTION, RESUME))
+
+    kind, text = events[-1]
+    assert kind == "done"
+    assert text.startswith("Error: AI content generation failed. The request might have been blocked. Reason: SAFETY.")
+    assert blocked_errors() == errors_before + 1
@@ -0,0 +1,13 @@
+from text_compaction import normalize_text
+
+
+def test_line_break_inside_a_word_is_joined():
+    assert normalize_text("Led devel-\nopment of the API") == "Led development of the API"
+
+
+def test_date_range_split_across_lines_is_not_joined():
+    assert normalize_text("Worked on 2019-\n2020 roadmap") == "Worked on 2019-\n2020 roadmap"
+
+
+def test_hyphenated_compound_keeps_its_hyphen():
+    assert normalize_text("A self-\nmotivated engineer") == "A self-motivated engineer"
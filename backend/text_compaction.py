@@ -0,0 +1,246 @@
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+
+# Input compaction before prompt construction: clean up PDF extraction artefacts, drop
+# repeated headers/footers and JD boilerplate, then trim the lowest-value lines until the
+# JD + resume fit a token budget. Token counts are a local estimate, no API call involved.
+
+# A word broken across lines: lowercase letters on both sides, so date ranges ("2019-\n2020")
+# and names are never joined
+_HYPHEN_BREAK = re.compile(r'\b([a-z]+)-\n([a-z])')
+# A break right after one of these is inside a real hyphenated compound, so the hyphen stays
+_COMPOUND_PREFIXES = frozenset(
+    "self well non co cross full part high low long short multi end first front back real "
+    "open fast detail results data customer user team".split())
+_INLINE_SPACE = re.compile(r'[ \t\u00a0\u2000-\u200b]+')
+_BLANK_LINES = re.compile(r'\n{3,}')
+_DIGITS = re.compile(r'\d+')
+_PAGE_NUMBER_LINE = re.compile(r'^(page\s*)?\d+(\s*(/|of)\s*\d+)?$|^[-–—]\s*\d+\s*[-–—]$', re.I)
+_BULLET_LINE = re.compile(r'^([*\-•o]|\d+[.)])\s')
+_TOKEN = re.compile(r"[a-z][a-z0-9+#.\-]*")
+_TOKEN_OR_LINE_BREAK = re.compile(r"[a-z][a-z0-9+#.\-]*|\n")
+# Experience entry headings carry dates ("2019 - 2021", "Jan 2020 - Present"); never treated as furniture
+_DATED_LINE = re.compile(r'\b(19|20)\d\d\b|\bpresent\b', re.I)
+_PAGE_BREAK_LINE = '\f'  # pdf_extraction.PAGE_BREAK puts a form feed on its own line between pages
+
+# Paragraphs in JDs that cost tokens but never change the tailoring
+_JD_BOILERPLATE_PATTERNS = [re.compile(p, re.I) for p in (
+    r'equal (employment )?opportunity',
+    r'without regard to (race|age|sex|gender|religion)',
+    r'reasonable accommodation',
+    r'e-verify',
+    r'affirmative action',
+    r'(applicant|candidate) privacy (notice|policy)',
+    r'protected (veteran|characteristic|class)',
+    r'we (do not|don\'t) accept unsolicited (resumes|agency)',
+)]
+
+_STOPWORDS = frozenset("""
+a an and are as at be by for from has have in into is it its of on or our that the their this to
+we will with you your they them who what which about across all also any can per via using used
+""".split())
+
+MIN_REPEATED_LINE_COUNT = 2
+REPEATED_LINE_PAGE_SHARE = 0.6  # a header/footer repeats on most pages, not just a few
+PAGE_EDGE_LINES = 3  # lines at the top and bottom of a page where headers/footers sit
+MAX_REPEATED_LINE_LENGTH = 120
+
+
+def estimate_tokens(text):
+    # ~4 characters per token for English prose, the usual rule of thumb for Gemini/GPT tokenizers
+    return math.ceil(len(text) / 4) if text else 0
+
+
+def _join_hyphen_break(match):
+    # "devel-\nopment" -> "development", "self-\nmotivated" -> "self-motivated"
+    head, tail = match.groups()
+    return f"{head}-{tail}" if head in _COMPOUND_PREFIXES else head + tail
+
+
+def normalize_text(text):
+    text = unicodedata.normalize('NFKC', text or '')
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    text = _HYPHEN_BREAK.sub(_join_hyphen_break, text)
+    text = '\n'.join(line if line == _PAGE_BREAK_LINE else _INLINE_SPACE.sub(' ', line).strip()
+                     for line in text.split('\n'))
+    return _BLANK_LINES.sub('\n\n', text).strip()
+
+
+def _repeat_signature(line):
+    # Only page furniture is compared with digits masked ("Jane Doe - Page 3 of 9"); other lines,
+    # like "Engineer, Company 2 (2019 - 2020)", must repeat verbatim to count as a header/footer
+    lowered = line.lower()
+    return _DIGITS.sub('#', lowered) if 'page' in lowered else lowered
+
+
+def _split_pages(text):
+    pages = [[]]
+    for line in text.split('\n'):
+        if line == _PAGE_BREAK_LINE:
+            pages.append([])
+        else:
+            pages[-1].append(line)
+    return pages
+
+
+def _page_edges(page):
+    content = [index for index, line in enumerate(page) if line]
+    return set(content[:PAGE_EDGE_LINES] + content[-PAGE_EDGE_LINES:])
+
+
+def _may_be_furniture(page, index):
+    # Entry headings are never dropped: dated lines ("Acme Corp, 2019 - 2021") and the title lines
+    # above them or above bullet points. The first line of a page is only checked against the next
+    # line, because page bodies often continue the previous page's bullets right below the header.
+    line = page[index]
+    if len(line) > MAX_REPEATED_LINE_LENGTH or _BULLET_LINE.match(line) or _DATED_LINE.search(line):
+        return False
+    following = [other for other in page[index + 1:] if other][:2]
+    if index == min(i for i, other in enumerate(page) if other):
+        return not (following and _DATED_LINE.search(following[0]))
+    return not any(_BULLET_LINE.match(other) or _DATED_LINE.search(other) for other in following)
+
+
+def remove_repeated_lines(text):
+    # PDF page headers/footers: lines at the top or bottom edge of a page that repeat on most pages
+    # (usually with a changing page number), plus bare page numbers there. Only PDF text carries
+    # page breaks; text without them (DOCX, pasted text) is returned unchanged.
+    pages = _split_pages(text)
+    if len(pages) < 2:
+        return text
+    edges = [_page_edges(page) for page in pages]
+    counts = Counter()
+    for page, page_edges in zip(pages, edges):
+        counts.update({_repeat_signature(page[index]) for index in page_edges if _may_be_furniture(page, index)})
+    min_count = max(MIN_REPEATED_LINE_COUNT, math.ceil(len(pages) * REPEATED_LINE_PAGE_SHARE))
+
+    kept, seen = [], set()
+    for page, page_edges in zip(pages, edges):
+        for index, line in enumerate(page):
+            if index in page_edges and _PAGE_NUMBER_LINE.match(line) and not _DATED_LINE.search(line):
+                continue
+            if index in page_edges and _may_be_furniture(page, index):
+                sig = _repeat_signature(line)
+                if counts[sig] >= min_count:
+                    # The first copy stays: a repeated "Jane Doe - Resume" header is also the name
+                    if sig in seen:
+                        continue
+                    seen.add(sig)
+            kept.append(line)
+    return _BLANK_LINES.sub('\n\n', '\n'.join(kept)).strip()
+
+
+def remove_jd_boilerplate(text):
+    paragraphs = re.split(r'\n\s*\n', text)
+    kept = [p for p in paragraphs if not any(pattern.search(p) for pattern in _JD_BOILERPLATE_PATTERNS)]
+    return '\n\n'.join(kept).strip()
+
+
+def tokenize(text, keep_line_breaks=False):
+    # Lowercased content words in order; stopwords and words of two letters or fewer are dropped.
+    # Trailing '.'/'-' are stripped after a greedy match instead of backtracking in the regex.
+    # With keep_line_breaks, each line break is kept as a '\n' token.
+    words = (word.rstrip('.-') for word in (_TOKEN_OR_LINE_BREAK if keep_line_breaks else _TOKEN).findall(text.lower()))
+    return [word for word in words if word == '\n' or (len(word) > 2 and word not in _STOPWORDS)]
+
+
+def keyword_set(text):
+    return set(tokenize(text))
+
+
+def _is_protected_line(index, line):
+    # Contact block and section headings always survive trimming
+    return index < 5 or (line.isupper() and len(line.split()) < 6)
+
+
+def trim_to_budget(text, max_tokens, reference_keywords):
+    # Drops the lines sharing the fewest keywords with the reference (the JD), keeping order
+    if estimate_tokens(text) <= max_tokens:
+        return text, 0
+    lines = text.split('\n')
+    scored = []
+    for index, line in enumerate(lines):
+        if not line or _is_protected_line(index, line):
+            continue
+        words = keyword_set(line)
+        overlap = len(words & reference_keywords) / math.sqrt(len(words)) if words else 0.0
+        # Later lines are usually older roles; break ties by dropping those first
+        scored.append((overlap, -index, index))
+    scored.sort()
+
+    dropped = set()
+    excess_chars = len(text) - max_tokens * 4
+    for _, _, index in scored:
+        if excess_chars <= 0:
+            break
+        dropped.add(index)
+        excess_chars -= len(lines[index]) + 1
+    trimmed = '\n'.join(line for index, line in enumerate(lines) if index not in dropped)
+    return _BLANK_LINES.sub('\n\n', trimmed).strip(), len(dropped)
+
+
+class CompactionStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self.lines_trimmed = 0
+
+    def record(self, report):
+        with self._lock:
+            self.requests += 1
+            self.tokens_before += report["tokens_before"]
+            self.tokens_after += report["tokens_after"]
+            self.lines_trimmed += report["lines_trimmed"]
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "tokens_before": self.tokens_before,
+                "tokens_after": self.tokens_after,
+                "tokens_saved": self.tokens_before - self.tokens_after,
+                "lines_trimmed": self.lines_trimmed,
+            }
+
+
+def compact_inputs(job_description, resume_text, token_budget, jd_share=0.3):
+    # Returns (job_description, resume_text, report)
+    tokens_before = estimate_tokens(job_description) + estimate_tokens(resume_text)
+
+    jd = remove_jd_boilerplate(normalize_text(job_description))
+    resume = remove_repeated_lines(normalize_text(resume_text))
+
+    lines_trimmed = 0
+    if token_budget and estimate_tokens(jd) + estimate_tokens(resume) > token_budget:
+        jd_keywords = keyword_set(jd)
+        # The JD gets at most jd_share of the budget; the resume gets whatever is left
+        jd_budget = min(estimate_tokens(jd), int(token_budget * jd_share))
+        jd, jd_trimmed = trim_to_budget(jd, jd_budget, keyword_set(resume))
+        resume, resume_trimmed = trim_to_budget(resume, token_budget - estimate_tokens(jd), jd_keywords)
+        lines_trimmed = jd_trimmed + resume_trimmed
+
+    tokens_after = estimate_tokens(jd) + estimate_tokens(resume)
+    report = {
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "tokens_saved": tokens_before - tokens_after,
+        "lines_trimmed": lines_trimmed,
+    }
+    return jd, resume, report
+
+
+def compaction_settings_from_env():
+    enabled = os.getenv('INPUT_COMPACTION_ENABLED', 'True').lower() in ('true', '1', 't')
+    try:
+        token_budget = int(os.getenv('INPUT_TOKEN_BUDGET', 24000))
+        jd_share = float(os.getenv('INPUT_JD_TOKEN_SHARE', 0.3))
+    except ValueError:
+        print("Warning: invalid INPUT_* compaction settings, using defaults.")
+        token_budget, jd_share = 24000, 0.3
+    return enabled, token_budget, jd_share
@@ -0,0 +1,208 @@
+import importlib.util
+import io
+import re
+import time
+import zipfile
+
+from pdf_extraction import PAGE_BREAK, PDF_MAX_CHARS, PDF_MAX_PAGES, LimitExceededError, extract_pdf_text, format_pdf_stats
+
+# One extraction engine for every caller (request handlers, the parse sandbox workers and the
+# legacy resume_parser helpers). Each format has an ordered list of extractors, fastest first;
+# a slower, higher-fidelity extractor only runs when the previous one's output fails the
+# quality checks (no text, too many garbage characters, words run together).
+
+FORMAT_LABELS = {'pdf': 'PDF', 'docx': 'DOCX'}
+
+# Bump whenever an extractor's output changes. Together with the truncation limits it is part of
+# every extraction cache key, so text cached by an older extractor is never served after a deploy.
+EXTRACTOR_VERSION = 3
+EXTRACTION_FINGERPRINT = f"x{EXTRACTOR_VERSION}p{PDF_MAX_PAGES}c{PDF_MAX_CHARS}"
+
+MIN_TEXT_CHARS = 20
+MAX_GARBAGE_RATIO = 0.05  # replacement, control and private-use characters (unmapped glyphs)
+MAX_RUN_TOGETHER_RATIO = 0.15  # share of letters in implausibly long "words"
+_GARBAGE_CHARS = re.compile('[\ufffd\ue000-\uf8ff\x00-\x08\x0b\x0e-\x1f]')  # \x0c is PAGE_BREAK
+_LONG_WORD = re.compile(r'[^\W\d_]{25,}')
+
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_MC_FALLBACK = '{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback'
+_DOCX_TEXT_TAGS = {_W + 't': None, _W + 'tab': '\t', _W + 'br': '\n', _W + 'cr': '\n', _W + 'noBreakHyphen': '-'}
+# Subtrees that never hold visible text, or (mc:Fallback) repeat a text box's VML copy
+_DOCX_SKIP_TAGS = {_W + 'pPr', _W + 'rPr', _W + 'sectPr', _W + 'tblPr', _W + 'tcPr', _W + 'trPr', _MC_FALLBACK}
+_DOCX_HEADER_PART = re.compile(r'word/(header|footer)\d*\.xml$')
+
+
+def text_problem(text):
+    # Returns None when the text looks usable, else 'empty', 'garbage' or 'missing_spaces'
+    stripped = text.strip()
+    if len(stripped) < MIN_TEXT_CHARS:
+        return 'empty'
+    sample = stripped[:50000]
+    if len(_GARBAGE_CHARS.findall(sample)) > MAX_GARBAGE_RATIO * len(sample):
+        return 'garbage'
+    letters = sum(1 for char in sample if char.isalpha())
+    if letters and sum(map(len, _LONG_WORD.findall(sample))) > MAX_RUN_TOGETHER_RATIO * letters:
+        return 'missing_spaces'
+    return None
+
+
+def check_docx_archive(data, max_uncompressed_bytes):
+    # Reads only the zip central directory, so zip bombs are refused before anything is inflated
+    try:
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            infos = archive.infolist()
+    except zipfile.BadZipFile:
+        raise ValueError("the file is not a valid DOCX document")
+    if not any(info.filename == 'word/document.xml' for info in infos):
+        raise ValueError("the file is not a valid DOCX document")
+    uncompressed = sum(info.file_size for info in infos)
+    if max_uncompressed_bytes and uncompressed > max_uncompressed_bytes:
+        raise LimitExceededError(f"the document expands to {uncompressed // (1024 * 1024)}MB; "
+                                 f"the maximum is {max_uncompressed_bytes // (1024 * 1024)}MB")
+
+
+# --- PDF extractors ---
+def _pdf_pypdf2(data, reject_over_pages=0, parallel=True):
+    return extract_pdf_text(io.BytesIO(data), reject_over_pages=reject_over_pages, parallel=parallel)
+
+
+def _pdf_pdfplumber(data, reject_over_pages=0, parallel=True):
+    # Slower, but places words by their coordinates, which fixes most run-together text
+    import pdfplumber
+    started = time.perf_counter()
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        total_pages = len(pdf.pages)
+        if reject_over_pages and total_pages > reject_over_pages:
+            raise LimitExceededError(f"the PDF has {total_pages} pages; the maximum is {reject_over_pages}")
+        page_texts, chars, pages_extracted = [], 0, 0
+        for page in pdf.pages[:PDF_MAX_PAGES or None]:
+            page_text = page.extract_text() or ""
+            pages_extracted += 1
+            if page_text:
+                page_texts.append(page_text)
+                chars += len(page_text) + len(PAGE_BREAK)
+            if PDF_MAX_CHARS and chars >= PDF_MAX_CHARS:
+                break
+    text = PAGE_BREAK.join(page_texts)[:PDF_MAX_CHARS or None]
+    return text, {"mode": "pdfplumber", "total_pages": total_pages, "pages_extracted": pages_extracted,
+                  "chars": len(text), "truncated": pages_extracted < total_pages or len(text) < chars - len(PAGE_BREAK),
+                  "seconds": time.perf_counter() - started, "page_seconds": []}
+
+
+# --- DOCX extractors ---
+def _docx_part_lines(xml_bytes, lines):
+    # One walk over a part in document order: body paragraphs, table cells and text boxes each
+    # become a line; a text box's lines follow the paragraph that anchors it
+    from lxml import etree
+    parser = etree.XMLParser(resolve_entities=False, no_network=True, remove_comments=True)
+
+    def walk(element, parts):
+        for child in element:
+            tag = child.tag
+            if tag in _DOCX_TEXT_TAGS:
+                if parts is not None:
+                    parts.append(_DOCX_TEXT_TAGS[tag] or child.text or '')
+            elif tag == _W + 'p':
+                index = len(lines)
+                lines.append('')
+                own_parts = []
+                walk(child, own_parts)
+                lines[index] = ''.join(own_parts)
+            elif tag not in _DOCX_SKIP_TAGS:
+                walk(child, parts)
+
+    walk(etree.fromstring(xml_bytes, parser), None)
+
+
+def _docx_xml(data, **options):
+    # Fast path: reads document.xml plus headers/footers straight from the archive with lxml,
+    # instead of building python-docx's object model
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        names = archive.namelist()
+        header_names = sorted(name for name in names if _DOCX_HEADER_PART.match(name))
+        body_lines, header_lines, footer_lines = [], [], []
+        _docx_part_lines(archive.read('word/document.xml'), body_lines)
+        for name in header_names:
+            _docx_part_lines(archive.read(name), header_lines if 'header' in name else footer_lines)
+    # The same header is often stored once per section or for first/odd/even pages
+    seen = set()
+    header_lines = [line for line in header_lines if line.strip() and not (line in seen or seen.add(line))]
+    footer_lines = [line for line in footer_lines if line.strip() and not (line in seen or seen.add(line))]
+    return "\n".join(header_lines + body_lines + footer_lines), None
+
+
+def _docx_python_docx(data, **options):
+    # Previous implementation, kept as the fallback: paragraphs, then table cells
+    from docx import Document as DocxDocument
+    doc = DocxDocument(io.BytesIO(data))
+    lines = [para.text for para in doc.paragraphs]
+    for table in doc.tables:
+        for row in table.rows:
+            lines.extend(cell.text for cell in row.cells)
+    return "\n".join(lines), None
+
+
+# (name, function, required module), fastest first
+EXTRACTORS = {
+    'pdf': [('pypdf2', _pdf_pypdf2, 'PyPDF2'), ('pdfplumber', _pdf_pdfplumber, 'pdfplumber')],
+    'docx': [('docx-xml', _docx_xml, 'lxml'), ('python-docx', _docx_python_docx, 'docx')],
+}
+_available = {}
+
+
+def available_extractors(ext):
+    extractors = []
+    for name, extract_fn, module in EXTRACTORS.get(ext, []):
+        if module not in _available:
+            _available[module] = importlib.util.find_spec(module) is not None
+        if _available[module]:
+            extractors.append((name, extract_fn))
+    return extractors
+
+
+def extract_document(data, ext, reject_over_pages=0, max_docx_uncompressed_bytes=0, parallel=True, extractors=None):
+    # Returns (text, report). Limit violations, MemoryError and "every extractor failed" raise;
+    # low-quality output falls through to the next extractor and the best attempt wins.
+    if ext not in FORMAT_LABELS:
+        raise ValueError("Unsupported file format. Only PDF and DOCX are supported.")
+    if ext == 'docx':
+        check_docx_archive(data, max_docx_uncompressed_bytes)
+    attempts, best, last_error = [], None, None
+    for name, extract_fn in extractors or available_extractors(ext):
+        started = time.perf_counter()
+        try:
+            text, pdf_stats = extract_fn(data, reject_over_pages=reject_over_pages, parallel=parallel)
+        except (LimitExceededError, MemoryError):
+            raise
+        except Exception as e:
+            last_error = e
+            attempts.append({"extractor": name, "seconds": time.perf_counter() - started, "chars": 0,
+                             "problem": f"error: {e}"})
+            continue
+        text = text.strip()
+        problem = text_problem(text)
+        attempts.append({"extractor": name, "seconds": time.perf_counter() - started, "chars": len(text),
+                         "problem": problem})
+        candidate = (problem != 'empty', len(text), name, text, pdf_stats)
+        if best is None or candidate[:2] > best[:2]:
+            best = candidate
+        if problem is None:
+            break
+    if best is None:
+        raise last_error if last_error is not None else ValueError(f"no {FORMAT_LABELS[ext]} extractor is available")
+    _, _, name, text, pdf_stats = best
+    return text, {"extractor": name, "problem": text_problem(text), "attempts": attempts, "pdf": pdf_stats}
+
+
+def format_extraction_report(report):
+    used = next(attempt for attempt in report["attempts"] if attempt["extractor"] == report["extractor"])
+    summary = f"{report['extractor']}, {used['chars']} chars in {used['seconds'] * 1000:.1f}ms"
+    if report["pdf"] is not None:
+        summary += f" [{format_pdf_stats(report['pdf'])}]"
+    rejected = [f"{attempt['extractor']} ({attempt['problem']})" for attempt in report["attempts"]
+                if attempt is not used and attempt["problem"]]
+    if rejected:
+        summary += f", also tried {', '.join(rejected)}"
+    if report["problem"]:
+        summary += f", best text still looks {report['problem'].replace('_', ' ')}"
+    return summary
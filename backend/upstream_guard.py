@@ -0,0 +1,377 @@
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+
+# Guard in front of model calls: token buckets for requests/min and tokens/min, jittered
+# exponential retry for transient upstream errors, and a circuit breaker that fails fast
+# while the upstream is saturated. Limiter and breaker state live in a store, so several
+# worker processes on one host (e.g. gunicorn -w 4) can share one global quota.
+
+CIRCUIT_CLOSED, CIRCUIT_OPEN, CIRCUIT_HALF_OPEN = 'closed', 'open', 'half_open'
+
+# Errors are classified by exception type first (google.api_core class names, matched by name
+# along the class hierarchy so no Google client library is imported), then by the HTTP status
+# code the exception carries, and only then by its message. A status code in the message counts
+# only where a status goes ("429 Resource exhausted", "HTTP 503"), never as a bare digit run.
+_TRANSIENT_ERROR_TYPES = frozenset(('ResourceExhausted', 'TooManyRequests', 'ServiceUnavailable', 'InternalServerError',
+                                    'DeadlineExceeded', 'GatewayTimeout', 'ConnectionError', 'TimeoutError'))
+_SATURATION_ERROR_TYPES = frozenset(('ResourceExhausted', 'TooManyRequests'))
+_TRANSIENT_STATUS_CODES = frozenset((429, 500, 503, 504))
+_SATURATION_STATUS_CODES = frozenset((429,))
+_TRANSIENT_ERROR_MESSAGE = re.compile(
+    r'\b(RESOURCE_EXHAUSTED|UNAVAILABLE|DEADLINE_EXCEEDED|Quota)\b|(^|\b(HTTP|status|code)\W*)(429|503|504)\b', re.I)
+_SATURATION_ERROR_MESSAGE = re.compile(r'\b(RESOURCE_EXHAUSTED|Quota)\b|(^|\b(HTTP|status|code)\W*)429\b', re.I)
+
+
+class UpstreamBusyError(Exception):
+    # Raised instead of calling the model: quota wait would be too long, or the circuit is open
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _status_code(e):
+    # google.api_core errors carry .code (an HTTPStatus), HTTP client errors usually .status_code;
+    # grpc's code() is a method and is ignored
+    for attribute in ('code', 'status_code'):
+        value = getattr(e, attribute, None)
+        if isinstance(value, int) and not isinstance(value, bool):
+            return int(value)
+    return None
+
+
+def _classify(e, error_types, status_codes, message_pattern):
+    if any(cls.__name__ in error_types for cls in type(e).__mro__):
+        return True
+    code = _status_code(e)
+    if code is not None:
+        return code in status_codes
+    return message_pattern.search(str(e)) is not None
+
+
+def is_transient_error(e):
+    return _classify(e, _TRANSIENT_ERROR_TYPES, _TRANSIENT_STATUS_CODES, _TRANSIENT_ERROR_MESSAGE)
+
+
+def is_saturation_error(e):
+    return _classify(e, _SATURATION_ERROR_TYPES, _SATURATION_STATUS_CODES, _SATURATION_ERROR_MESSAGE)
+
+
+# --- Stores ---
+# transact(fn) runs fn(state) atomically on a JSON-serialisable dict and returns its result
+
+class InMemoryQuotaStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = {}
+
+    def transact(self, fn):
+        with self._lock:
+            return fn(self._state)
+
+
+class SqliteQuotaStore:
+    # Local stand-in for a shared store: worker processes on one host point at the same file
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("CREATE TABLE IF NOT EXISTS guard_state (name TEXT PRIMARY KEY, state TEXT NOT NULL)")
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def transact(self, fn):
+        conn = self._connect()
+        try:
+            # BEGIN IMMEDIATE takes the write lock so read-modify-write is atomic across processes
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT state FROM guard_state WHERE name = 'upstream'").fetchone()
+            state = json.loads(row[0]) if row else {}
+            try:
+                result = fn(state)
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("INSERT OR REPLACE INTO guard_state (name, state) VALUES ('upstream', ?)",
+                         (json.dumps(state),))
+            conn.execute("COMMIT")
+            return result
+        finally:
+            conn.close()
+
+
+# --- Guard ---
+class UpstreamGuard:
+    def __init__(self, store, requests_per_minute=60, tokens_per_minute=0, max_retries=3,
+                 retry_base_seconds=0.5, retry_max_seconds=8.0, max_wait_seconds=10.0,
+                 failure_threshold=5, cooldown_seconds=30.0, sleep=time.sleep):
+        self.store = store
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self._sleep = sleep
+        self._random = random.Random()
+        # Per-process counters; the shared limiter/breaker state is in the store
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.throttled = 0
+        self.throttled_seconds = 0.0
+        self.shed = 0
+        self.circuit_rejections = 0
+        self.failures = 0
+
+    def _count(self, **increments):
+        with self._lock:
+            for name, value in increments.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def _limits(self):
+        limits = {'requests': self.requests_per_minute, 'tokens': self.tokens_per_minute}
+        return {name: per_minute for name, per_minute in limits.items() if per_minute > 0}
+
+    def _refill(self, state, now):
+        buckets = state.setdefault('buckets', {})
+        for name, per_minute in self._limits().items():
+            level, updated_at = buckets.get(name, (per_minute, now))
+            buckets[name] = [min(per_minute, level + max(0.0, now - updated_at) * per_minute / 60), now]
+        return buckets
+
+    @staticmethod
+    def _circuit(state):
+        return state.setdefault('circuit', {'failures': 0, 'open_until': 0, 'probe_until': 0})
+
+    def _try_acquire(self, cost_tokens):
+        # Charges both buckets and returns 0 when they have room, else the seconds until they will
+        def transaction(state):
+            now = time.time()
+            buckets = self._refill(state, now)
+            limits = self._limits()
+            # A prompt bigger than a whole minute of tokens could never fit; let it through on a full bucket
+            costs = {'requests': 1, 'tokens': min(cost_tokens, limits.get('tokens', 0))}
+            wait = max([(costs[name] - buckets[name][0]) * 60 / per_minute
+                        for name, per_minute in limits.items()] + [0.0])
+            if wait <= 0:
+                for name in limits:
+                    buckets[name][0] -= costs[name]
+            return max(0.0, wait)
+        return self.store.transact(transaction)
+
+    def _check_circuit(self):
+        # Returns 0 when a call may go ahead, else the seconds until the next probe is allowed
+        def transaction(state):
+            now = time.time()
+            circuit = self._circuit(state)
+            if not circuit['open_until']:
+                return 0.0
+            if now < circuit['open_until']:
+                return circuit['open_until'] - now
+            # Cooldown over (half-open): one probe call at a time decides whether to close again
+            if now < circuit['probe_until']:
+                return circuit['probe_until'] - now
+            circuit['probe_until'] = now + self.cooldown_seconds
+            return 0.0
+        return self.store.transact(transaction)
+
+    def _begin_acquire(self):
+        # Fails fast while the circuit is open; returns the deadline for waiting on quota
+        circuit_wait = self._check_circuit()
+        if circuit_wait:
+            self._count(circuit_rejections=1)
+            raise UpstreamBusyError("AI service is saturated; failing fast while the circuit is open.", circuit_wait)
+        return time.monotonic() + self.max_wait_seconds
+
+    def _next_wait(self, cost_tokens, deadline):
+        # Returns 0 once the call may go ahead, else how long to sleep before trying again
+        wait = self._try_acquire(cost_tokens)
+        if not wait:
+            self._count(calls=1)
+            return 0.0
+        if wait > deadline - time.monotonic():
+            self._count(shed=1)
+            raise UpstreamBusyError("AI request quota is exhausted for now.", wait)
+        # Jitter so waiting workers don't all retry at the same instant
+        wait += self._random.uniform(0, min(wait, 1.0) * 0.2)
+        self._count(throttled=1, throttled_seconds=wait)
+        return wait
+
+    def acquire(self, cost_tokens=0):
+        deadline = self._begin_acquire()
+        while True:
+            wait = self._next_wait(cost_tokens, deadline)
+            if not wait:
+                return
+            self._sleep(wait)
+
+    async def acquire_async(self, cost_tokens=0):
+        # Same as acquire(), but waits on the event loop instead of blocking a thread
+        deadline = self._begin_acquire()
+        while True:
+            wait = self._next_wait(cost_tokens, deadline)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def record_success(self):
+        def transaction(state):
+            circuit = self._circuit(state)
+            if circuit['open_until']:
+                print("AI circuit breaker closed: probe call succeeded.")
+            circuit.update(failures=0, open_until=0, probe_until=0)
+        self.store.transact(transaction)
+
+    def record_failure(self, e):
+        # Only upstream trouble counts; bad keys or blocked prompts say nothing about saturation
+        if not is_transient_error(e):
+            return
+        self._count(failures=1)
+        saturated = is_saturation_error(e)
+
+        def transaction(state):
+            now = time.time()
+            circuit = self._circuit(state)
+            circuit['failures'] += 1
+            if circuit['open_until'] or circuit['failures'] >= self.failure_threshold:
+                circuit.update(open_until=now + self.cooldown_seconds, probe_until=0)
+                print(f"AI circuit breaker open for {self.cooldown_seconds}s after {circuit['failures']} failures.")
+            if saturated:
+                # The upstream says the quota is gone; drain the buckets so every worker backs off
+                for bucket in self._refill(state, now).values():
+                    bucket[0] = min(bucket[0], 0.0)
+        self.store.transact(transaction)
+
+    def backoff_seconds(self, attempt):
+        # Full jitter: uniform in [0, min(max, base * 2^attempt)]
+        return self._random.uniform(0, min(self.retry_max_seconds, self.retry_base_seconds * 2 ** attempt))
+
+    def _retry_delay(self, e, attempt):
+        # Records the failure; returns the backoff before retry number attempt + 1, or None to give up
+        self.record_failure(e)
+        if not is_transient_error(e) or attempt >= self.max_retries:
+            return None
+        delay = self.backoff_seconds(attempt)
+        self._count(retries=1)
+        print(f"Transient AI error ({type(e).__name__}), retry {attempt + 1}/{self.max_retries} in {delay:.2f}s.")
+        return delay
+
+    def call(self, fn, cost_tokens=0):
+        # Runs fn() under the limiter and breaker, retrying transient errors with backoff
+        attempt = 0
+        while True:
+            self.acquire(cost_tokens)
+            try:
+                result = fn()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                self._sleep(delay)
+                continue
+            self.record_success()
+            return result
+
+    async def call_async(self, coroutine_fn, cost_tokens=0):
+        # call() for coroutines: quota waits and backoff sleeps yield to the event loop
+        attempt = 0
+        while True:
+            await self.acquire_async(cost_tokens)
+            try:
+                result = await coroutine_fn()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            self.record_success()
+            return result
+
+    def retry_after_seconds(self):
+        # Hint for Retry-After headers: time until the circuit half-opens or one request fits the bucket
+        def transaction(state):
+            now = time.time()
+            circuit = self._circuit(state)
+            if circuit['open_until'] > now:
+                return circuit['open_until'] - now
+            buckets = self._refill(state, now)
+            if 'requests' in buckets:
+                return max(0.0, (1 - buckets['requests'][0]) * 60 / self.requests_per_minute)
+            return 0.0
+        return max(1, math.ceil(self.store.transact(transaction)))
+
+    def stats(self):
+        def transaction(state):
+            now = time.time()
+            circuit = dict(self._circuit(state))
+            buckets = {name: round(level, 2) for name, (level, _) in self._refill(state, now).items()}
+            return circuit, buckets
+        circuit, buckets = self.store.transact(transaction)
+        if not circuit['open_until']:
+            circuit_state = CIRCUIT_CLOSED
+        elif circuit['open_until'] > time.time():
+            circuit_state = CIRCUIT_OPEN
+        else:
+            circuit_state = CIRCUIT_HALF_OPEN
+        with self._lock:
+            return {
+                "store": type(self.store).__name__,
+                "requests_per_minute": self.requests_per_minute,
+                "tokens_per_minute": self.tokens_per_minute,
+                "available": buckets,
+                "circuit": circuit_state,
+                "consecutive_failures": circuit['failures'],
+                "calls": self.calls,
+                "retries": self.retries,
+                "failures": self.failures,
+                "throttled": self.throttled,
+                "throttled_seconds": round(self.throttled_seconds, 3),
+                "shed": self.shed,
+                "circuit_rejections": self.circuit_rejections,
+            }
+
+
+def create_upstream_guard_from_env():
+    if os.getenv('UPSTREAM_GUARD_ENABLED', 'True').lower() not in ('true', '1', 't'):
+        print("AI rate limiter / circuit breaker disabled.")
+        return None
+    try:
+        settings = dict(
+            requests_per_minute=float(os.getenv('LLM_REQUESTS_PER_MINUTE', 60)),
+            tokens_per_minute=float(os.getenv('LLM_TOKENS_PER_MINUTE', 0)),
+            max_retries=int(os.getenv('LLM_MAX_RETRIES', 3)),
+            retry_base_seconds=float(os.getenv('LLM_RETRY_BASE_SECONDS', 0.5)),
+            retry_max_seconds=float(os.getenv('LLM_RETRY_MAX_SECONDS', 8)),
+            max_wait_seconds=float(os.getenv('LLM_QUOTA_MAX_WAIT_SECONDS', 10)),
+            failure_threshold=int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 5)),
+            cooldown_seconds=float(os.getenv('CIRCUIT_COOLDOWN_SECONDS', 30)),
+        )
+    except ValueError:
+        print("Warning: invalid LLM_*/CIRCUIT_* guard settings, using defaults.")
+        settings = {}
+
+    store_type = os.getenv('QUOTA_STORE', 'memory').lower()
+    if store_type == 'sqlite':
+        store = SqliteQuotaStore(os.getenv('QUOTA_STORE_PATH', 'quota.sqlite3'))
+    elif store_type == 'memory':
+        store = InMemoryQuotaStore()
+    else:
+        raise ValueError(f"Unknown QUOTA_STORE '{store_type}'. Use 'memory' or 'sqlite'.")
+    return UpstreamGuard(store, **settings)